@@ -0,0 +1,216 @@
+import bisect
+import math
+import os
+from collections import deque
+
+import numpy as np
+
+# =====================================================
+# Anomaly Detection Configuration
+# =====================================================
+# "impute" replaces spikes with the running median before they reach the features;
+# "flag" only reports them; "off" skips screening
+ANOMALY_MODE = os.environ.get("ANOMALY_MODE", "impute")
+if ANOMALY_MODE not in ("impute", "flag", "off"):
+    raise ValueError(f"ANOMALY_MODE must be 'impute', 'flag' or 'off', got {ANOMALY_MODE!r}")
+# Readings per column the running median/MAD is taken over
+ANOMALY_WINDOW = int(os.environ.get("ANOMALY_WINDOW", "15"))
+# Distance from the running median, in robust standard deviations, that makes a spike
+ANOMALY_THRESHOLD = float(os.environ.get("ANOMALY_THRESHOLD", "5"))
+# This many identical readings in a row mark a stuck sensor
+FLATLINE_READINGS = int(os.environ.get("FLATLINE_READINGS", "7"))
+
+# Screened columns and the smallest spread (in the column's units) a spike is measured
+# against, so a window of identical readings (MAD 0) does not flag every small change
+SCREENED_COLUMNS = {"Groundwatelevel_m": 0.1, "sediment_g/l": 0.05}
+# Long runs of zero sediment are normal, so only the level is checked for flatlines
+FLATLINE_COLUMNS = ("Groundwatelevel_m",)
+# MAD of normally distributed data times this is its standard deviation
+MAD_SCALE = 1.4826
+
+# =====================================================
+# Running Median / MAD
+# =====================================================
+class RobustWindow:
+    """
+    The last `size` trusted readings of one column in arrival order and
+    sorted, so the median and MAD cost O(size) per reading however long the
+    history, plus the length of the current run of identical readings.
+    """
+
+    __slots__ = ("size", "recent", "ordered", "run", "prev")
+
+    def __init__(self, size=ANOMALY_WINDOW):
+        self.size = size
+        self.recent = deque()
+        self.ordered = []
+        self.run = 0
+        self.prev = math.nan
+
+    def push(self, value):
+        if len(self.recent) == self.size:
+            del self.ordered[bisect.bisect_left(self.ordered, self.recent.popleft())]
+        self.recent.append(value)
+        bisect.insort(self.ordered, value)
+
+    def drop_last(self, count):
+        """Take the `count` most recently pushed readings back out."""
+        for _ in range(min(count, len(self.recent))):
+            del self.ordered[bisect.bisect_left(self.ordered, self.recent.pop())]
+
+    def repeats(self, value):
+        """Length of the run of identical readings ending with `value`."""
+        self.run = self.run + 1 if value == self.prev else 1
+        self.prev = value
+        return self.run
+
+    @property
+    def ready(self):
+        return len(self.ordered) * 2 >= self.size
+
+    def median(self):
+        return _median(self.ordered)
+
+    def mad(self, median):
+        return _median(sorted(abs(v - median) for v in self.ordered))
+
+    def copy(self):
+        other = RobustWindow.__new__(RobustWindow)
+        other.size = self.size
+        other.recent = deque(self.recent)
+        other.ordered = list(self.ordered)
+        other.run = self.run
+        other.prev = self.prev
+        return other
+
+def _median(ordered):
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+# =====================================================
+# Station Screening
+# =====================================================
+class AnomalyDetector:
+    """
+    Screens a station's incoming readings in date order. A reading more
+    than ANOMALY_THRESHOLD robust stds from the running median of the
+    previous readings is a spike; the FLATLINE_READINGS-th identical reading
+    in a row, and every one after it, is a flatline. Spikes still go into
+    the window, so a genuine level shift is accepted once it fills half of
+    it; flatlined readings do not, and confirming a flatline takes the
+    run's earlier readings back out, so a stuck sensor never becomes the
+    median.
+    """
+
+    def __init__(self, window=ANOMALY_WINDOW, threshold=ANOMALY_THRESHOLD, flatline=FLATLINE_READINGS,
+                 mode=ANOMALY_MODE):
+        self.threshold = threshold
+        self.flatline = flatline
+        self.mode = mode
+        self.windows = {col: RobustWindow(window) for col in SCREENED_COLUMNS}
+
+    @classmethod
+    def from_frame(cls, data, **kwargs):
+        """
+        A detector primed by checking the last readings in `data`, going
+        back far enough that stuck runs among them (which never enter the
+        window) still leave it a full window of trusted readings.
+        """
+        detector = cls(**kwargs)
+        for col, window in detector.windows.items():
+            if col in data.columns:
+                values = data[col].to_numpy(dtype=np.float64)
+                needed = window.size + detector.flatline
+                start = _trusted_start(values, needed, detector.flatline) if col in FLATLINE_COLUMNS else -needed
+                for value in values[start:]:
+                    detector.check(col, float(value))
+        return detector
+
+    def copy(self):
+        other = AnomalyDetector.__new__(AnomalyDetector)
+        other.threshold = self.threshold
+        other.flatline = self.flatline
+        other.mode = self.mode
+        other.windows = {col: window.copy() for col, window in self.windows.items()}
+        return other
+
+    def check(self, col, value):
+        """Push one reading; returns (kind or None, running median before it)."""
+        window = self.windows[col]
+        if math.isnan(value):
+            return None, math.nan
+        median = math.nan
+        kind = None
+        if window.ready:
+            median = window.median()
+            scale = max(MAD_SCALE * window.mad(median), SCREENED_COLUMNS[col])
+            if abs(value - median) > self.threshold * scale:
+                kind = "spike"
+        if col in FLATLINE_COLUMNS:
+            run = window.repeats(value)
+            if run >= self.flatline:
+                if run == self.flatline:
+                    window.drop_last(run - 1)
+                return kind or "flatline", median
+        window.push(value)
+        return kind, median
+
+    def screen(self, frame):
+        """
+        Check every reading of a validated batch. Returns (screened, flags):
+        a copy of the frame in which, in impute mode, spikes are replaced by
+        the running median, and one flag per anomaly recording its date,
+        column, kind and raw value.
+        """
+        if self.mode == "off":
+            return frame, []
+        flags = []
+        columns = {col: frame[col].to_numpy(dtype=np.float64).copy() for col in SCREENED_COLUMNS}
+        dates = frame["date"].dt.strftime("%Y-%m-%d").tolist()
+        imputed = False
+        for i, date in enumerate(dates):
+            for col, values in columns.items():
+                kind, median = self.check(col, float(values[i]))
+                if kind is None:
+                    continue
+                flag = {"date": date, "column": col, "kind": kind, "value": float(values[i])}
+                if kind == "spike" and self.mode == "impute":
+                    values[i] = flag["imputed"] = median
+                    imputed = True
+                flags.append(flag)
+        if imputed:
+            frame = frame.assign(**columns)
+        return frame, flags
+
+def _trusted_start(values, needed, flatline):
+    """Index from which `values` holds `needed` readings outside runs of `flatline` or more identical ones."""
+    if not len(values):
+        return 0
+    run_ids = np.cumsum(np.r_[True, values[1:] != values[:-1]])
+    trusted = np.bincount(run_ids)[run_ids] < flatline
+    found = np.cumsum(trusted[::-1])
+    return max(0, len(values) - 1 - int(np.searchsorted(found, needed)))
+
+# =====================================================
+# Per-station Counts
+# =====================================================
+class AnomalyCounts:
+    """Readings screened and anomalies found for one station, kept across evictions."""
+
+    def __init__(self):
+        self.readings = 0
+        self.imputed = 0
+        self.found = {}
+
+    def record(self, readings, flags):
+        self.readings += readings
+        for flag in flags:
+            key = (flag["kind"], flag["column"])
+            self.found[key] = self.found.get(key, 0) + 1
+            self.imputed += "imputed" in flag
+
+    def as_dict(self):
+        counts = {"readings": self.readings, "imputed": self.imputed, "spike": {}, "flatline": {}}
+        for (kind, col), n in sorted(self.found.items()):
+            counts[kind][col] = n
+        return counts
@@ -1,11 +1,21 @@
-from flask import Flask, jsonify
+from flask import Flask, abort, g, jsonify, request
 from flask_cors import CORS
-import pandas as pd
-import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import GradientBoostingRegressor
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 import warnings
 
+from events import EventHub, StreamFull, sse_message
+from http_cache import ResponseCache, cache_headers, make_etag, not_modified
+from metrics import REQUEST_PROFILING, RequestProfiler, current_route, metrics, stage
+from predictions import build_alert, render_prediction, score_alerts, supports_mode
+from rainfall import RAINFALL_MODEL, RainfallRefresher
+from retrain import RetrainScheduler
+from series import build_series, series_query
+from stations import DEFAULT_STATION, default_registry
+from telemetry import readings_frame
+from training import FORECAST_MODE
+
 warnings.filterwarnings("ignore")
 
 # =====================================================
@@ -15,214 +25,398 @@ app = Flask(__name__)
 CORS(app)
 
 # =====================================================
-# Load & Preprocess Data
+# Stations (telemetry + models, loaded lazily per station)
 # =====================================================
-data = pd.read_csv("Telemetry_data.csv")
-
-required_cols = ["date", "Groundwatelevel_m", "rainfall_mm", "temperature_c", "humidity_pct"]
-for col in required_cols:
-    if col not in data.columns:
-        raise ValueError(f"Missing column: {col}")
-
-data["date"] = pd.to_datetime(data["date"], errors="coerce")
-data = data.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-
-# =====================================================
-# Evaporation Calculation
-# =====================================================
-def calculate_evaporation(temp, humidity):
-    humidity = np.clip(humidity, 0, 100)
-    return 0.0023 * (temp + 17.8) * np.sqrt(100 - humidity)
-
-data["evaporation_mm"] = calculate_evaporation(data["temperature_c"], data["humidity_pct"])
+registry = default_registry()
 
 # =====================================================
-# Feature Engineering
+# Utilities
 # =====================================================
-def create_features(df):
-    df = df.copy()
-    for window in [7, 14, 30]:
-        df[f"gw_rolling_mean_{window}"] = df["Groundwatelevel_m"].rolling(window).mean()
-        df[f"rainfall_sum_{window}"] = df["rainfall_mm"].rolling(window).sum()
+def get_station_status(score):
+    if score >= 80:
+        return "green", "NORMAL"
+    elif score >= 60:
+        return "yellow", "WATCH"
+    elif score >= 40:
+        return "orange", "ADVISORY"
+    else:
+        return "red", "CRITICAL"
 
-    for lag in [1, 7, 14]:
-        df[f"gw_lag_{lag}"] = df["Groundwatelevel_m"].shift(lag)
-        df[f"rain_lag_{lag}"] = df["rainfall_mm"].shift(lag)
+def to_json(payload):
+    with stage("serialize"):
+        return (app.json.dumps(payload, separators=(",", ":")) + "\n").encode()
 
-    df["day_of_year"] = df["date"].dt.dayofyear
-    df["month_sin"] = np.sin(2 * np.pi * df["date"].dt.month / 12)
-    df["month_cos"] = np.cos(2 * np.pi * df["date"].dt.month / 12)
-    return df
+def json_response(body):
+    return app.response_class(body, mimetype=app.json.mimetype)
 
-data_clean = create_features(data).dropna().reset_index(drop=True)
+def requested_station():
+    station_id = request.args.get("station", DEFAULT_STATION)
+    if station_id not in registry:
+        abort(404, description=f"Unknown station: {station_id}")
+    return registry.get(station_id)
 
 # =====================================================
-# ML MODEL FOR GROUNDWATER
+# HTTP Caching (ETag / Last-Modified, pre-compressed bodies)
 # =====================================================
-FEATURES = [
-    "gw_rolling_mean_7", "gw_rolling_mean_14", "gw_rolling_mean_30",
-    "rainfall_sum_7", "rainfall_sum_14", "rainfall_sum_30",
-    "gw_lag_1", "gw_lag_7", "gw_lag_14",
-    "rain_lag_1", "rain_lag_7", "rain_lag_14",
-    "rainfall_mm", "temperature_c", "humidity_pct",
-    "evaporation_mm", "day_of_year", "month_sin", "month_cos"
-]
+responses = ResponseCache()
+
+def cacheable_response(key, version, render, last_modified=None):
+    """
+    304 when the client's ETag (or date) for (key, version) is current;
+    otherwise the body from the byte cache in the best encoding the client
+    accepts, rendered and compressed by render() on a miss.
+    """
+    etag = make_etag(key, version)
+    if not_modified(etag, last_modified, request.headers.get("If-None-Match"),
+                    request.headers.get("If-Modified-Since")):
+        responses.not_modified += 1
+        response = app.response_class(status=304)
+        response.headers.extend(cache_headers(etag, last_modified))
+        return response
+    encoded = responses.get_or_build(key, version, render, last_modified)
+    encoding, body = encoded.negotiate(request.headers.get("Accept-Encoding"))
+    response = json_response(body)
+    response.headers.extend(encoded.headers(encoding))
+    return response
+
+def station_response(station, name, render):
+    """cacheable_response for a body that depends only on the station's data and model versions."""
+    return cacheable_response((station.id, name), station.cache_version(), render, station.last_modified())
 
-X = data_clean[FEATURES]
-y = data_clean["Groundwatelevel_m"]
-split = int(len(X) * 0.8)
+# =====================================================
+# Forecast Cache
+# =====================================================
+WARM_PREDICTIONS = [f"dashboard:{FORECAST_MODE}", "alerts"]
 
-X_train, y_train = X.iloc[:split], y.iloc[:split]
-scaler_X = StandardScaler()
-scaler_y = StandardScaler()
-X_train_scaled = scaler_X.fit_transform(X_train)
-y_train_scaled = scaler_y.fit_transform(y_train.values.reshape(-1,1)).ravel()
+def cached_prediction(station, name):
+    return station.cache.get_or_compute(name, station.cache_version(), lambda: render_prediction(name, station))
 
-model = GradientBoostingRegressor(n_estimators=200, learning_rate=0.1, max_depth=5, random_state=42)
-model.fit(X_train_scaled, y_train_scaled)
+def warm_forecast_cache(station):
+    # Compressed here too, so the first request after new data is a byte-cache hit
+    version, last_modified = station.cache_version(), station.last_modified()
+    for name in WARM_PREDICTIONS:
+        responses.get_or_build((station.id, name), version, lambda: cached_prediction(station, name), last_modified)
+    publish_updates(station)
 
 # =====================================================
-# ML MODEL FOR RAINFALL
+# Push Channel (server-sent events)
 # =====================================================
-y_rain = data_clean["rainfall_mm"]
-X_train_r, y_train_r = X.iloc[:split], y_rain.iloc[:split]
-scaler_X_r = StandardScaler()
-scaler_y_r = StandardScaler()
-X_train_r_scaled = scaler_X_r.fit_transform(X_train_r)
-y_train_r_scaled = scaler_y_r.fit_transform(y_train_r.values.reshape(-1,1)).ravel()
-
-rain_model = GradientBoostingRegressor(n_estimators=200, learning_rate=0.1, max_depth=5, random_state=42)
-rain_model.fit(X_train_r_scaled, y_train_r_scaled)
+hub = EventHub()
+
+def publish_updates(station):
+    """
+    Push the station's freshly cached forecast and alert to stream
+    subscribers: the forecast whenever its data/model version changes, the
+    alert only when the alert level changes.
+    """
+    version = station.cache_version()
+    hub.publish(station.id, "forecast", cached_prediction(station, f"dashboard:{FORECAST_MODE}"), key=version)
+    alert = cached_prediction(station, "alerts")
+    hub.publish(station.id, "alert", alert, key=app.json.loads(alert)[0]["alert_level"])
+
+def stream_snapshot(station):
+    """Current forecast and alert of a station, sent when a subscriber connects."""
+    return [
+        sse_message("forecast", cached_prediction(station, f"dashboard:{FORECAST_MODE}")),
+        sse_message("alert", cached_prediction(station, "alerts")),
+    ]
+
+def station_summary(station_id, load=False):
+    """
+    Status row for /api/stations; reuses the last summary of stations that
+    are not loaded. A station never summarized is loaded in the background
+    (or now, with load=True) and listed as "Loading" until then.
+    """
+    summary = registry.summaries.get(station_id)
+    if summary is not None and station_id not in registry.loaded():
+        return summary[1]
+    station = registry.get(station_id) if load else registry.peek(station_id)
+    if station is None:
+        queue_summary(station_id)
+        return {
+            "id": station_id,
+            "name": registry.sources[station_id][1],
+            "status": "Loading",
+            "last_update": None,
+            "pulse_score": None,
+            "color": None,
+            "alert_level": None,
+            "anomalies": registry.anomaly_counts(station_id).as_dict(),
+        }
+    if summary is not None and summary[0] == station.cache_version():
+        return summary[1]
+
+    alert = build_alert(station)
+    color, status = get_station_status(alert["pulse_score"])
+    row = {
+        "id": station.id,
+        "name": station.name,
+        "status": "Active",
+        "last_update": station.last_update.strftime("%Y-%m-%d"),
+        "pulse_score": alert["pulse_score"],
+        "color": color,
+        "alert_level": status,
+        "anomalies": registry.anomaly_counts(station_id).as_dict(),
+    }
+    registry.summaries[station_id] = (station.cache_version(), row)
+    return row
+
+def summary_version(station_id):
+    """
+    The version station_summary() would give the station's row: its
+    cache_version() when loaded, that of its last summary when not, and
+    None while it is still "Loading".
+    """
+    station = registry.peek(station_id)
+    if station is not None:
+        return station.cache_version()
+    summary = registry.summaries.get(station_id)
+    return summary[0] if summary is not None else None
+
+def batch_alerts(station_ids):
+    """
+    (cache_version, alert row, last_modified) of each station. Rows are
+    kept across evictions, since an unloaded station cannot change; the
+    rest are scored in chunks of at most the registry's capacity, so a
+    batch larger than it never evicts stations it is still scoring.
+    """
+    stale = []
+    for station_id in station_ids:
+        station, entry = registry.peek(station_id), registry.alert_rows.get(station_id)
+        if entry is None or (station is not None and entry[0] != station.cache_version()):
+            stale.append(station_id)
+    for start in range(0, len(stale), registry.capacity):
+        batch = [registry.get(s) for s in stale[start:start + registry.capacity]]
+        for station, row in zip(batch, score_alerts(batch)):
+            registry.alert_rows[station.id] = (station.cache_version(), row, station.last_modified())
+    return [registry.alert_rows[s] for s in station_ids]
+
+# Loading may train models, so /api/stations never waits for it
+summary_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summaries")
+_summaries_queued = set()
+_summaries_lock = threading.Lock()
+
+def queue_summary(station_id):
+    with _summaries_lock:
+        if station_id in _summaries_queued:
+            return
+        _summaries_queued.add(station_id)
+    summary_loader.submit(_load_summary, station_id)
+
+def _load_summary(station_id):
+    try:
+        station_summary(station_id, load=True)
+    except Exception:
+        app.logger.exception("Loading station %s for its summary failed", station_id)
+    finally:
+        with _summaries_lock:
+            _summaries_queued.discard(station_id)
+
+warm_forecast_cache(registry.get(DEFAULT_STATION))
+
+# Background refits (RETRAIN_INTERVAL_SECONDS / RETRAIN_AFTER_READINGS) swap models in atomically
+retrain_scheduler = RetrainScheduler(registry, on_swap=warm_forecast_cache)
+if retrain_scheduler.enabled:
+    retrain_scheduler.start()
+
+# RAINFALL_MODEL=prophet: the dashboard shows forecasts cached by `python rainfall.py`,
+# refitted (warm-started) in the background when readings arrive
+rainfall_refresher = RainfallRefresher(registry, on_update=warm_forecast_cache) if RAINFALL_MODEL == "prophet" else None
 
 # =====================================================
-# Utilities
+# Request Metrics / Profiling
 # =====================================================
-def get_station_status(score):
-    if score >= 80:
-        return "green", "NORMAL"
-    elif score >= 60:
-        return "yellow", "WATCH"
-    elif score >= 40:
-        return "orange", "ADVISORY"
-    else:
-        return "red", "CRITICAL"
+@app.before_request
+def start_request():
+    g.request_start = time.perf_counter()
+    current_route.set(request.endpoint or "unmatched")
+    # Opt-in per request, and only when REQUEST_PROFILING=1
+    if REQUEST_PROFILING and (request.args.get("profile") or request.headers.get("X-Profile")):
+        g.profiler = RequestProfiler().start()
+
+@app.after_request
+def finish_request(response):
+    metrics.observe("total", time.perf_counter() - g.request_start)
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        report = profiler.stop()
+        response = app.response_class(report, mimetype="text/plain")
+        response.headers["X-Profiler"] = profiler.kind
+    return response
+
+def metric_gauges():
+    """Cache, model and stream figures for /metrics, from the stations loaded now."""
+    gauges = []
+    hits = misses = 0
+    for station_id in registry.loaded():
+        station = registry.peek(station_id)
+        if station is None:
+            continue
+        cache = station.cache.stats()
+        hits, misses = hits + cache["hits"], misses + cache["misses"]
+        labels = {"station": station.id}
+        gauges += [
+            ("groundwater_forecast_cache_hits", labels, cache["hits"]),
+            ("groundwater_forecast_cache_misses", labels, cache["misses"]),
+            ("groundwater_station_load_seconds", labels, round(station.load_seconds, 6)),
+            ("groundwater_model_info", dict(labels, version=station.model_version, source=station.model_source), 1),
+        ]
+        calibration = station.artifact["calibration"]
+        for target in ("groundwater", "rainfall"):
+            gauges += [
+                ("groundwater_interval_coverage", dict(labels, target=target, nominal=calibration["nominal"]),
+                 round(calibration[target]["coverage"], 4)),
+                ("groundwater_interval_served", dict(labels, target=target), int(calibration[target]["passed"])),
+            ]
+    total = hits + misses
+    gauges += [
+        ("groundwater_forecast_cache_hit_rate", {}, round(hits / total, 4) if total else 0.0),
+        ("groundwater_stations_loaded", {}, len(registry.loaded())),
+        ("groundwater_stations_registered", {}, len(registry)),
+        ("groundwater_stream_subscribers", {}, hub.subscribers),
+        ("groundwater_stream_events_published", {}, hub.published),
+        ("groundwater_retrains_recorded", {}, len(retrain_scheduler.history)),
+    ]
+    http = responses.stats()
+    gauges += [
+        ("groundwater_http_cache_entries", {}, http["entries"]),
+        ("groundwater_http_cache_hits", {}, http["hits"]),
+        ("groundwater_http_cache_misses", {}, http["misses"]),
+        ("groundwater_http_not_modified", {}, http["not_modified"]),
+    ]
+    for station_id, counts in sorted(registry.anomalies.items()):
+        labels = {"station": station_id}
+        gauges.append(("groundwater_readings_screened", labels, counts.readings))
+        gauges.append(("groundwater_readings_imputed", labels, counts.imputed))
+        for (kind, column), n in sorted(counts.found.items()):
+            gauges.append(("groundwater_anomalies", dict(labels, column=column, kind=kind), n))
+    return gauges
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    # Prometheus text by default; ?format=json for a summary with bucketed p50/p99
+    gauges = metric_gauges()
+    if request.args.get("format") == "json":
+        return jsonify({
+            "stages": metrics.summary(),
+            "gauges": [{"name": name, "labels": labels, "value": value} for name, labels, value in gauges],
+        })
+    return app.response_class(metrics.prometheus(gauges), mimetype="text/plain; version=0.0.4")
 
 # =====================================================
 # API ROUTES
 # =====================================================
+@app.errorhandler(400)
+@app.errorhandler(404)
+@app.errorhandler(503)
+def api_error(error):
+    return jsonify({"error": error.description}), error.code
 
 @app.route("/api/dashboard", methods=["GET"])
 def dashboard():
-    latest = data_clean.iloc[-1:]
-    X_latest = scaler_X.transform(latest[FEATURES])
-    today_gw_pred = scaler_y.inverse_transform(model.predict(X_latest).reshape(-1, 1))[0][0]
-
-    # 7-day forecast
-    forecast_days = 7
-    rainfall_dates, predicted_rainfall, rainfall_upper, rainfall_lower = [], [], [], []
-    gw_dates, predicted_gw = [], []
-
-    last_row = latest.copy()
-    for i in range(forecast_days):
-        next_date = last_row["date"].values[0] + np.timedelta64(1, 'D')
-        last_row["date"] = pd.to_datetime(next_date)
-        features_row = create_features(pd.concat([data_clean, last_row], ignore_index=True)).iloc[-1:]
-
-        X_next = scaler_X.transform(features_row[FEATURES])
-        gw_pred = scaler_y.inverse_transform(model.predict(X_next).reshape(-1,1))[0][0]
-
-        rainfall_pred = scaler_y_r.inverse_transform(rain_model.predict(scaler_X_r.transform(features_row[FEATURES])).reshape(-1,1))[0][0]
-
-        rainfall_upper_val = rainfall_pred * 1.1
-        rainfall_lower_val = max(0, rainfall_pred * 0.9)
-
-        rainfall_dates.append(str(next_date)[:10])
-        predicted_rainfall.append(round(float(rainfall_pred),2))
-        rainfall_upper.append(round(float(rainfall_upper_val),2))
-        rainfall_lower.append(round(float(rainfall_lower_val),2))
-        gw_dates.append(str(next_date)[:10])
-        predicted_gw.append(round(float(gw_pred),3))
-
-        last_row["Groundwatelevel_m"] = gw_pred
-        last_row["rainfall_mm"] = rainfall_pred
-
-    return jsonify({
-        "predicted_groundwater": round(float(today_gw_pred),2),
-        "station_pulse_score": 90,
-        "rainfall_dates": rainfall_dates,
-        "predicted_rainfall": predicted_rainfall,
-        "rainfall_upper": rainfall_upper,
-        "rainfall_lower": rainfall_lower,
-        "gw_dates": gw_dates,
-        "predicted_gw": predicted_gw,
-        "today_gw_level": round(float(today_gw_pred),3)
-    })
+    station = requested_station()
+    mode = request.args.get("mode", FORECAST_MODE)
+    if not supports_mode(station.artifact, mode):
+        abort(400, description=f"Forecast mode {mode!r} is not available; set FORECAST_MODE=direct to train it")
+    name = f"dashboard:{mode}"
+    return station_response(station, name, lambda: cached_prediction(station, name))
 
 @app.route("/api/alerts", methods=["GET"])
 def alerts():
-    # Latest feature row
-    latest = data_clean.iloc[-1:]
-    X_latest = scaler_X.transform(latest[FEATURES])
-
-    # Predict groundwater
-    gw_pred = scaler_y.inverse_transform(
-        model.predict(X_latest).reshape(-1, 1)
-    )[0][0]
-
-    # ---- Pulse Score (dynamic) ----
-    mean = data_clean["Groundwatelevel_m"].mean()
-    std = data_clean["Groundwatelevel_m"].std()
-
-    if std == 0:
-        pulse_score = 100
-    else:
-        z = (gw_pred - mean) / std
-        pulse_score = max(0, min(100, 100 - abs(z) * 20))
-
-    pulse_score = round(float(pulse_score), 1)
-
-    # ---- Alert Mapping ----
-    if pulse_score >= 80:
-        color = "green"
-        alert_level = "NORMAL"
-        message = "Groundwater levels are healthy"
-    elif pulse_score >= 60:
-        color = "yellow"
-        alert_level = "WATCH"
-        message = "Groundwater levels are moderate - monitor closely"
-    elif pulse_score >= 40:
-        color = "orange"
-        alert_level = "ADVISORY"
-        message = "Groundwater levels are below normal - conservation advised"
-    elif pulse_score >= 20:
-        color = "red"
-        alert_level = "WARNING"
-        message = "Groundwater levels are critically low - immediate action needed"
-    else:
-        color = "darkred"
-        alert_level = "EMERGENCY"
-        message = "Groundwater emergency - implement emergency measures"
-
-    return jsonify([{
-        "station_id": "TGPH2SW0203",
-        "pulse_score": pulse_score,
-        "alert_level": alert_level,
-        "color": color,
-        "message": message
-    }])
-
+    # ?stations=all or ?stations=A,B,C scores every listed station in one batch
+    wanted = request.args.get("stations")
+    if wanted:
+        station_ids = registry.ids() if wanted == "all" else [s for s in wanted.split(",") if s]
+        unknown = [s for s in station_ids if s not in registry]
+        if unknown:
+            abort(404, description=f"Unknown station: {', '.join(unknown)}")
+        entries = batch_alerts(station_ids)
+        return cacheable_response(("alerts", tuple(station_ids)), tuple(entry[0] for entry in entries),
+                                  lambda: to_json([entry[1] for entry in entries]),
+                                  max((entry[2] for entry in entries), default=None))
+    station = requested_station()
+    return station_response(station, "alerts", lambda: cached_prediction(station, "alerts"))
+
+
+@app.route("/api/telemetry", methods=["POST"])
+def ingest_telemetry():
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Expected a JSON object with a readings field"}), 400
+    station_id = payload.get("station") or request.args.get("station", DEFAULT_STATION)
+    if not isinstance(station_id, str):
+        return jsonify({"error": "station must be a string"}), 400
+    if station_id not in registry:
+        abort(404, description=f"Unknown station: {station_id}")
+    try:
+        frame = readings_frame(payload.get("readings"))
+        station, flags = registry.ingest(station_id, frame)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    warm_forecast_cache(station)
+    retrain_scheduler.note_readings(station.id, len(frame))
+    if rainfall_refresher is not None:
+        rainfall_refresher.submit(station.id)
+    return jsonify({
+        "station_id": station.id,
+        "accepted": len(frame),
+        "anomalies": flags,
+        "last_update": station.last_update.strftime("%Y-%m-%d")
+    }), 201
+
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def open_stream(wanted, last_event_id=None):
+    """
+    Subscription for a ?stations= value: "A,B" streams those stations,
+    "all" every station. Shared with the native stream route in asgi.py.
+    """
+    station_ids = None if wanted == "all" else [s for s in wanted.split(",") if s]
+    unknown = [s for s in station_ids or [] if s not in registry]
+    if unknown:
+        abort(404, description=f"Unknown station: {', '.join(unknown)}")
+
+    # "all" skips the snapshot so connecting never loads every station; fetch /api/alerts?stations=all first
+    snapshot = [message for s in station_ids or [] for message in stream_snapshot(registry.get(s))]
+    try:
+        return hub.subscribe(station_ids, last_event_id, snapshot)
+    except StreamFull as exc:
+        abort(503, description=str(exc))
+
+@app.route("/api/stream", methods=["GET"])
+def stream():
+    # Under a threaded WSGI server each subscriber holds a thread; asgi.py serves it on the event loop
+    if not request.environ.get("wsgi.multithread"):
+        # e.g. a gunicorn sync worker: one subscriber would hold the whole worker (see events.py)
+        abort(503, description="Streaming needs a threaded worker (gunicorn -k gthread) or uvicorn asgi:app")
+    subscription = open_stream(request.args.get("stations", DEFAULT_STATION), request.headers.get("Last-Event-ID"))
+    return app.response_class(subscription, mimetype="text/event-stream", headers=STREAM_HEADERS)
 
 @app.route("/api/stations", methods=["GET"])
 def stations():
-    return jsonify([{
-        "id": "GW-001",
-        "name": "Station A",
-        "status": "Active",
-        "last_update": data_clean["date"].max().strftime("%Y-%m-%d")
-    }])
+    # Versioned without building any row, so a 304 costs one cache_version() per station
+    station_ids = registry.ids()
+    version = tuple((station_id, summary_version(station_id)) for station_id in station_ids)
+    return cacheable_response(("stations",), version,
+                              lambda: to_json([station_summary(station_id) for station_id in station_ids]))
+
+@app.route("/api/series", methods=["GET"])
+def series():
+    # ?target=&start=&end=&points=&method=lttb|minmax&resolution=auto|raw|daily|weekly|monthly
+    station = requested_station()
+    try:
+        query = series_query(request.args)
+    except ValueError as exc:
+        abort(400, description=str(exc))
+    return station_response(station, f"series:{sorted(query.items())}", lambda: to_json(build_series(station, **query)))
 
 @app.route("/api/charts", methods=["GET"])
 def charts():
+    station = requested_station()
+    return station_response(station, "charts", lambda: to_json(charts_payload(station.data_clean)))
+
+def charts_payload(data_clean):
     evaporation = data_clean[["date", "evaporation_mm"]].tail(100).assign(date=lambda x: x["date"].dt.strftime("%Y-%m-%d")).to_dict(orient="records")
     water_levels = data_clean[["date", "Groundwatelevel_m"]].tail(100).assign(date=lambda x: x["date"].dt.strftime("%Y-%m-%d")).to_dict(orient="records")
     last_7_days = data_clean.tail(7)
@@ -231,11 +425,11 @@ def charts():
         {"name": "Water Level", "value": round(float(last_7_days["Groundwatelevel_m"].sum()),2)}
     ] if last_7_days.shape[0]>0 else []
 
-    return jsonify({
+    return {
         "evaporation": evaporation,
         "water_levels": water_levels,
         "water_balance_pie": pie
-    })
+    }
 
 # =====================================================
 # Run Server
@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import joblib
+import sklearn
+
+from features import FEATURES
+from telemetry import _tmp_path
+from training import data_fingerprint, train_models
+
+# =====================================================
+# Model Artifacts
+# =====================================================
+ARTIFACT_VERSION = 5
+ARTIFACT_DIR = os.environ.get("MODEL_ARTIFACT_DIR", "artifacts")
+
+def artifact_path(station_id):
+    return os.path.join(ARTIFACT_DIR, f"{station_id}.joblib")
+
+def model_version(fingerprint):
+    return f"v{ARTIFACT_VERSION}-{fingerprint[:12]}"
+
+def save_artifact(bundle, fingerprint, path):
+    artifact = dict(bundle)
+    artifact.update({
+        "artifact_version": ARTIFACT_VERSION,
+        "sklearn_version": sklearn.__version__,
+        "fingerprint": fingerprint,
+        "version": model_version(fingerprint),
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+    })
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = _tmp_path(path)
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+    return artifact
+
+def load_artifact(path):
+    """Load a saved artifact, memory-mapping its arrays. Returns None if missing or unreadable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path, mmap_mode="r")
+    except Exception:
+        return None
+
+def is_current(artifact, fingerprint):
+    # The fingerprint covers the feature lists, so it also catches a changed FEATURES or pruned set
+    return (
+        artifact is not None
+        and artifact.get("artifact_version") == ARTIFACT_VERSION
+        and artifact.get("sklearn_version") == sklearn.__version__
+        and artifact.get("fingerprint") == fingerprint
+    )
+
+def load_or_train(data_clean, path, features=FEATURES, feature_sets=None):
+    """
+    Return (artifact, source, seconds). The saved artifact is reused when its
+    fingerprint matches data_clean; otherwise the models are retrained and
+    the artifact is rewritten.
+    """
+    start = time.perf_counter()
+    fingerprint = data_fingerprint(data_clean, features, feature_sets=feature_sets)
+    artifact = load_artifact(path)
+    if is_current(artifact, fingerprint):
+        return artifact, "artifact", time.perf_counter() - start
+
+    bundle = train_models(data_clean, features, feature_sets=feature_sets)
+    artifact = publish_artifact(bundle, fingerprint, path)
+    return artifact, "trained", time.perf_counter() - start
+
+def publish_artifact(bundle, fingerprint, path):
+    try:
+        return save_artifact(bundle, fingerprint, path)
+    except OSError:
+        # Read-only deploys still serve, they just retrain on every boot.
+        return dict(bundle, fingerprint=fingerprint, version=model_version(fingerprint))
+
+# =====================================================
+# Pruned Feature Sets
+# =====================================================
+def feature_sets_path(station_id):
+    return os.path.join(ARTIFACT_DIR, f"{station_id}.features.json")
+
+def save_feature_sets(station_id, feature_sets, source_version):
+    """Write the per-target feature lists chosen from the importances of model `source_version`."""
+    path = feature_sets_path(station_id)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w") as f:
+        json.dump(dict(feature_sets, source_version=source_version), f, indent=2)
+    os.replace(tmp_path, path)
+
+def load_feature_sets(station_id, features=FEATURES):
+    """
+    {"groundwater": [...], "rainfall": [...]} written by importance.py, or
+    None (use every feature) if there is no usable file for the station.
+    """
+    try:
+        with open(feature_sets_path(station_id)) as f:
+            saved = json.load(f)
+        feature_sets = {target: list(saved[target]) for target in ("groundwater", "rainfall")}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if not all(names and set(names) <= set(features) for names in feature_sets.values()):
+        return None
+    return feature_sets
+
+# =====================================================
+# Train / Export
+# =====================================================
+def main():
+    # Imported here because stations.py builds on this module.
+    from stations import default_registry
+
+    parser = argparse.ArgumentParser(description="Train the serving models and export them as artifacts.")
+    parser.add_argument("stations", nargs="*", help="station ids to export; defaults to every registered station")
+    parser.add_argument("--force", action="store_true", help="retrain even if the fingerprint matches")
+    args = parser.parse_args()
+
+    registry = default_registry()
+    for station_id in args.stations or registry.ids():
+        out = artifact_path(station_id)
+        if args.force and os.path.exists(out):
+            os.remove(out)
+        # CSV plus ingested readings, as the server fingerprints them; the CSV alone would never match
+        _, data_clean = registry.load_data(station_id)
+        artifact, source, seconds = load_or_train(data_clean, out, feature_sets=load_feature_sets(station_id))
+        print(f"{station_id}: {source} {artifact['version']} in {seconds:.2f}s -> {out}")
+        calibration = artifact["calibration"]
+        for target in ("groundwater", "rainfall"):
+            status = "kept" if calibration[target]["passed"] else "dropped"
+            print(f"  {target} interval: {calibration[target]['coverage']:.1%} held-out coverage "
+                  f"(nominal {calibration['nominal']:.0%}), mean width {calibration[target]['mean_width']:.3f}, "
+                  f"{status}")
+
+if __name__ == "__main__":
+    main()
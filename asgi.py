@@ -0,0 +1,211 @@
+"""
+Async serving mode.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+/api/dashboard and single-station /api/alerts are answered on the event
+loop: cache hits directly, misses by serving.PredictionService in a
+process pool, so forecasts never block the HTTP layer. They share app.py's
+byte cache of compressed bodies and answer a current ETag with 304.
+/api/stream subscribers wait on the event loop too, so an open stream holds
+no thread. Every other route is the Flask app from app.py, run on a pool of
+WSGI_THREADS threads. Run one process: stream subscribers only hear the
+ingests of their own process (see events.py).
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from werkzeug.exceptions import HTTPException
+
+import app as wsgi
+from http_cache import EncodedBody, cache_headers, make_etag, not_modified
+from metrics import current_route, metrics
+from predictions import supports_mode
+from serving import SERVING_RETRY_AFTER, Overloaded, PredictionService
+from stations import DEFAULT_STATION
+from training import FORECAST_MODE
+
+# Flask requests served at once; asgiref's default would run them all on one thread
+WSGI_THREADS = int(os.environ.get("WSGI_THREADS", "32"))
+
+service = None
+
+# =====================================================
+# WSGI Routes
+# =====================================================
+wsgi_executor = ThreadPoolExecutor(WSGI_THREADS, thread_name_prefix="wsgi")
+
+class ThreadedWsgiInstance(WsgiToAsgiInstance):
+    # The same body asgiref wraps, bound to our pool instead of its single thread-sensitive thread
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__["run_wsgi_app"].func, thread_sensitive=False,
+                                 executor=wsgi_executor)
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi with each request on wsgi_executor, so one slow route does not queue the rest."""
+
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+flask_app = ThreadedWsgiToAsgi(wsgi.app)
+
+# =====================================================
+# Responses
+# =====================================================
+async def send_body(send, status, body, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            # Same CORS policy as flask_cors on the WSGI routes
+            (b"access-control-allow-origin", b"*"),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def send_not_modified(send, headers):
+    await send({
+        "type": "http.response.start",
+        "status": 304,
+        "headers": [(b"access-control-allow-origin", b"*"), *headers],
+    })
+    await send({"type": "http.response.body", "body": b""})
+
+def header_pairs(headers):
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+async def send_error(send, status, message, headers=()):
+    await send_body(send, status, json.dumps({"error": message}, separators=(",", ":")).encode() + b"\n", headers)
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# =====================================================
+# Async Routes
+# =====================================================
+async def requested_station(query):
+    station_id = query.get("station", DEFAULT_STATION)
+    if station_id not in wsgi.registry:
+        raise HTTPError(404, f"Unknown station: {station_id}")
+    station = wsgi.registry.peek(station_id)
+    if station is None:
+        # Loading may train models; keep it off the event loop
+        station = await asyncio.get_running_loop().run_in_executor(None, wsgi.registry.get, station_id)
+    return station
+
+async def dashboard(query):
+    station = await requested_station(query)
+    mode = query.get("mode", FORECAST_MODE)
+    if not supports_mode(station.artifact, mode):
+        raise HTTPError(400, f"Forecast mode {mode!r} is not available; set FORECAST_MODE=direct to train it")
+    return station, f"dashboard:{mode}"
+
+async def alerts(query):
+    return await requested_station(query), "alerts"
+
+async def cached_response(send, station, name, request_headers):
+    """The station's body for `name`: 304, a byte-cache hit, or computed by the PredictionService."""
+    key, version, last_modified = (station.id, name), station.cache_version(), station.last_modified()
+    etag = make_etag(key, version)
+    if not_modified(etag, last_modified, request_headers.get("if-none-match"),
+                    request_headers.get("if-modified-since")):
+        wsgi.responses.not_modified += 1
+        return await send_not_modified(send, header_pairs(cache_headers(etag, last_modified)))
+    encoded = wsgi.responses.get(key, version)
+    if encoded is None:
+        body = await service.get(station, name)
+        encoded = wsgi.responses.put(key, version, EncodedBody(body, etag, last_modified))
+    encoding, body = encoded.negotiate(request_headers.get("accept-encoding"))
+    await send_body(send, 200, body, header_pairs(encoded.headers(encoding)))
+
+ROUTES = {"/api/dashboard": dashboard, "/api/alerts": alerts}
+
+# =====================================================
+# Push Channel
+# =====================================================
+async def wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+async def stream(scope, receive, send):
+    """/api/stream as app.py serves it, with each subscriber a task on the event loop."""
+    query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+    request_headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+    try:
+        # The snapshot may load stations and compute forecasts
+        subscription = await asyncio.get_running_loop().run_in_executor(
+            wsgi_executor, wsgi.open_stream, query.get("stations", DEFAULT_STATION),
+            request_headers.get("last-event-id"))
+    except HTTPException as exc:
+        return await send_error(send, exc.code, exc.description)
+
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    messages = subscription.__aiter__()
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"access-control-allow-origin", b"*"),
+                *header_pairs(wsgi.STREAM_HEADERS.items()),
+            ],
+        })
+        async for message in messages:
+            if disconnected.done():
+                break
+            await send({"type": "http.response.body", "body": message, "more_body": True})
+    finally:
+        disconnected.cancel()
+        subscription.close()
+        await messages.aclose()
+
+# =====================================================
+# ASGI App
+# =====================================================
+async def lifespan(receive, send):
+    global service
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            service = PredictionService()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            service.shutdown()
+            wsgi_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] == "http" and scope["method"] == "GET" and scope.get("path") == "/api/stream":
+        return await stream(scope, receive, send)
+
+    route = ROUTES.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "GET" else None
+    query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()} if route else {}
+    # Multi-station alert batches stay on the WSGI route
+    if route is None or "stations" in query:
+        return await flask_app(scope, receive, send)
+
+    start = time.perf_counter()
+    current_route.set(route.__name__)
+    request_headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+    try:
+        station, name = await route(query)
+        await cached_response(send, station, name, request_headers)
+    except HTTPError as exc:
+        return await send_error(send, exc.status, str(exc))
+    except Overloaded as exc:
+        return await send_error(send, 503, str(exc), [(b"retry-after", str(SERVING_RETRY_AFTER).encode())])
+    metrics.observe("total", time.perf_counter() - start)
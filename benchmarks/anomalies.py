@@ -0,0 +1,59 @@
+"""
+Time the streaming anomaly detector on synthetic readings.
+
+    python benchmarks/anomalies.py [--readings 100000] [--batch 100]
+
+The readings are a slow groundwater random walk with small sediment values,
+plus injected spikes and a stuck-sensor run. They are screened in ingest-sized
+batches through one AnomalyDetector. Reports readings per second and how many
+of the injected faults were flagged.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from anomalies import FLATLINE_READINGS, AnomalyCounts, AnomalyDetector
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readings", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = args.readings
+    gw = -20 + np.cumsum(rng.normal(0, 0.005, n))
+    spikes = rng.choice(np.arange(100, n - 100), size=n // 1000, replace=False)
+    gw[spikes] += rng.choice([-1, 1], len(spikes)) * rng.uniform(2, 10, len(spikes))
+    stuck = slice(n // 2, n // 2 + 50)
+    gw[stuck] = gw[n // 2]
+    frame = pd.DataFrame({
+        "date": pd.date_range("2000-01-01", periods=n, freq="D"),
+        "Groundwatelevel_m": gw,
+        "sediment_g/l": np.abs(rng.normal(0, 0.01, n)),
+    })
+
+    detector, counts = AnomalyDetector(), AnomalyCounts()
+    start = time.perf_counter()
+    for i in range(0, n, args.batch):
+        batch = frame.iloc[i:i + args.batch]
+        _, flags = detector.screen(batch)
+        counts.record(len(batch), flags)
+    seconds = time.perf_counter() - start
+
+    found = counts.as_dict()
+    print(f"{n:,} readings in batches of {args.batch}: {n / seconds:,.0f} readings/s")
+    print(f"spikes injected {len(spikes)}, flagged {found['spike'].get('Groundwatelevel_m', 0)}; "
+          f"stuck run of 50, flatlines flagged {found['flatline'].get('Groundwatelevel_m', 0)} "
+          f"(expected {50 - FLATLINE_READINGS + 1})")
+    print(f"sediment flagged {found['spike'].get('sediment_g/l', 0)}, imputed {found['imputed']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare telemetry CSV loading paths.
+
+    python benchmarks/csv_cache.py [--rows 1000000]
+
+  infer   pd.read_csv + pd.to_datetime without a format (the old app.py path)
+  format  pd.read_csv + pd.to_datetime with DATE_FORMAT (the old model.py path)
+  cold    load_telemetry with an empty cache (parse + write .npy columns)
+  warm    load_telemetry from the memory-mapped cache
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def synthetic_csv(path, rows):
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp("1900-01-01") + pd.to_timedelta(np.arange(rows) % 60000, unit="D")
+    pd.DataFrame({
+        "date": dates.strftime("%d-%m-%Y"),
+        "Groundwatelevel_m": rng.normal(-15, 3, rows),
+        "temperature_c": rng.normal(25, 4, rows),
+        "rainfall_mm": np.abs(rng.normal(0, 5, rows)),
+        "humidity_pct": rng.uniform(30, 100, rows),
+        "sediment_g/l": rng.uniform(0, 1, rows),
+    }).to_csv(path, index=False)
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["TELEMETRY_CACHE_DIR"] = os.path.join(tmp, "cache")
+        import telemetry
+
+        csv_path = os.path.join(tmp, "telemetry.csv")
+        synthetic_csv(csv_path, args.rows)
+
+        def infer():
+            data = pd.read_csv(csv_path)
+            data["date"] = pd.to_datetime(data["date"], errors="coerce")
+
+        def with_format():
+            data = pd.read_csv(csv_path)
+            data["date"] = pd.to_datetime(data["date"], format=telemetry.DATE_FORMAT)
+
+        results = {
+            "infer": timed(infer),
+            "format": timed(with_format),
+            "cold": timed(lambda: telemetry.load_telemetry(csv_path), repeat=1),
+            "warm": timed(lambda: telemetry.load_telemetry(csv_path)),
+        }
+
+    for name, seconds in results.items():
+        print(f"{name:6s} {seconds * 1000:9.1f} ms  ({results['infer'] / seconds:5.1f}x vs infer)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare per-station create_features with the stacked feature engine.
+
+    python benchmarks/features.py [--stations 10000] [--days 398] [--repeat 3]
+
+Every station is Telemetry_data.csv with its own noise, with some readings
+knocked out and some stations shortened. The baseline loops create_features
+over the station frames once. The stacked path builds (station, day) arrays once
+with stack_frames, then times feature_matrix. Both outputs are compared as
+float32: NaN positions and every value must be identical.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def synthetic_frames(count, days):
+    import numpy as np
+    import pandas as pd
+
+    from telemetry import load_telemetry, prepare_telemetry
+
+    real = load_telemetry(os.path.join(ROOT, "Telemetry_data.csv"))
+    rng = np.random.default_rng(0)
+    dates = pd.date_range(real["date"].iloc[-1] - pd.Timedelta(days=days - 1), periods=days, freq="D")
+    frames = []
+    for i in range(count):
+        length = days if i % 4 else int(rng.integers(days // 2, days))
+        frame = pd.DataFrame({"date": dates[days - length:]})
+        for col in ("Groundwatelevel_m", "rainfall_mm", "temperature_c", "humidity_pct"):
+            values = np.resize(real[col].to_numpy(dtype=np.float64), length)
+            noisy = values + rng.normal(0, 0.02 * np.nanstd(values), length)
+            frame[col] = np.where(values == 0, 0.0, noisy).astype(np.float32)
+        frame.loc[rng.random(length) < 0.002, "Groundwatelevel_m"] = np.nan
+        frames.append(prepare_telemetry(frame))
+    return frames
+
+def best_of(fn, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=398)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    import numpy as np
+
+    from features import FEATURES, create_features, feature_matrix, stack_frames
+
+    frames = synthetic_frames(args.stations, args.days)
+    print(f"{args.stations} stations x up to {args.days} days, {len(FEATURES)} features")
+
+    loop_seconds, per_station = best_of(lambda: [create_features(frame)[FEATURES] for frame in frames], 1)
+    stack_seconds, stacked = best_of(lambda: stack_frames(frames), 1)
+    out = np.empty((args.stations, args.days, len(FEATURES)), dtype=np.float32)
+    engine_seconds, matrix = best_of(lambda: feature_matrix(stacked, out=out), args.repeat)
+
+    mismatched, nan_mismatched, max_diff = 0, 0, 0.0
+    for i, features in enumerate(per_station):
+        expected = features.to_numpy(dtype=np.float32)
+        actual = matrix[i, args.days - len(expected):]
+        nan_mismatched += int((np.isnan(expected) != np.isnan(actual)).sum())
+        both = ~np.isnan(expected) & ~np.isnan(actual)
+        mismatched += int((expected[both] != actual[both]).sum())
+        if both.any():
+            max_diff = max(max_diff, float(np.abs(expected[both] - actual[both]).max()))
+
+    print(f"pandas loop      {loop_seconds * 1000:10.1f} ms")
+    print(f"stack_frames     {stack_seconds * 1000:10.1f} ms (once per station set)")
+    print(f"feature_matrix   {engine_seconds * 1000:10.1f} ms  ({loop_seconds / engine_seconds:.1f}x faster, "
+          f"{out.nbytes / 1e6:.0f} MB float32)")
+    print(f"differences: {mismatched} values, {nan_mismatched} NaN positions, max |diff| {max_diff:g}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare recursive and direct 7-day forecasts on the held-out split.
+
+    python benchmarks/forecast_modes.py [--csv Telemetry_data.csv]
+
+Every held-out day with a full week after it is used as a forecast origin.
+Reports MAE and interval coverage per horizon for both targets and the mean
+latency per forecast; bands dropped by the calibration gate show as nan.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from features import FeatureState
+from predictions import forecast_direct, forecast_recursive
+from telemetry import TELEMETRY_CSV, clean_features, load_telemetry
+from training import FORECAST_HORIZON, INTERVAL_COVERAGE, horizon_targets, interval_bounds, train_models
+
+def inside(outputs, target, actual):
+    """Per-horizon hits of `actual` in the target's band; NaN if the band was dropped."""
+    if f"{target}_lower" not in outputs:
+        return np.full(len(actual), np.nan)
+    lower, upper = interval_bounds(outputs[target], outputs[f"{target}_lower"], outputs[f"{target}_upper"])
+    return (actual >= lower) & (actual <= upper)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=os.path.join(ROOT, TELEMETRY_CSV))
+    args = parser.parse_args()
+
+    data_clean = clean_features(load_telemetry(args.csv))
+    artifact = train_models(data_clean, direct=True)
+    actual_gw = horizon_targets(data_clean, "Groundwatelevel_m")
+    actual_rain = horizon_targets(data_clean, "rainfall_mm")
+    origins = range(artifact["split"], len(data_clean) - FORECAST_HORIZON)
+
+    for name, forecaster in [("recursive", forecast_recursive), ("direct", forecast_direct)]:
+        gw_err, rain_err, gw_inside, rain_inside, seconds = [], [], [], [], 0.0
+        for i in origins:
+            state = FeatureState.from_frame(data_clean.iloc[:i + 1])
+            start = time.perf_counter()
+            _, pred = forecaster(artifact, state)
+            seconds += time.perf_counter() - start
+            outputs = dict(zip(artifact["outputs"], pred.T))
+            gw_err.append(np.abs(outputs["groundwater"] - actual_gw[i]))
+            rain_err.append(np.abs(outputs["rainfall"] - actual_rain[i]))
+            gw_inside.append(inside(outputs, "groundwater", actual_gw[i]))
+            rain_inside.append(inside(outputs, "rainfall", actual_rain[i]))
+
+        print(f"{name:9s} {seconds / len(origins) * 1000:7.2f} ms/forecast over {len(origins)} origins")
+        print("  gw MAE        " + " ".join(f"{v:7.4f}" for v in np.mean(gw_err, axis=0)))
+        print("  rain MAE      " + " ".join(f"{v:7.4f}" for v in np.mean(rain_err, axis=0)))
+        print("  gw coverage   " + " ".join(f"{v:7.1%}" for v in np.mean(gw_inside, axis=0))
+              + f"  (nominal {INTERVAL_COVERAGE:.0%})")
+        print("  rain coverage " + " ".join(f"{v:7.1%}" for v in np.mean(rain_inside, axis=0)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Measure POST /api/telemetry throughput on one core.
+
+    python benchmarks/ingest.py [--readings 20000] [--batch 500]
+
+Readings go to a temporary columnar store, so the real one is untouched.
+They follow a copy of the bundled telemetry moved back in time, since
+readings dated in the future are rejected.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readings", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["TELEMETRY_STORE_DIR"] = tmp
+        os.environ["MODEL_ARTIFACT_DIR"] = tmp
+        os.chdir(ROOT)
+        import numpy as np
+        import pandas as pd
+        import app
+        from telemetry import DATE_FORMAT, TELEMETRY_CSV
+
+        history = pd.read_csv(TELEMETRY_CSV)
+        dates = pd.to_datetime(history["date"], format=DATE_FORMAT)
+        end = pd.Timestamp.now().normalize() - pd.Timedelta(days=args.readings + 1)
+        history["date"] = (dates + (end - dates.max())).dt.strftime(DATE_FORMAT)
+        history.to_csv(os.path.join(tmp, "bench.csv"), index=False)
+        app.registry.register("bench", os.path.join(tmp, "bench.csv"))
+
+        client = app.app.test_client()
+        station = app.registry.get("bench")
+        dates = pd.date_range(station.last_update + pd.Timedelta(days=1), periods=args.readings)
+        rng = np.random.default_rng(0)
+        readings = {
+            "date": dates.strftime("%Y-%m-%d").tolist(),
+            "Groundwatelevel_m": rng.normal(-20, 1, args.readings).tolist(),
+            "temperature_c": rng.normal(25, 3, args.readings).tolist(),
+            "rainfall_mm": np.abs(rng.normal(0, 2, args.readings)).tolist(),
+            "humidity_pct": rng.uniform(40, 95, args.readings).tolist(),
+        }
+
+        start = time.perf_counter()
+        for i in range(0, args.readings, args.batch):
+            batch = {col: values[i:i + args.batch] for col, values in readings.items()}
+            response = client.post("/api/telemetry", json={"station": "bench", "readings": batch})
+            assert response.status_code == 201, response.get_json()
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.readings} readings in {elapsed:.2f}s -> {args.readings / elapsed:,.0f} readings/s (batch {args.batch})")
+
+if __name__ == "__main__":
+    main()
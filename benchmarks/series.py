@@ -0,0 +1,88 @@
+"""
+Compare /api/series against per-row records for a long synthetic station.
+
+    python benchmarks/series.py [--years 30] [--points 500] [--repeat 50]
+
+The station CSV, its models and caches live in a temporary directory. The
+baseline formats the whole range the way /api/charts formats its tail.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def synthetic_csv(path, years):
+    import numpy as np
+    import pandas as pd
+
+    dates = pd.date_range("1990-01-01", periods=int(years * 365.25), freq="D")
+    rng = np.random.default_rng(0)
+    season = np.sin(2 * np.pi * dates.dayofyear.to_numpy() / 365.25)
+    pd.DataFrame({
+        "date": dates.strftime("%d-%m-%Y"),
+        "Groundwatelevel_m": -20 + 3 * season + np.cumsum(rng.normal(0, 0.05, len(dates))),
+        "temperature_c": 25 + 5 * season + rng.normal(0, 1, len(dates)),
+        "rainfall_mm": np.clip(rng.gamma(0.4, 6, len(dates)) * (season + 1), 0, None),
+        "humidity_pct": np.clip(70 + 15 * season + rng.normal(0, 5, len(dates)), 0, 100),
+        "sediment_g/l": 0.0,
+    }).to_csv(path, index=False)
+    return len(dates)
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return result, times[len(times) // 2]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=float, default=30)
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stations_dir = os.path.join(tmp, "stations")
+        os.makedirs(stations_dir)
+        rows = synthetic_csv(os.path.join(stations_dir, "SYNTHETIC.csv"), args.years)
+        os.environ.update({
+            "STATIONS_DIR": stations_dir,
+            "MODEL_ARTIFACT_DIR": os.path.join(tmp, "artifacts"),
+            "TELEMETRY_CACHE_DIR": os.path.join(tmp, "cache"),
+            "TELEMETRY_STORE_DIR": os.path.join(tmp, "store"),
+        })
+        os.chdir(ROOT)
+        import app
+
+        client = app.app.test_client()
+        station = app.registry.get("SYNTHETIC")
+        data = station.data
+
+        def records():
+            frame = data[["date", "Groundwatelevel_m"]].assign(date=lambda x: x["date"].dt.strftime("%Y-%m-%d"))
+            return app.to_json(frame.to_dict(orient="records"))
+
+        start = time.perf_counter()
+        client.get("/api/series?station=SYNTHETIC")
+        first_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{rows} daily rows ({args.years:g} years); series index built in {first_ms:.1f}ms")
+        body, ms = timed(records, max(1, args.repeat // 10))
+        print(f"  {'per-row records':<40} {ms:8.2f}ms {len(body):>10,} bytes")
+        for query in ("", "&method=minmax", "&resolution=raw", "&resolution=raw&method=minmax",
+                      "&start=2010-01-01&end=2012-12-31", "&resolution=monthly"):
+            url = f"/api/series?station=SYNTHETIC&points={args.points}{query}"
+            response, ms = timed(lambda: client.get(url), args.repeat)
+            payload = response.get_json()
+            label = f"{query.lstrip('&') or 'auto'} -> {payload['resolution']}"
+            print(f"  {label:<40} {ms:8.2f}ms {len(response.data):>10,} bytes  {len(payload['values'])} points")
+
+if __name__ == "__main__":
+    main()
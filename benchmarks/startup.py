@@ -0,0 +1,53 @@
+"""
+Measure app.py startup with and without a saved model artifact.
+
+    python benchmarks/startup.py [--runs 3]
+
+Each run imports app in a fresh interpreter. "cold" starts from an empty
+artifact directory so the models are trained and exported; "warm" loads
+the artifacts written by the preceding cold run.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = (
+    "import time; t = time.perf_counter(); import app; "
+    "station = app.registry.get(app.DEFAULT_STATION); "
+    "print(time.perf_counter() - t, station.model_source, station.load_seconds)"
+)
+
+def import_app(artifact_dir):
+    env = dict(os.environ, MODEL_ARTIFACT_DIR=artifact_dir)
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout.split()
+    wall = time.perf_counter() - start
+    return {"process_s": wall, "import_s": float(out[0]), "source": out[1], "model_s": float(out[2])}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {"cold": [], "warm": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(args.runs):
+            artifact_dir = os.path.join(tmp, str(run))
+            results["cold"].append(import_app(artifact_dir))
+            results["warm"].append(import_app(artifact_dir))
+
+    for mode, runs in results.items():
+        best = min(runs, key=lambda r: r["import_s"])
+        print(f"{mode:5s} import {best['import_s']:.3f}s  station load {best['model_s']:.3f}s  ({best['source']})")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
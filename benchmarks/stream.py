@@ -0,0 +1,132 @@
+"""
+Hold many idle /api/stream subscribers and measure the server's cost.
+
+    python benchmarks/stream.py [--subscribers 2000] [--idle 10]
+
+The app runs in a threaded werkzeug server subprocess with temporary
+artifacts and telemetry store; this process keeps every subscriber on one
+selector. Reports server CPU while idle, RSS, and the time for one new
+reading to reach every subscriber. Linux only (reads /proc).
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import selectors
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = """
+import sys
+from werkzeug.serving import make_server
+import app
+server = make_server("127.0.0.1", int(sys.argv[1]), app.app, threaded=True)
+server.socket.listen(4096)
+print("ready", flush=True)
+server.serve_forever()
+"""
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def proc_status(pid, key):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(key):
+                return line.split()[1]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def open_subscribers(port, count, batch=200):
+    selector = selectors.DefaultSelector()
+    request = b"GET /api/stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n"
+    received = {}
+    for start in range(0, count, batch):
+        pending = set()
+        for _ in range(min(batch, count - start)):
+            sock = socket.create_connection(("127.0.0.1", port))
+            sock.sendall(request)
+            sock.setblocking(False)
+            selector.register(sock, selectors.EVENT_READ)
+            received[sock] = b""
+            pending.add(sock)
+        # Wait for each new subscriber's snapshot before opening the next batch
+        while pending:
+            for key, _ in selector.select(timeout=30):
+                received[key.fileobj] += key.fileobj.recv(65536)
+                if b"event: alert" in received[key.fileobj]:
+                    pending.discard(key.fileobj)
+    return selector, received
+
+def wait_for(selector, received, marker, timeout=60):
+    start = time.perf_counter()
+    pending = {sock for sock in received if marker not in received[sock]}
+    while pending and time.perf_counter() - start < timeout:
+        for key, _ in selector.select(timeout=1):
+            received[key.fileobj] += key.fileobj.recv(65536)
+            if marker in received[key.fileobj]:
+                pending.discard(key.fileobj)
+    return time.perf_counter() - start, len(pending)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--idle", type=float, default=10, help="seconds to measure idle CPU")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   MODEL_ARTIFACT_DIR=os.path.join(tmp, "artifacts"),
+                   TELEMETRY_STORE_DIR=os.path.join(tmp, "store"),
+                   STREAM_MAX_SUBSCRIBERS=str(args.subscribers + 100))
+        port = free_port()
+        server = subprocess.Popen([sys.executable, "-c", SERVER, str(port)], cwd=ROOT, env=env,
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        try:
+            server.stdout.readline()
+            rss_before = int(proc_status(server.pid, "VmRSS"))
+
+            start = time.perf_counter()
+            selector, received = open_subscribers(port, args.subscribers)
+            print(f"{args.subscribers} subscribers connected in {time.perf_counter() - start:.1f}s; "
+                  f"server threads {proc_status(server.pid, 'Threads')}, "
+                  f"RSS {rss_before / 1024:.0f} -> {int(proc_status(server.pid, 'VmRSS')) / 1024:.0f} MB")
+
+            cpu = cpu_seconds(server.pid)
+            time.sleep(args.idle)
+            idle_cpu = cpu_seconds(server.pid) - cpu
+            print(f"idle: {idle_cpu:.2f} CPU-s over {args.idle:g}s ({idle_cpu / args.idle:.1%} of one core)")
+
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            conn.request("GET", "/api/stations")
+            last = json.loads(conn.getresponse().read())[0]["last_update"]
+            next_day = datetime.date.fromisoformat(last) + datetime.timedelta(days=1)
+            reading = {"date": next_day.isoformat(), "Groundwatelevel_m": -20.0, "temperature_c": 25.0,
+                       "rainfall_mm": 0.0, "humidity_pct": 60.0}
+            received = {sock: b"" for sock in received}
+
+            cpu = cpu_seconds(server.pid)
+            start = time.perf_counter()
+            conn.request("POST", "/api/telemetry", json.dumps({"readings": [reading]}),
+                         {"Content-Type": "application/json"})
+            status = conn.getresponse().status
+            elapsed, missing = wait_for(selector, received, b"event: forecast")
+            print(f"one reading (HTTP {status}) fanned out to {args.subscribers - missing}/{args.subscribers} "
+                  f"subscribers in {elapsed * 1000:.0f}ms using {cpu_seconds(server.pid) - cpu:.2f} CPU-s")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
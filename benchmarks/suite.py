@@ -0,0 +1,246 @@
+"""
+Benchmark the training pipeline and API hot paths on synthetic telemetry.
+
+    python benchmarks/suite.py [--scales 1,100,10000] [--stations 1,10,100,1000]
+                               [--requests 200] [--output suite.json] [--compare old.json]
+
+Scenarios sweep the row scale (multiples of the 398-row Telemetry_data.csv)
+with one station, then the station count at 1x rows; --grid runs every
+combination. Each scenario runs in a fresh interpreter inside a temporary
+directory holding a synthetic Telemetry_data.csv (the default station) and
+stations/*.csv, and times:
+
+- startup: importing app with no artifacts (trains), then again with them
+- create_features and train_models on the default station
+- /api/dashboard, /api/alerts, /api/charts and /api/stations through the
+  Flask test client: the first request, then p50/p99 over --requests; the
+  dashboard and alerts are also timed with the forecast cache cleared
+
+and records peak RSS. Results are written as JSON; --compare flags
+metrics whose p50 grew by more than --threshold against an earlier run.
+
+Dates are daily, and datetime64[ns] only spans ~213,000 days, so a
+station holds at most MAX_ROWS rows. Larger scales keep the total row
+count by adding stations of MAX_ROWS rows.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASE_ROWS = 398
+FIRST_DAY = "1678-01-01"
+LAST_DAY = "2262-04-01"
+ENDPOINTS = ["/api/dashboard", "/api/alerts", "/api/charts", "/api/stations"]
+
+# =====================================================
+# Synthetic Telemetry
+# =====================================================
+def max_rows():
+    import pandas as pd
+    return (pd.Timestamp(LAST_DAY) - pd.Timestamp(FIRST_DAY)).days
+
+def write_station(path, rows, seed):
+    """Telemetry_data.csv resampled with noise, ending on the real data's last day where possible."""
+    import numpy as np
+    import pandas as pd
+
+    real = pd.read_csv(os.path.join(ROOT, "Telemetry_data.csv"))
+    rng = np.random.default_rng(seed)
+    start = max(pd.Timestamp(FIRST_DAY), pd.Timestamp("2025-02-01") - pd.Timedelta(days=rows - 1))
+    frame = pd.DataFrame({"date": pd.date_range(start, periods=rows, freq="D").strftime("%d-%m-%Y")})
+    for col in real.columns[1:]:
+        values = np.resize(real[col].to_numpy(dtype=np.float64), rows)
+        noise = rng.normal(0, 0.02 * (np.nanstd(values) or 1), rows)
+        frame[col] = values + noise if col != "rainfall_mm" else np.clip(values + noise, 0, None)
+    frame["humidity_pct"] = frame["humidity_pct"].clip(0, 100)
+    frame.to_csv(path, index=False, float_format="%.6g")
+
+def build_tree(directory, rows, stations):
+    """Default station in Telemetry_data.csv plus stations - 1 others in stations/."""
+    os.makedirs(os.path.join(directory, "stations"))
+    write_station(os.path.join(directory, "Telemetry_data.csv"), rows, 0)
+    for i in range(1, stations):
+        write_station(os.path.join(directory, "stations", f"S{i:04d}.csv"), rows, i)
+
+# =====================================================
+# Scenario Worker (runs inside the temporary directory)
+# =====================================================
+def summarize(samples):
+    import numpy as np
+    samples = np.asarray(samples) * 1000
+    return {
+        "n": len(samples),
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+    }
+
+def timed(fn, repeat, before=None):
+    samples = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def run_worker(args):
+    start = time.perf_counter()
+    import app
+    startup = time.perf_counter() - start
+
+    from features import create_features
+    from training import train_models
+
+    station = app.registry.get(app.DEFAULT_STATION)
+    timings = {
+        "create_features": summarize(timed(lambda: create_features(station.data), args.feature_repeats)),
+        "train_models": summarize(timed(lambda: train_models(station.data_clean), args.fit_repeats)),
+    }
+
+    client = app.app.test_client()
+    for path in ENDPOINTS:
+        first = timed(lambda: client.get(path), 1)[0]
+        timings[path] = dict(summarize(timed(lambda: client.get(path), args.requests)), first_ms=round(first * 1000, 3))
+    def invalidate():
+        # Both the per-station bodies and the compressed byte cache in front of them
+        station.cache.invalidate()
+        app.responses.clear()
+
+    for path in ("/api/dashboard", "/api/alerts"):
+        timings[f"{path} (uncached)"] = summarize(timed(lambda: client.get(path), args.requests, invalidate))
+
+    print(json.dumps({
+        "startup_cold_s": round(startup, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "timings": timings,
+    }))
+
+WARM_PROBE = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+def run_scenario(scale, stations, args):
+    rows = BASE_ROWS * scale
+    per_station = min(rows, max_rows())
+    # Scales beyond one station's date range add stations to keep the row total
+    stations = max(stations, -(-rows // per_station))
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        build_tree(tmp, per_station, stations)
+        build_seconds = time.perf_counter() - start
+
+        env = dict(os.environ, PYTHONPATH=ROOT, STATIONS_DIR="stations", MODEL_ARTIFACT_DIR="artifacts",
+                   TELEMETRY_CACHE_DIR=".telemetry_cache", TELEMETRY_STORE_DIR="telemetry_store")
+        worker = [sys.executable, os.path.abspath(__file__), "--worker", "--requests", str(args.requests),
+                  "--fit-repeats", str(args.fit_repeats), "--feature-repeats", str(args.feature_repeats)]
+        result = json.loads(subprocess.run(worker, cwd=tmp, env=env, check=True, capture_output=True,
+                                           text=True).stdout.splitlines()[-1])
+        warm = subprocess.run([sys.executable, "-c", WARM_PROBE], cwd=tmp, env=env, check=True,
+                              capture_output=True, text=True).stdout.split()[-1]
+
+    return dict({
+        "scale": scale,
+        "stations": stations,
+        "rows_per_station": per_station,
+        "total_rows": per_station * stations,
+        "synthetic_build_s": round(build_seconds, 3),
+        "startup_warm_s": round(float(warm), 3),
+    }, **result)
+
+# =====================================================
+# Reporting
+# =====================================================
+def scenario_key(scenario):
+    return f"{scenario['scale']}x/{scenario['stations']}st"
+
+def print_scenario(scenario):
+    print(f"\n{scenario_key(scenario)}: {scenario['total_rows']:,} rows, startup cold {scenario['startup_cold_s']}s "
+          f"warm {scenario['startup_warm_s']}s, peak RSS {scenario['peak_rss_mb']} MB")
+    for name, t in scenario["timings"].items():
+        first = f"  first {t['first_ms']:.1f}ms" if "first_ms" in t else ""
+        print(f"  {name:<28} p50 {t['p50_ms']:10.3f}ms  p99 {t['p99_ms']:10.3f}ms{first}")
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {scenario_key(s): s for s in json.load(f)["scenarios"]}
+    print(f"\nAgainst {baseline_path} (flagging p50 > {threshold:.2f}x):")
+    regressions = 0
+    for scenario in results["scenarios"]:
+        old = baseline.get(scenario_key(scenario))
+        if old is None:
+            continue
+        for name, t in scenario["timings"].items():
+            if name in old["timings"] and old["timings"][name]["p50_ms"] > 0:
+                ratio = t["p50_ms"] / old["timings"][name]["p50_ms"]
+                if ratio > threshold:
+                    regressions += 1
+                    print(f"  REGRESSION {scenario_key(scenario)} {name}: {ratio:.2f}x "
+                          f"({old['timings'][name]['p50_ms']:.3f} -> {t['p50_ms']:.3f}ms)")
+    print(f"  {regressions} regression(s)")
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int_list, default=[1, 100, 10000])
+    parser.add_argument("--stations", type=int_list, default=[1, 10, 100, 1000])
+    parser.add_argument("--grid", action="store_true", help="every scale x station combination")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--fit-repeats", type=int, default=1)
+    parser.add_argument("--feature-repeats", type=int, default=20)
+    parser.add_argument("--output", default=None, help="defaults to suite-<commit>.json")
+    parser.add_argument("--compare", default=None, help="earlier results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args)
+
+    if args.grid:
+        plan = [(scale, stations) for scale in args.scales for stations in args.stations]
+    else:
+        plan = [(scale, 1) for scale in args.scales] + [(1, n) for n in args.stations if n != 1]
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k != "worker"},
+        "scenarios": [],
+    }
+    for scale, stations in plan:
+        scenario = run_scenario(scale, stations, args)
+        results["scenarios"].append(scenario)
+        print_scenario(scenario)
+
+    output = args.output or f"suite-{commit or 'local'}.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {output}")
+    if args.compare:
+        sys.exit(1 if compare(results, args.compare, args.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
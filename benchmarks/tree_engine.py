@@ -0,0 +1,59 @@
+"""
+Check the compiled tree engine against sklearn and time both.
+
+    python benchmarks/tree_engine.py [--repeat 500]
+
+Prints the largest absolute difference of each engine output over every
+data_clean row, and the mean latency for 1 and 7 rows of predicting the
+point forecasts alone and together with their interval bounds.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from features import FEATURES
+from telemetry import TELEMETRY_CSV, clean_features, load_telemetry
+from training import engine_models, train_models
+
+def sklearn_predict(artifact, X, outputs=None):
+    columns = []
+    for model, scaler_X, scaler_y, _ in engine_models(artifact)[:outputs]:
+        scaled = model.predict(scaler_X.transform(X))
+        columns.append(scaler_y.inverse_transform(scaled.reshape(-1, 1))[:, 0])
+    return np.column_stack(columns)
+
+def mean_ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    data_clean = clean_features(load_telemetry(os.path.join(ROOT, TELEMETRY_CSV)))
+    artifact = train_models(data_clean)
+    engine = artifact["engine"]
+    X = data_clean[FEATURES].to_numpy(dtype=np.float64)
+
+    diff = np.abs(sklearn_predict(artifact, X) - engine.predict(X)).max(axis=0)
+    print("max |diff| " + "  ".join(f"{name} {d:.2e}" for name, d in zip(artifact["outputs"], diff)))
+
+    for outputs, label in ((2, "point"), (None, "point + intervals")):
+        for rows in (1, 7):
+            x = X[-rows:]
+            reference = mean_ms(lambda: sklearn_predict(artifact, x, outputs), args.repeat)
+            compiled = mean_ms(lambda: engine.predict(x, outputs), args.repeat)
+            print(f"{label}, {rows} row(s): sklearn {reference:.3f} ms  compiled {compiled:.3f} ms  "
+                  f"({reference / compiled:.1f}x)")
+
+if __name__ == "__main__":
+    main()
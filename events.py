@@ -0,0 +1,196 @@
+"""
+Server-sent events for /api/stream.
+
+The hub lives in the serving process, so an ingest reaches only the
+subscribers of the process that received it. Serve the app as ONE process:
+
+    uvicorn asgi:app                                  # subscribers wait on the event loop
+    gunicorn -w 1 -k gthread --threads 64 app:app     # a thread per subscriber
+
+With several gunicorn workers each would stream only its own ingests, and a
+sync worker serves one request at a time, so the WSGI route refuses to
+stream there (see app.stream).
+"""
+import asyncio
+import itertools
+import os
+import threading
+from collections import deque
+
+# =====================================================
+# Stream Configuration
+# =====================================================
+STREAM_HEARTBEAT = float(os.environ.get("STREAM_HEARTBEAT_SECONDS", "15"))
+# Events kept for Last-Event-ID replay and slow subscribers
+STREAM_HISTORY = int(os.environ.get("STREAM_HISTORY", "1024"))
+STREAM_MAX_SUBSCRIBERS = int(os.environ.get("STREAM_MAX_SUBSCRIBERS", "10000"))
+STREAM_RETRY_MS = 5000
+
+
+class StreamFull(Exception):
+    pass
+
+
+def sse_message(kind, body, event_id=None):
+    """One server-sent event; body is a single-line JSON payload."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {kind}\ndata: ".encode() + body.rstrip(b"\n") + b"\n\n"
+
+# =====================================================
+# Event Hub
+# =====================================================
+class EventHub:
+    """
+    Fan-out of pre-serialized server-sent events. A publisher formats each
+    event once and appends it to a bounded log; every subscriber holds only
+    a cursor into that log and sleeps on one shared condition, so an idle
+    subscriber costs a parked thread (or, iterated with `async for`, a
+    suspended task) and a heartbeat every few seconds, and a change costs
+    one computation however many clients listen.
+    """
+
+    def __init__(self, history=STREAM_HISTORY, heartbeat=STREAM_HEARTBEAT, max_subscribers=STREAM_MAX_SUBSCRIBERS):
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self.published = 0
+        self.suppressed = 0
+        self._events = deque(maxlen=history)
+        self._seq = 0
+        self._last = {}
+        self._cond = threading.Condition()
+        # One asyncio.Event per event loop with waiting subscribers, replaced on every publish
+        self._loop_events = {}
+
+    def publish(self, station_id, kind, body, key):
+        """
+        Queue `body` as a `kind` event for station_id unless `key` equals the
+        key of the last `kind` event for that station. Returns True if sent.
+        """
+        with self._cond:
+            if self._last.get((station_id, kind)) == key:
+                self.suppressed += 1
+                return False
+            self._last[(station_id, kind)] = key
+            self._seq += 1
+            self._events.append((self._seq, station_id, sse_message(kind, body, self._seq)))
+            self.published += 1
+            self._cond.notify_all()
+            loop_events, self._loop_events = self._loop_events, {}
+        for loop, event in loop_events.items():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The loop has closed
+                pass
+        return True
+
+    def subscribe(self, station_ids=None, last_event_id=None, snapshot=()):
+        """
+        A Subscription streaming events for station_ids (None for every
+        station), starting after last_event_id when it is still in the log
+        and otherwise with the `snapshot` messages. Raises StreamFull when
+        max_subscribers are already connected.
+        """
+        with self._cond:
+            if self.subscribers >= self.max_subscribers:
+                raise StreamFull(f"Too many stream subscribers ({self.max_subscribers})")
+            self.subscribers += 1
+            cursor = self._seq
+            resumed = False
+            if last_event_id is not None and last_event_id.isdigit():
+                oldest = self._events[0][0] if self._events else self._seq + 1
+                if oldest - 1 <= int(last_event_id) <= self._seq:
+                    cursor, resumed = int(last_event_id), True
+        return Subscription(self, station_ids, cursor, [] if resumed else list(snapshot))
+
+    def _release(self):
+        with self._cond:
+            self.subscribers -= 1
+
+    def _wait(self, cursor):
+        """(new events after cursor, new cursor, missed), waiting up to one heartbeat."""
+        with self._cond:
+            if self._seq == cursor:
+                self._cond.wait(self.heartbeat)
+            return self._since(cursor)
+
+    async def _wait_async(self, cursor):
+        """_wait for a subscriber on an event loop: suspends the task, not a thread."""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            # Taken under the lock, so a publish after this check still sets it
+            event = self._loop_events.setdefault(loop, asyncio.Event()) if self._seq == cursor else None
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), self.heartbeat)
+            except asyncio.TimeoutError:
+                pass
+        with self._cond:
+            return self._since(cursor)
+
+    def _since(self, cursor):
+        seq = self._seq
+        pending = seq - cursor
+        missed = pending > len(self._events)
+        events = list(itertools.islice(self._events, max(0, len(self._events) - pending), None))
+        return events, seq, missed
+
+    def stats(self):
+        return {
+            "subscribers": self.subscribers,
+            "published": self.published,
+            "suppressed": self.suppressed,
+            "last_event_id": self._seq,
+        }
+
+
+class Subscription:
+    """
+    Messages for one subscriber, as a WSGI response iterable or with
+    `async for` on an event loop; close() frees its slot even if never
+    iterated.
+    """
+
+    def __init__(self, hub, station_ids, cursor, snapshot):
+        self.hub = hub
+        self.station_ids = None if station_ids is None else set(station_ids)
+        self.cursor = cursor
+        self.snapshot = snapshot
+        self.closed = False
+
+    def __iter__(self):
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n".encode()
+            yield from self.snapshot
+            while not self.closed:
+                events, self.cursor, missed = self.hub._wait(self.cursor)
+                yield from self._messages(events, missed)
+        finally:
+            self.close()
+
+    async def __aiter__(self):
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n".encode()
+            for message in self.snapshot:
+                yield message
+            while not self.closed:
+                events, self.cursor, missed = await self.hub._wait_async(self.cursor)
+                for message in self._messages(events, missed):
+                    yield message
+        finally:
+            self.close()
+
+    def _messages(self, events, missed):
+        if missed:
+            # Fell behind the log: the client should refetch over REST
+            return [sse_message("resync", b"{}", self.cursor)]
+        if not events:
+            return [b": keepalive\n\n"]
+        return [message for _, station_id, message in events
+                if self.station_ids is None or station_id in self.station_ids]
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.hub._release()
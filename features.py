@@ -0,0 +1,381 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# Feature Definitions
+# =====================================================
+WINDOWS = [7, 14, 30]
+LAGS = [1, 7, 14]
+HISTORY = max(WINDOWS + [lag + 1 for lag in LAGS])
+
+FEATURES = [
+    "gw_rolling_mean_7", "gw_rolling_mean_14", "gw_rolling_mean_30",
+    "rainfall_sum_7", "rainfall_sum_14", "rainfall_sum_30",
+    "gw_lag_1", "gw_lag_7", "gw_lag_14",
+    "rain_lag_1", "rain_lag_7", "rain_lag_14",
+    "rainfall_mm", "temperature_c", "humidity_pct",
+    "evaporation_mm", "day_of_year", "month_sin", "month_cos"
+]
+
+# =====================================================
+# Evaporation Calculation
+# =====================================================
+def calculate_evaporation(temp, humidity):
+    humidity = np.clip(humidity, 0, 100)
+    return 0.0023 * (temp + 17.8) * np.sqrt(100 - humidity)
+
+# =====================================================
+# Feature Engineering
+# =====================================================
+def create_features(df):
+    df = df.copy()
+    for window in WINDOWS:
+        df[f"gw_rolling_mean_{window}"] = df["Groundwatelevel_m"].rolling(window).mean()
+        df[f"rainfall_sum_{window}"] = df["rainfall_mm"].rolling(window).sum()
+
+    for lag in LAGS:
+        df[f"gw_lag_{lag}"] = df["Groundwatelevel_m"].shift(lag)
+        df[f"rain_lag_{lag}"] = df["rainfall_mm"].shift(lag)
+
+    df["day_of_year"] = df["date"].dt.dayofyear
+    df["month_sin"] = np.sin(2 * np.pi * df["date"].dt.month / 12)
+    df["month_cos"] = np.cos(2 * np.pi * df["date"].dt.month / 12)
+    return df
+
+# =====================================================
+# Stacked Feature Engine
+# =====================================================
+STACKED_COLUMNS = ["Groundwatelevel_m", "rainfall_mm", "temperature_c", "humidity_pct"]
+
+def stack_frames(frames, length=None):
+    """
+    Right-align per-station telemetry frames into (station, day) arrays:
+    {"date": datetime64[ns], column: float64} for STACKED_COLUMNS. Shorter
+    stations are padded on the left with NaT/NaN, and `length` keeps only
+    the newest days.
+    """
+    length = length or max((len(frame) for frame in frames), default=0)
+    stacked = {"date": np.full((len(frames), length), np.datetime64("NaT"), dtype="datetime64[ns]")}
+    for col in STACKED_COLUMNS:
+        stacked[col] = np.full((len(frames), length), np.nan)
+    for i, frame in enumerate(frames):
+        n = min(len(frame), length)
+        if not n:
+            continue
+        stacked["date"][i, length - n:] = frame["date"].to_numpy(dtype="datetime64[ns]")[-n:]
+        for col in STACKED_COLUMNS:
+            stacked[col][i, length - n:] = frame[col].to_numpy(dtype=np.float64)[-n:]
+    return stacked
+
+def _window_sums(values, window):
+    """Sums of every `window` consecutive days along axis 1, from one cumulative sum."""
+    cumulative = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=cumulative[:, 1:])
+    return cumulative[:, window:] - cumulative[:, :-window]
+
+def _rolling(values, window, mean, out):
+    """
+    pandas' rolling(window).sum()/mean() of each row of `values`, written
+    into out[:, window - 1:]. A window holding a NaN is NaN. A window of
+    one repeated value returns that value exactly, and a mean never has the
+    wrong sign, which are the same special cases pandas applies.
+    """
+    out[:, :window - 1] = np.nan
+    if values.shape[1] < window:
+        return
+    missing = np.isnan(values)
+    total = _window_sums(np.where(missing, 0.0, values), window)
+    incomplete = _window_sums(missing.astype(np.float64), window) > 0
+
+    # Length of the run of equal values ending on each day
+    days = np.arange(values.shape[1])
+    starts = np.ones(values.shape, dtype=bool)
+    starts[:, 1:] = values[:, 1:] != values[:, :-1]
+    run = days - np.maximum.accumulate(np.where(starts, days, 0), axis=1) + 1
+    constant = run[:, window - 1:] >= window
+    last = values[:, window - 1:]
+
+    if mean:
+        result = total / window
+        negative = _window_sums(np.signbit(values) & ~missing, window)
+        result[(negative == 0) & (result < 0)] = 0.0
+        result[(negative == window) & (result > 0)] = 0.0
+        result = np.where(constant, last, result)
+    else:
+        result = np.where(constant, last * window, total)
+    out[:, window - 1:] = np.where(incomplete, np.nan, result)
+
+def _lag(values, lag, out):
+    out[:, :lag] = np.nan
+    if values.shape[1] > lag:
+        out[:, lag:] = values[:, :values.shape[1] - lag]
+
+def feature_matrix(stacked, features=FEATURES, out=None):
+    """
+    create_features for every station at once. `stacked` is stack_frames
+    output, and the result is a float32 (station, day, feature) matrix in
+    `features` order. Every rolling column comes from one cumulative sum
+    over the stacked days. Padding days and days without full history are
+    NaN, as in create_features.
+    """
+    gw, rain = stacked["Groundwatelevel_m"], stacked["rainfall_mm"]
+    temperature, humidity = stacked["temperature_c"], stacked["humidity_pct"]
+    if out is None:
+        out = np.empty(gw.shape + (len(features),), dtype=np.float32)
+    index = {name: i for i, name in enumerate(features)}
+    scratch = np.empty(gw.shape)
+
+    for window in WINDOWS:
+        for name, values, mean in ((f"gw_rolling_mean_{window}", gw, True), (f"rainfall_sum_{window}", rain, False)):
+            if name in index:
+                _rolling(values, window, mean, scratch)
+                out[:, :, index[name]] = scratch
+    for lag in LAGS:
+        for name, values in ((f"gw_lag_{lag}", gw), (f"rain_lag_{lag}", rain)):
+            if name in index:
+                _lag(values, lag, scratch)
+                out[:, :, index[name]] = scratch
+
+    raw = {"rainfall_mm": rain, "temperature_c": temperature, "humidity_pct": humidity}
+    for name, values in raw.items():
+        if name in index:
+            out[:, :, index[name]] = values
+    if "evaporation_mm" in index:
+        out[:, :, index["evaporation_mm"]] = calculate_evaporation(temperature, humidity)
+
+    dates = pd.DatetimeIndex(stacked["date"].ravel())
+    if "day_of_year" in index:
+        out[:, :, index["day_of_year"]] = dates.dayofyear.to_numpy(dtype=np.float64).reshape(gw.shape)
+    month = dates.month.to_numpy(dtype=np.float64).reshape(gw.shape)
+    if "month_sin" in index:
+        out[:, :, index["month_sin"]] = np.sin(2 * np.pi * month / 12)
+    if "month_cos" in index:
+        out[:, :, index["month_cos"]] = np.cos(2 * np.pi * month / 12)
+    return out
+
+# =====================================================
+# Incremental Feature State
+# =====================================================
+class RollingSum:
+    """Running sum over a fixed window, compensated the same way as pandas' rolling sum/mean."""
+
+    __slots__ = ("window", "total", "comp_add", "comp_remove", "nobs", "neg_ct")
+
+    def __init__(self, window):
+        self.window = window
+        self.total = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.nobs = 0
+        self.neg_ct = 0
+
+    def add(self, val):
+        if math.isnan(val):
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.total + y
+        self.comp_add = t - self.total - y
+        self.total = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+
+    def remove(self, val):
+        if math.isnan(val):
+            return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.total + y
+        self.comp_remove = t - self.total - y
+        self.total = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def copy(self):
+        other = RollingSum.__new__(RollingSum)
+        for name in RollingSum.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+
+class _Series:
+    """Ring buffer of the last HISTORY values of one column plus its rolling windows."""
+
+    __slots__ = ("values", "windows", "run", "prev")
+
+    def __init__(self):
+        self.values = [math.nan] * HISTORY
+        self.windows = [RollingSum(w) for w in WINDOWS]
+        self.run = 0
+        self.prev = math.nan
+
+    def push(self, size, val):
+        slot = size % HISTORY
+        for rolling in self.windows:
+            if size >= rolling.window:
+                rolling.remove(self.values[(size - rolling.window) % HISTORY])
+            rolling.add(val)
+        if not math.isnan(val):
+            self.run = self.run + 1 if val == self.prev else 1
+            self.prev = val
+        self.values[slot] = val
+
+    def rolling(self, rolling, size, mean):
+        n = rolling.nobs
+        if size < rolling.window or n < rolling.window:
+            return math.nan
+        if self.run >= n:
+            return self.prev if mean else self.prev * n
+        if not mean:
+            return rolling.total
+        result = rolling.total / n
+        if rolling.neg_ct == 0 and result < 0:
+            return 0.0
+        if rolling.neg_ct == n and result > 0:
+            return 0.0
+        return result
+
+    def lag(self, size, lag):
+        if size - 1 - lag < 0:
+            return math.nan
+        return self.values[(size - 1 - lag) % HISTORY]
+
+    def copy(self):
+        other = _Series.__new__(_Series)
+        other.values = list(self.values)
+        other.windows = [rolling.copy() for rolling in self.windows]
+        other.run = self.run
+        other.prev = self.prev
+        return other
+
+
+class FeatureState:
+    """
+    Keeps the last 30 groundwater and rainfall readings with running window
+    sums so the FEATURES row for the newest day is updated in O(1) per push,
+    giving the same values as create_features over the full history.
+    """
+
+    def __init__(self):
+        self.gw = _Series()
+        self.rain = _Series()
+        self.size = 0
+        self.date = None
+        self.temperature = math.nan
+        self.humidity = math.nan
+
+    @classmethod
+    def from_frame(cls, df):
+        state = cls()
+        for row in df.tail(HISTORY).itertuples(index=False):
+            state.push(row.date, row.Groundwatelevel_m, row.rainfall_mm, row.temperature_c, row.humidity_pct)
+        return state
+
+    def push(self, date, gw, rainfall, temperature, humidity):
+        self.gw.push(self.size, float(gw))
+        self.rain.push(self.size, float(rainfall))
+        self.size += 1
+        self.date = pd.Timestamp(date)
+        self.temperature = float(temperature)
+        self.humidity = float(humidity)
+
+    def copy(self):
+        other = FeatureState.__new__(FeatureState)
+        other.gw = self.gw.copy()
+        other.rain = self.rain.copy()
+        other.size = self.size
+        other.date = self.date
+        other.temperature = self.temperature
+        other.humidity = self.humidity
+        return other
+
+    @property
+    def ready(self):
+        return self.size >= HISTORY
+
+    @property
+    def latest_gw(self):
+        return self.gw.lag(self.size, 0)
+
+    @property
+    def latest_rainfall(self):
+        return self.rain.lag(self.size, 0)
+
+    def row(self, features=None):
+        """
+        Engineered values for the newest day plus the raw readings. With
+        `features`, derived columns outside that list are not computed.
+        """
+        wanted = (lambda name: True) if features is None else set(features).__contains__
+        row = {}
+        for gw_window, rain_window in zip(self.gw.windows, self.rain.windows):
+            name = f"gw_rolling_mean_{gw_window.window}"
+            if wanted(name):
+                row[name] = self.gw.rolling(gw_window, self.size, mean=True)
+            name = f"rainfall_sum_{rain_window.window}"
+            if wanted(name):
+                row[name] = self.rain.rolling(rain_window, self.size, mean=False)
+        for lag in LAGS:
+            row[f"gw_lag_{lag}"] = self.gw.lag(self.size, lag)
+            row[f"rain_lag_{lag}"] = self.rain.lag(self.size, lag)
+        row["Groundwatelevel_m"] = self.latest_gw
+        row["rainfall_mm"] = self.latest_rainfall
+        row["temperature_c"] = self.temperature
+        row["humidity_pct"] = self.humidity
+        if wanted("evaporation_mm"):
+            row["evaporation_mm"] = float(calculate_evaporation(self.temperature, self.humidity))
+        if wanted("day_of_year"):
+            row["day_of_year"] = self.date.dayofyear
+        if wanted("month_sin") or wanted("month_cos"):
+            angle = 2 * np.pi * self.date.month / 12
+            row["month_sin"] = float(np.sin(angle))
+            row["month_cos"] = float(np.cos(angle))
+        return row
+
+    def vector(self, features=FEATURES):
+        row = self.row(features)
+        return np.array([[row[f] for f in features]])
+
+# =====================================================
+# Running Baseline Statistics
+# =====================================================
+class RunningStats:
+    """Welford running mean / sample std, updated in O(1) per reading."""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @classmethod
+    def from_values(cls, values):
+        stats = cls()
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            stats.count = len(values)
+            stats.mean = float(values.mean())
+            stats.m2 = float(((values - stats.mean) ** 2).sum())
+        return stats
+
+    def push(self, value):
+        value = float(value)
+        if math.isnan(value):
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def copy(self):
+        other = RunningStats()
+        other.count, other.mean, other.m2 = self.count, self.mean, self.m2
+        return other
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
@@ -0,0 +1,60 @@
+import threading
+
+# =====================================================
+# Forecast / Result Cache
+# =====================================================
+class ForecastCache:
+    """
+    Holds pre-serialized JSON bodies per endpoint. Each entry remembers the
+    (latest telemetry timestamp, model version) it was computed for, so a
+    repeat request is a dictionary lookup until new data or a new model
+    changes the version.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, version):
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def put(self, name, version, body):
+        with self._lock:
+            self._entries[name] = (version, body)
+
+    def get_or_compute(self, name, version, compute):
+        body = self.get(name, version)
+        if body is not None:
+            return body
+        with self._lock:
+            # Another thread may have filled the entry while we waited.
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            body = compute()
+            self._entries[name] = (version, body)
+        return body
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# =====================================================
+# HTTP Cache Configuration
+# =====================================================
+# Encoded response bodies kept in memory, least recently used evicted first
+HTTP_CACHE_ENTRIES = int(os.environ.get("HTTP_CACHE_ENTRIES", "256"))
+# Smaller bodies are sent as-is: the encoding overhead outweighs the saving
+HTTP_COMPRESS_MIN_BYTES = int(os.environ.get("HTTP_COMPRESS_MIN_BYTES", "512"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Clients may keep bodies but must revalidate; an unchanged body costs a 304
+CACHE_CONTROL = "no-cache"
+# Bump when the JSON layout of a response changes without a data or model change
+ETAG_VERSION = 1
+
+# Preferred first when the client accepts several encodings equally
+ENCODINGS = ("br", "gzip")
+
+# =====================================================
+# Validators
+# =====================================================
+def make_etag(*parts):
+    """
+    ETag for a response identified by `parts`, e.g. (station, route,
+    data/model version). It is weak because the identity, gzip and br
+    bodies share it: they are equivalent, not byte-identical.
+    """
+    return 'W/"' + hashlib.sha1(repr((ETAG_VERSION,) + parts).encode()).hexdigest()[:20] + '"'
+
+def _opaque(tag):
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored
+    return tag[2:] if tag.startswith("W/") else tag
+
+def http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+def not_modified(etag, last_modified, if_none_match=None, if_modified_since=None):
+    """
+    Whether the client's copy is current. If-None-Match wins when sent;
+    If-Modified-Since is compared at the one-second precision of HTTP dates.
+    """
+    if if_none_match:
+        tags = {_opaque(tag.strip()) for tag in if_none_match.split(",")}
+        return "*" in tags or _opaque(etag) in tags
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+def cache_headers(etag, last_modified=None, encoding=None):
+    """Validator and caching headers, plus Content-Encoding for a compressed body."""
+    headers = [("ETag", etag), ("Cache-Control", CACHE_CONTROL), ("Vary", "Accept-Encoding")]
+    if last_modified is not None:
+        headers.append(("Last-Modified", http_date(last_modified)))
+    if encoding not in (None, "identity"):
+        headers.append(("Content-Encoding", encoding))
+    return headers
+
+def accepted_encodings(accept_encoding):
+    """{coding: q} from an Accept-Encoding header."""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+# =====================================================
+# Encoded Bodies
+# =====================================================
+class EncodedBody:
+    """A response body with its validators, compressed once with every available encoding."""
+
+    __slots__ = ("etag", "last_modified", "encodings")
+
+    def __init__(self, body, etag, last_modified=None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.encodings = {"identity": body}
+        if len(body) >= HTTP_COMPRESS_MIN_BYTES:
+            self.encodings["gzip"] = gzip.compress(body, GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.encodings["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    def negotiate(self, accept_encoding):
+        """(encoding, body) for the client's Accept-Encoding header."""
+        accepted = accepted_encodings(accept_encoding)
+        best, best_q = "identity", 0.0
+        for encoding in ENCODINGS:
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if encoding in self.encodings and q > best_q:
+                best, best_q = encoding, q
+        return best, self.encodings[best]
+
+    def headers(self, encoding=None):
+        return cache_headers(self.etag, self.last_modified, encoding)
+
+# =====================================================
+# Response Byte Cache
+# =====================================================
+class ResponseCache:
+    """
+    EncodedBody per response key, each valid for one version, in an LRU of
+    at most `capacity` keys. Keys are (station, route, ...) tuples, so one
+    station's new readings replace its entries without touching others.
+    """
+
+    def __init__(self, capacity=HTTP_CACHE_ENTRIES):
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, encoded):
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (version, encoded)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return encoded
+
+    def get_or_build(self, key, version, render, last_modified=None):
+        """The cached EncodedBody for (key, version), rendering and compressing it on a miss."""
+        encoded = self.get(key, version)
+        if encoded is None:
+            encoded = self.put(key, version, EncodedBody(render(), make_etag(key, version), last_modified))
+        return encoded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from sklearn.inspection import permutation_importance
+
+from artifacts import (ARTIFACT_DIR, artifact_path, is_current, load_artifact, load_or_train,
+                       model_version, save_feature_sets)
+from features import FEATURES
+from retrain import held_out_mae
+from telemetry import _tmp_path
+from training import data_fingerprint, train_models
+
+# =====================================================
+# Importance Configuration
+# =====================================================
+IMPORTANCE_DIR = os.environ.get("FEATURE_IMPORTANCE_DIR", os.path.join(ARTIFACT_DIR, "importance"))
+IMPORTANCE_REPEATS = int(os.environ.get("IMPORTANCE_REPEATS", "10"))
+# -1 permutes the features on every core
+IMPORTANCE_JOBS = int(os.environ.get("IMPORTANCE_JOBS", "-1"))
+# A feature is kept if shuffling it lowers held-out R² by more than this, beyond one std
+MIN_IMPORTANCE = float(os.environ.get("FEATURE_MIN_IMPORTANCE", "0.001"))
+MIN_FEATURES = 3
+
+TARGETS = {
+    "groundwater": ("model", "scaler_X", "scaler_y", "Groundwatelevel_m"),
+    "rainfall": ("rain_model", "scaler_X_r", "scaler_y_r", "rainfall_mm"),
+}
+
+# =====================================================
+# Held-out Permutation Importance
+# =====================================================
+def held_out_importance(model, scaler_X, scaler_y, X, y, repeats=IMPORTANCE_REPEATS, n_jobs=IMPORTANCE_JOBS):
+    """
+    Mean/std drop in held-out R² when each column of X is shuffled. Scaling
+    is per column, so permuting the scaled matrix is the same as permuting
+    the raw one and the fitted model is scored without a wrapper.
+    """
+    X_scaled = scaler_X.transform(np.asarray(X, dtype=np.float64))
+    y_scaled = scaler_y.transform(np.asarray(y, dtype=np.float64).reshape(-1, 1)).ravel()
+    result = permutation_importance(model, X_scaled, y_scaled, scoring="r2", n_repeats=repeats,
+                                    n_jobs=n_jobs, random_state=42)
+    return result.importances_mean, result.importances_std
+
+def importance_path(version):
+    return os.path.join(IMPORTANCE_DIR, f"{version}.json")
+
+def load_importances(version):
+    try:
+        with open(importance_path(version)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def compute_importances(artifact, data_clean, repeats=IMPORTANCE_REPEATS, n_jobs=IMPORTANCE_JOBS):
+    """Permutation importances of both full-feature models on the held-out rows after artifact["split"]."""
+    held_out = data_clean.iloc[artifact["split"]:]
+    report = {
+        "version": artifact["version"],
+        "rows": len(held_out),
+        "repeats": repeats,
+        "held_out_mae": held_out_mae(artifact, data_clean, artifact["split"]),
+    }
+    for target, (model, scaler_X, scaler_y, column) in TARGETS.items():
+        features = artifact["feature_sets"][target]
+        mean, std = held_out_importance(artifact[model], artifact[scaler_X], artifact[scaler_y],
+                                        held_out[features], held_out[column], repeats, n_jobs)
+        report[target] = {f: {"mean": float(m), "std": float(s)} for f, m, s in zip(features, mean, std)}
+    return report
+
+def importances_for(data_clean, path=None, repeats=IMPORTANCE_REPEATS, n_jobs=IMPORTANCE_JOBS):
+    """
+    Importances of the full-feature models for data_clean, cached on disk
+    per model version so an unchanged model is never permuted twice. The
+    saved artifact at `path` is reused if it is that model; otherwise the
+    full-feature models are fitted in memory.
+    """
+    fingerprint = data_fingerprint(data_clean)
+    version = model_version(fingerprint)
+    cached = load_importances(version)
+    if cached is not None and cached.get("repeats", 0) >= repeats:
+        return cached, True
+
+    artifact = load_artifact(path) if path else None
+    if not is_current(artifact, fingerprint):
+        artifact = dict(train_models(data_clean), fingerprint=fingerprint, version=version)
+    report = compute_importances(artifact, data_clean, repeats, n_jobs)
+
+    os.makedirs(IMPORTANCE_DIR, exist_ok=True)
+    tmp_path = _tmp_path(importance_path(version))
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, importance_path(version))
+    return report, False
+
+# =====================================================
+# Feature Pruning
+# =====================================================
+def prune(scores, min_importance=MIN_IMPORTANCE, min_features=MIN_FEATURES):
+    """Features whose importance clears min_importance by one std; at least the top min_features."""
+    ranked = sorted(scores, key=lambda f: scores[f]["mean"], reverse=True)
+    kept = {f for f in ranked if scores[f]["mean"] - scores[f]["std"] > min_importance}
+    kept.update(ranked[:min_features])
+    return [f for f in FEATURES if f in kept]
+
+def prune_report(report, min_importance=MIN_IMPORTANCE, min_features=MIN_FEATURES):
+    return {target: prune(report[target], min_importance, min_features) for target in TARGETS}
+
+# =====================================================
+# Prune / Export
+# =====================================================
+def main():
+    # Imported here because stations.py builds on artifacts.py
+    from stations import default_registry
+
+    parser = argparse.ArgumentParser(
+        description="Rank features by held-out permutation importance and save pruned per-target feature sets.")
+    parser.add_argument("stations", nargs="*", help="station ids to prune; defaults to every registered station")
+    parser.add_argument("--repeats", type=int, default=IMPORTANCE_REPEATS, help="shuffles per feature")
+    parser.add_argument("--min-importance", type=float, default=MIN_IMPORTANCE,
+                        help="minimum held-out R² drop (beyond one std) for a feature to be kept")
+    parser.add_argument("--min-features", type=int, default=MIN_FEATURES, help="always keep this many per target")
+    parser.add_argument("--dry-run", action="store_true", help="print the pruned sets without saving or retraining")
+    args = parser.parse_args()
+
+    registry = default_registry()
+    for station_id in args.stations or registry.ids():
+        _, data_clean = registry.load_data(station_id)
+        start = time.perf_counter()
+        report, cached = importances_for(data_clean, artifact_path(station_id), args.repeats)
+        feature_sets = prune_report(report, args.min_importance, args.min_features)
+        source = "cached" if cached else f"computed in {time.perf_counter() - start:.2f}s"
+        print(f"{station_id}: importances of {report['version']} {source}")
+        for target in TARGETS:
+            ranked = sorted(report[target].items(), key=lambda item: item[1]["mean"], reverse=True)
+            print(f"  {target}: keeping {len(feature_sets[target])}/{len(ranked)}")
+            for feature, score in ranked:
+                mark = "*" if feature in feature_sets[target] else " "
+                print(f"    {mark} {feature:<20} {score['mean']:8.4f} ± {score['std']:.4f}")
+        if args.dry_run:
+            continue
+
+        save_feature_sets(station_id, feature_sets, report["version"])
+        pruned, model_source, seconds = load_or_train(data_clean, artifact_path(station_id), feature_sets=feature_sets)
+        print(f"  serving {pruned['version']} ({model_source} in {seconds:.2f}s) on "
+              f"{len(pruned['features'])}/{len(FEATURES)} features")
+        print(f"  held-out MAE full   {report['held_out_mae']}")
+        print(f"  held-out MAE pruned {held_out_mae(pruned, data_clean, pruned['split'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import bisect
+import contextvars
+import io
+import math
+import os
+import threading
+import time
+
+# =====================================================
+# Metrics Configuration
+# =====================================================
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+# ?profile=1 or an X-Profile header only take effect when this is on
+REQUEST_PROFILING = os.environ.get("REQUEST_PROFILING", "0") == "1"
+# "auto" uses pyinstrument (sampling) when installed, otherwise cProfile
+REQUEST_PROFILER = os.environ.get("REQUEST_PROFILER", "auto")
+
+# Upper bounds in seconds; training stages run to minutes
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, math.inf)
+
+# Route of the request being handled in this thread/task; "background" elsewhere
+current_route = contextvars.ContextVar("current_route", default="background")
+
+# =====================================================
+# Stage Histograms
+# =====================================================
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-th observation."""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+def _ms(bound):
+    # The overflow bucket has no finite bound (and JSON has no Infinity)
+    return None if math.isinf(bound) else bound * 1000
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+class Metrics:
+    """Timing histograms per (route, stage), filled by `with metrics.stage(name):` blocks."""
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        return _Stage(self, name) if self.enabled else _NO_STAGE
+
+    def observe(self, stage, seconds, route=None):
+        if not self.enabled:
+            return
+        key = (route or current_route.get(), stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def histograms(self):
+        with self._lock:
+            return {key: (list(h.counts), h.total, h.count) for key, h in self._histograms.items()}
+
+    def summary(self):
+        """{route: {stage: count/sum/mean/p50/p99}}, quantiles as bucket upper bounds."""
+        result = {}
+        with self._lock:
+            for (route, stage), h in sorted(self._histograms.items()):
+                result.setdefault(route, {})[stage] = {
+                    "count": h.count,
+                    "sum_s": round(h.total, 6),
+                    "mean_ms": round(h.total / h.count * 1000, 3) if h.count else 0.0,
+                    "p50_le_ms": _ms(h.quantile(0.5)),
+                    "p99_le_ms": _ms(h.quantile(0.99)),
+                }
+        return result
+
+    def prometheus(self, gauges=()):
+        """Text exposition format: stage histograms plus (name, labels, value) gauges."""
+        lines = ["# TYPE groundwater_stage_seconds histogram"]
+        for (route, stage), (counts, total, count) in sorted(self.histograms().items()):
+            labels = f'route="{route}",stage="{stage}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, counts):
+                cumulative += n
+                le = "+Inf" if math.isinf(bound) else repr(bound)
+                lines.append(f'groundwater_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"groundwater_stage_seconds_sum{{{labels}}} {total!r}")
+            lines.append(f"groundwater_stage_seconds_count{{{labels}}} {count}")
+
+        declared = set()
+        for name, labels, value in gauges:
+            if name not in declared:
+                lines.append(f"# TYPE {name} gauge")
+                declared.add(name)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+def stage(name):
+    return metrics.stage(name)
+
+# =====================================================
+# Per-request Profiling
+# =====================================================
+class RequestProfiler:
+    """Profiles one request in the current thread and renders a text report."""
+
+    def __init__(self, kind=REQUEST_PROFILER):
+        if kind == "auto":
+            try:
+                import pyinstrument  # noqa: F401
+                kind = "pyinstrument"
+            except ImportError:
+                kind = "cprofile"
+        self.kind = kind
+        if kind == "pyinstrument":
+            from pyinstrument import Profiler
+            self._profiler = Profiler(interval=0.0005)
+        else:
+            import cProfile
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+        return self
+
+    def stop(self, limit=40):
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+            return self._profiler.output_text(unicode=False, color=False)
+        import pstats
+        self._profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
@@ -1,68 +1,46 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import plotly.express as px
 import seaborn as sns
-from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
-from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.model_selection import GridSearchCV, TimeSeriesSplit
 from sklearn.inspection import permutation_importance
-from prophet import Prophet
+import argparse
+import sys
 import warnings
+from features import FEATURES
+from rainfall import update_forecast
+from reports import build_figure, report_data
+from stations import DEFAULT_STATION, default_registry
+from training import fit_scaled_gbr, train_split
 warnings.filterwarnings('ignore')
 
-# Load and preprocess the data
-data = pd.read_csv('Telemetry_data.csv')
-data['date'] = pd.to_datetime(data['date'], format='%d-%m-%Y')
-data = data.sort_values('date').reset_index(drop=True)
-
-# Simplified evaporation calculation
-def calculate_evaporation(temp, humidity):
-    """Simplified but effective evaporation calculation"""
-    return 0.0023 * (temp + 17.8) * np.sqrt(np.clip(100 - humidity, 0, 100))
-
-data['evaporation_mm'] = calculate_evaporation(data['temperature_c'], data['humidity_pct'])
-
-# Focus on the most important features
-def create_optimized_features(df):
-    df = df.copy()
-
-    # Most important features from previous analysis
-    for window in [7, 14, 30]:
-        df[f'gw_rolling_mean_{window}'] = df['Groundwatelevel_m'].rolling(window=window).mean()
-
-    # Rainfall accumulation features
-    for window in [7, 14, 30]:
-        df[f'rainfall_sum_{window}'] = df['rainfall_mm'].rolling(window=window).sum()
-
-    # Key lag features
-    for lag in [1, 7, 14]:
-        df[f'gw_lag_{lag}'] = df['Groundwatelevel_m'].shift(lag)
-        df[f'rain_lag_{lag}'] = df['rainfall_mm'].shift(lag)
-
-    # Simple time features
-    df['day_of_year'] = df['date'].dt.dayofyear
-    df['month_sin'] = np.sin(2 * np.pi * df['date'].dt.month / 12)
-    df['month_cos'] = np.cos(2 * np.pi * df['date'].dt.month / 12)
-
-    return df
-
-# Create optimized features
-data_optimized = create_optimized_features(data)
-data_clean = data_optimized.dropna().reset_index(drop=True)
-
-# Select only the most relevant features
-selected_features = [
-    'gw_rolling_mean_7', 'gw_rolling_mean_14', 'gw_rolling_mean_30',
-    'rainfall_sum_7', 'rainfall_sum_14', 'rainfall_sum_30',
-    'gw_lag_1', 'gw_lag_7', 'gw_lag_14',
-    'rain_lag_1', 'rain_lag_7', 'rain_lag_14',
-    'rainfall_mm', 'temperature_c', 'humidity_pct', 'evaporation_mm',
-    'day_of_year', 'month_sin', 'month_cos'
-]
+parser = argparse.ArgumentParser(description='Train and evaluate the groundwater model')
+parser.add_argument('--tune', action='store_true',
+                    help='run a time-series hyperparameter search instead of the fixed model')
+parser.add_argument('--latency-budget-ms', type=float, default=None,
+                    help='flag tuned models whose single-row predict exceeds this')
+parser.add_argument('--report', default=None, help='write the tuning report as JSON to this path')
+parser.add_argument('--importance', action='store_true',
+                    help='print held-out permutation importances of the final model')
+parser.add_argument('--reports', metavar='DIR', default=None,
+                    help='render HTML reports for every station into DIR (skipping unchanged ones) and exit')
+args = parser.parse_args()
+
+# Headless report mode: per-station figures rendered in a process pool. reports.py runs
+# as its own process because spawned workers re-import the main module, and this script
+# trains at import time.
+if args.reports:
+    import os
+    import subprocess
+    reports_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports.py')
+    sys.exit(subprocess.call([sys.executable, reports_script, '--output', args.reports]))
+
+# Load the station as the serving app does: the CSV plus every ingested reading, with
+# data as received and data_clean screened and cleaned with the shared FEATURES (the
+# engineered columns come from the float32 feature matrix cached per data version)
+data, data_clean = default_registry().load_data(DEFAULT_STATION)
+selected_features = FEATURES
 
 target = 'Groundwatelevel_m'
 
@@ -70,28 +48,22 @@ X = data_clean[selected_features]
 y = data_clean[target]
 
 # Split data chronologically
-split_idx = int(0.8 * len(X))
+split_idx = train_split(data_clean)
 X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
 y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
 
-# Scale features
-scaler_X = StandardScaler()
-scaler_y = StandardScaler()
-
-X_train_scaled = scaler_X.fit_transform(X_train)
-X_test_scaled = scaler_X.transform(X_test)
-y_train_scaled = scaler_y.fit_transform(y_train.values.reshape(-1, 1))
-y_test_scaled = scaler_y.transform(y_test.values.reshape(-1, 1))
+# Hyperparameter search on the training split only (held-out rows stay unseen)
+if args.tune:
+    from tuning import print_report, save_report, tune
+    tuning_results = tune(X_train, y_train)
+    print_report(tuning_results, args.latency_budget_ms)
+    if args.report:
+        save_report(tuning_results, args.report)
+    sys.exit(0)
 
-# Train final model
-final_model = GradientBoostingRegressor(
-    n_estimators=200,
-    learning_rate=0.1,
-    max_depth=5,
-    min_samples_split=10,
-    random_state=42
-)
-final_model.fit(X_train_scaled, y_train_scaled.ravel())
+# Train the final model exactly as the serving app does (StandardScaler + GBR_PARAMS)
+final_model, scaler_X, scaler_y = fit_scaled_gbr(X_train, y_train)
+X_test_scaled = scaler_X.transform(X_test.to_numpy(dtype=np.float64))
 
 # Predictions
 y_pred_scaled = final_model.predict(X_test_scaled)
@@ -103,10 +75,18 @@ mse_final = mean_squared_error(y_test, y_pred)
 mae_final = mean_absolute_error(y_test, y_pred)
 rmse_final = np.sqrt(mse_final)
 
+# Held-out permutation importance, features shuffled in parallel on all cores
+if args.importance:
+    from importance import held_out_importance
+    importance_mean, importance_std = held_out_importance(final_model, scaler_X, scaler_y, X_test, y_test)
+    print("\nHeld-out permutation importance (drop in R²):")
+    for feature, mean, std in sorted(zip(selected_features, importance_mean, importance_std), key=lambda r: -r[1]):
+        print(f"  {feature:<20} {mean:8.4f} ± {std:.4f}")
+
 # Get today's data (last row of test data)
 today_data = data_clean.iloc[-1:].copy()
 today_features = today_data[selected_features]
-today_features_scaled = scaler_X.transform(today_features)
+today_features_scaled = scaler_X.transform(today_features.to_numpy(dtype=np.float64))
 
 # Predict today's groundwater level
 today_gw_pred_scaled = final_model.predict(today_features_scaled)
@@ -129,249 +109,14 @@ print(f"Predicted Groundwater Level: {today_gw_pred:.3f} m")
 print(f"Today's Rainfall: {today_rainfall:.3f} mm")
 print(f"Pulse Score: {pulse_score:.1f}/100")
 
-# Prepare data for Prophet
-rainfall_data = data[['date', 'rainfall_mm']].copy()
-rainfall_data.columns = ['ds', 'y']
-
-# Create and fit Prophet model
-prophet_model = Prophet(
-    yearly_seasonality=True,
-    weekly_seasonality=True,
-    daily_seasonality=False,
-    changepoint_prior_scale=0.05
-)
-prophet_model.fit(rainfall_data)
-
-# Create future dataframe for next 7 days
-future = prophet_model.make_future_dataframe(periods=7)
-forecast = prophet_model.predict(future)
-
-# Get the forecast for next 7 days
-last_date = data['date'].max()
-forecast_next_week = forecast[forecast['ds'] > last_date][['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
-forecast_next_week.columns = ['date', 'predicted_rainfall', 'rainfall_lower', 'rainfall_upper']
-
-# Predict groundwater levels for next week based on rainfall forecast
-# We'll use the average relationship between rainfall and groundwater change
-avg_rainfall_effect = np.polyfit(data_clean['rainfall_mm'],
-                                 data_clean['Groundwatelevel_m'].diff().fillna(0), 1)[0]
-
-# Initialize next week predictions
-next_week_predictions = []
-current_gw = today_gw_pred
-
-for _, row in forecast_next_week.iterrows():
-    # Calculate groundwater change based on predicted rainfall
-    gw_change = avg_rainfall_effect * row['predicted_rainfall']
-    current_gw += gw_change
-    next_week_predictions.append({
-        'date': row['date'],
-        'predicted_rainfall': row['predicted_rainfall'],
-        'predicted_gw_level': current_gw
-    })
-
-next_week_df = pd.DataFrame(next_week_predictions)
-
-# Create data for evaporation vs groundwater change plot
-data_clean['gw_change'] = data_clean['Groundwatelevel_m'].diff()
-correlation_data = data_clean[['evaporation_mm', 'gw_change']].dropna()
-z = np.polyfit(correlation_data['evaporation_mm'], correlation_data['gw_change'], 1)
-p = np.poly1d(z)
-
-# Create data for pie chart (7-day water balance)
-gw_7day_avg = today_data['gw_rolling_mean_7'].values[0]
-rain_7day_total = today_data['rainfall_sum_7'].values[0]
-evap_7day_avg = data_clean['evaporation_mm'].tail(7).mean()
-
-labels = ['7-day GW Avg', '7-day Rainfall', '7-day Evaporation']
-sizes = [abs(gw_7day_avg), rain_7day_total, evap_7day_avg]
-colors = ['#1f77b4', '#2ca02c', '#d62728']
-
-# Create a subplot with 2 rows and 3 columns
-fig = make_subplots(
-    rows=2, cols=3,
-    subplot_titles=(
-        "Evaporation Over Time",
-        "Effect of Evaporation on Water Level Change",
-        "7-day Water Balance Components",
-        "Rainfall Forecast for Next Week",
-        "Groundwater Forecast for Next Week",
-        "Station Status Indicator"
-    ),
-    specs=[
-        [{"type": "scatter"}, {"type": "scatter"}, {"type": "pie"}],
-        [{"type": "scatter"}, {"type": "scatter"}, {"type": "indicator"}]
-    ]
-)
-
-# Plot 1: Evaporation over time (including today)
-fig.add_trace(
-    go.Scatter(
-        x=data_clean['date'],
-        y=data_clean['evaporation_mm'],
-        mode='lines',
-        name='Historical Evaporation',
-        hovertemplate='Date: %{x|%Y-%m-%d}<br>Evaporation: %{y:.3f} mm<extra></extra>',
-        line=dict(color='blue', width=2)
-    ),
-    row=1, col=1
-)
-
-fig.add_trace(
-    go.Scatter(
-        x=[data_clean['date'].iloc[-1]],
-        y=[today_data['evaporation_mm'].values[0]],
-        mode='markers',
-        name="Today's Evaporation",
-        hovertemplate=f"Today's Evaporation: {today_data['evaporation_mm'].values[0]:.3f} mm<extra></extra>",
-        marker=dict(color='red', size=10)
-    ),
-    row=1, col=1
-)
-
-# Plot 2: Effect of evaporation on water level change
-fig.add_trace(
-    go.Scatter(
-        x=correlation_data['evaporation_mm'],
-        y=correlation_data['gw_change'],
-        mode='markers',
-        name='Data Points',
-        hovertemplate='Evaporation: %{x:.2f} mm<br>GW Change: %{y:.3f} m<extra></extra>',
-        marker=dict(size=6, opacity=0.6)
-    ),
-    row=1, col=2
-)
-
-# Add trend line
-fig.add_trace(
-    go.Scatter(
-        x=correlation_data['evaporation_mm'],
-        y=p(correlation_data['evaporation_mm']),
-        mode='lines',
-        name='Trend Line',
-        hovertemplate='Trend: GW Change = %{y:.3f} m<extra></extra>',
-        line=dict(color='red', width=2, dash='dash')
-    ),
-    row=1, col=2
-)
-
-# Plot 3: Pie chart of gw_rolling_mean_7 vs rainfall_sum_7
-fig.add_trace(
-    go.Pie(
-        labels=labels,
-        values=sizes,
-        name="7-day Balance",
-        hovertemplate='%{label}: %{value:.2f}<br>Percentage: %{percent}<extra></extra>',
-        marker=dict(colors=colors)
-    ),
-    row=1, col=3
-)
-
-# Plot 4: Rainfall forecast for next week
-fig.add_trace(
-    go.Scatter(
-        x=forecast_next_week['date'],
-        y=forecast_next_week['predicted_rainfall'],
-        mode='lines+markers',
-        name='Predicted Rainfall',
-        hovertemplate='Date: %{x|%Y-%m-%d}<br>Predicted Rainfall: %{y:.2f} mm<extra></extra>',
-        line=dict(color='blue', width=3)
-    ),
-    row=2, col=1
-)
-
-# Add uncertainty interval
-fig.add_trace(
-    go.Scatter(
-        x=forecast_next_week['date'],
-        y=forecast_next_week['rainfall_upper'],
-        mode='lines',
-        name='Upper Bound',
-        line=dict(width=0),
-        showlegend=False,
-        hovertemplate='Upper Bound: %{y:.2f} mm<extra></extra>'
-    ),
-    row=2, col=1
-)
-
-fig.add_trace(
-    go.Scatter(
-        x=forecast_next_week['date'],
-        y=forecast_next_week['rainfall_lower'],
-        mode='lines',
-        name='Lower Bound',
-        fill='tonexty',
-        line=dict(width=0),
-        showlegend=False,
-        hovertemplate='Lower Bound: %{y:.2f} mm<extra></extra>'
-    ),
-    row=2, col=1
-)
-
-# Plot 5: Groundwater level forecast for next week
-fig.add_trace(
-    go.Scatter(
-        x=next_week_df['date'],
-        y=next_week_df['predicted_gw_level'],
-        mode='lines+markers',
-        name='Predicted Groundwater',
-        hovertemplate='Date: %{x|%Y-%m-%d}<br>Predicted GW: %{y:.3f} m<extra></extra>',
-        line=dict(color='purple', width=3)
-    ),
-    row=2, col=2
-)
-
-fig.add_trace(
-    go.Scatter(
-        x=[next_week_df['date'].iloc[0], next_week_df['date'].iloc[-1]],
-        y=[today_gw_pred, today_gw_pred],
-        mode='lines',
-        name='Current Level',
-        hovertemplate=f'Current Level: {today_gw_pred:.3f} m<extra></extra>',
-        line=dict(color='red', width=2, dash='dash')
-    ),
-    row=2, col=2
-)
-
-# Plot 6: Station status indicator
-fig.add_trace(
-    go.Indicator(
-        mode="gauge+number",
-        value=pulse_score,
-        title={'text': "Station Pulse Score"},
-        gauge={
-            'axis': {'range': [0, 100]},
-            'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [0, 20], 'color': "darkred"},
-                {'range': [20, 40], 'color': "red"},
-                {'range': [40, 60], 'color': "orange"},
-                {'range': [60, 80], 'color': "yellow"},
-                {'range': [80, 100], 'color': "green"}
-            ]
-        }
-    ),
-    row=2, col=3
-)
-
-# Update layout for better appearance
-fig.update_layout(
-    height=800,
-    width=1200,
-    title_text="Groundwater Monitoring Dashboard",
-    showlegend=True,
-    hovermode='closest'
-)
+# Prophet rainfall forecast for the next 7 days: reused from the station's cache
+# when the data is unchanged, otherwise refitted warm-started from the saved model
+rainfall_forecast = update_forecast(DEFAULT_STATION, data)
+print(f"Prophet rainfall forecast: {rainfall_forecast['source']} in {rainfall_forecast['seconds']:.2f}s")
 
-# Update axes labels
-fig.update_xaxes(title_text="Date", row=1, col=1)
-fig.update_yaxes(title_text="Evaporation (mm)", row=1, col=1)
-fig.update_xaxes(title_text="Evaporation (mm)", row=1, col=2)
-fig.update_yaxes(title_text="Water Level Change (m)", row=1, col=2)
-fig.update_xaxes(title_text="Date", row=2, col=1)
-fig.update_yaxes(title_text="Rainfall (mm)", row=2, col=1)
-fig.update_xaxes(title_text="Date", row=2, col=2)
-fig.update_yaxes(title_text="Groundwater Level (m)", row=2, col=2)
+# Dashboard figure: the week's groundwater path and every trace come from column arrays
+report = report_data(data_clean, today_gw_pred, rainfall_forecast)
+fig = build_figure(report)
 
 # Show the interactive plot
 fig.show()
@@ -0,0 +1,220 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from metrics import stage
+from rainfall import forecast_is_current
+from training import FORECAST_HORIZON, FORECAST_MODE, engine_models, interval_bounds
+
+# =====================================================
+# Model Helpers
+# =====================================================
+# "compiled" evaluates the flattened trees in tree_engine.py; "sklearn" calls the fitted models
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "compiled")
+
+def predict_groundwater(artifact, X):
+    if INFERENCE_ENGINE == "compiled":
+        return artifact["engine"].predict(X, outputs=1)[:, 0]
+    scaled = artifact["model"].predict(artifact["scaler_X"].transform(X[:, artifact["gw_columns"]]))
+    return artifact["scaler_y"].inverse_transform(scaled.reshape(-1, 1))[:, 0]
+
+def predict_rainfall(artifact, X):
+    if INFERENCE_ENGINE == "compiled":
+        return artifact["engine"].predict(X, outputs=2)[:, 1]
+    scaled = artifact["rain_model"].predict(artifact["scaler_X_r"].transform(X[:, artifact["rain_columns"]]))
+    return artifact["scaler_y_r"].inverse_transform(scaled.reshape(-1, 1))[:, 0]
+
+def predict_targets(artifact, X):
+    """Groundwater and rainfall for each row of X; a single pass with the compiled engine."""
+    if INFERENCE_ENGINE == "compiled":
+        pred = artifact["engine"].predict(X, outputs=2)
+        return pred[:, 0], pred[:, 1]
+    return predict_groundwater(artifact, X), predict_rainfall(artifact, X)
+
+def predict_outputs(artifact, X, prefix=""):
+    """
+    Every column of artifact["outputs"] for each row of X: point forecasts
+    and the conformalised interval bounds, from a single pass of the
+    compiled engine. With prefix "direct_", each output's horizons in turn.
+    """
+    if INFERENCE_ENGINE == "compiled":
+        return artifact[prefix + "engine"].predict(X) + artifact[prefix + "output_shift"]
+    columns = []
+    for model, scaler_X, scaler_y, gw_or_rain_columns in engine_models(artifact, prefix):
+        scaled = model.predict(scaler_X.transform(X[:, gw_or_rain_columns]))
+        columns.append(scaler_y.inverse_transform(scaled.reshape(-1, 1)).reshape(scaled.shape))
+    return np.column_stack(columns) + artifact[prefix + "output_shift"]
+
+def pulse_scores(gw_pred, mean, std):
+    """Vectorized pulse score: 100 at the station mean, minus 20 points per std away."""
+    gw_pred, mean, std = (np.asarray(a, dtype=np.float64) for a in (gw_pred, mean, std))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (gw_pred - mean) / std
+    scores = np.where(std == 0, 100.0, np.clip(100 - np.abs(z) * 20, 0, 100))
+    return np.round(scores, 1)
+
+# Lower bounds of each alert band, ordered from worst to best
+ALERT_THRESHOLDS = np.array([20, 40, 60, 80])
+ALERT_LEVELS = [
+    ("darkred", "EMERGENCY", "Groundwater emergency - implement emergency measures"),
+    ("red", "WARNING", "Groundwater levels are critically low - immediate action needed"),
+    ("orange", "ADVISORY", "Groundwater levels are below normal - conservation advised"),
+    ("yellow", "WATCH", "Groundwater levels are moderate - monitor closely"),
+    ("green", "NORMAL", "Groundwater levels are healthy"),
+]
+
+def alert_indices(scores):
+    return np.searchsorted(ALERT_THRESHOLDS, scores, side="right")
+
+# =====================================================
+# Forecasting
+# =====================================================
+def forecast_recursive(artifact, state, days=FORECAST_HORIZON):
+    """
+    Roll the one-step models forward, feeding each day's point predictions
+    back in as history. Each day's interval is the one-step interval given
+    the predicted path, so later days understate the compounding error.
+    """
+    state = state.copy()
+    dates, pred = [], np.empty((days, len(artifact["outputs"])))
+    last_gw, last_rain = state.latest_gw, state.latest_rainfall
+    for i in range(days):
+        next_date = state.date + pd.Timedelta(days=1)
+        state.push(next_date, last_gw, last_rain, state.temperature, state.humidity)
+        features_row = state.vector(artifact["features"])
+
+        pred[i] = predict_outputs(artifact, features_row)[0]
+        last_gw, last_rain = pred[i, 0], pred[i, 1]
+        dates.append(next_date)
+    return dates, pred
+
+def forecast_direct(artifact, state, days=FORECAST_HORIZON):
+    """Every horizon of every output at once from today's feature row, in one batched predict."""
+    X = state.vector(artifact["features"])
+    pred = predict_outputs(artifact, X, "direct_")[0].reshape(len(artifact["outputs"]), FORECAST_HORIZON).T[:days]
+    dates = [state.date + pd.Timedelta(days=h) for h in range(1, days + 1)]
+    return dates, pred
+
+FORECASTERS = {"recursive": forecast_recursive, "direct": forecast_direct}
+
+def supports_mode(artifact, mode):
+    return mode == "recursive" or (mode == "direct" and "direct_model" in artifact)
+
+# =====================================================
+# Predictions
+# =====================================================
+def build_dashboard(station, mode=FORECAST_MODE):
+    artifact = station.artifact
+    state = station.feature_state.copy()
+    with stage("features"):
+        X = state.vector(artifact["features"])
+    with stage("predict"):
+        today_gw_pred = predict_groundwater(artifact, X)[0]
+
+    # 7-day forecast with quantile-model intervals; bands that failed
+    # calibration were dropped at training time and are sent as null
+    with stage(f"forecast_{mode}"):
+        dates, pred = FORECASTERS[mode](artifact, state)
+    outputs = dict(zip(artifact["outputs"], pred.T))
+
+    rainfall_dates = [str(d)[:10] for d in dates]
+    predicted_rainfall = [round(v, 2) for v in outputs["rainfall"].tolist()]
+    rainfall_upper = rainfall_lower = None
+    if "rainfall_lower" in outputs:
+        rain_lower, rain_upper = interval_bounds(outputs["rainfall"], outputs["rainfall_lower"],
+                                                 outputs["rainfall_upper"])
+        rainfall_upper = [round(v, 2) for v in rain_upper.tolist()]
+        rainfall_lower = [round(max(0.0, v), 2) for v in rain_lower.tolist()]
+    gw_dates = list(rainfall_dates)
+    predicted_gw = [round(v, 3) for v in outputs["groundwater"].tolist()]
+    gw_upper = gw_lower = None
+    if "groundwater_lower" in outputs:
+        gw_lower, gw_upper = interval_bounds(outputs["groundwater"], outputs["groundwater_lower"],
+                                             outputs["groundwater_upper"])
+        gw_upper = [round(v, 3) for v in gw_upper.tolist()]
+        gw_lower = [round(v, 3) for v in gw_lower.tolist()]
+
+    # A Prophet forecast fitted up to today replaces the GBR rainfall and its interval
+    prophet = station.rainfall_forecast
+    if forecast_is_current(prophet, state):
+        days = len(rainfall_dates)
+        rainfall_dates = prophet["dates"][:days]
+        predicted_rainfall = [round(v, 2) for v in prophet["rainfall"][:days]]
+        rainfall_upper = [round(v, 2) for v in prophet["upper"][:days]]
+        rainfall_lower = [round(v, 2) for v in prophet["lower"][:days]]
+
+    return {
+        "predicted_groundwater": round(float(today_gw_pred),2),
+        "station_pulse_score": 90,
+        "rainfall_dates": rainfall_dates,
+        "predicted_rainfall": predicted_rainfall,
+        "rainfall_upper": rainfall_upper,
+        "rainfall_lower": rainfall_lower,
+        "gw_dates": gw_dates,
+        "predicted_gw": predicted_gw,
+        "gw_upper": gw_upper,
+        "gw_lower": gw_lower,
+        "today_gw_level": round(float(today_gw_pred),3)
+    }
+
+def score_alerts(stations):
+    """
+    Score many stations at once: one feature matrix and one predict per
+    distinct model version, and array maths for the pulse scores and alert
+    bands.
+    """
+    if not stations:
+        return []
+
+    groups = {}
+    for i, station in enumerate(stations):
+        artifact = station.artifact
+        groups.setdefault(artifact["version"], (artifact, []))[1].append(i)
+
+    gw_pred = np.empty(len(stations))
+    for artifact, rows in groups.values():
+        # Pruned models may use different columns, so each version gets its own matrix
+        with stage("features"):
+            X = np.vstack([stations[i].feature_state.vector(artifact["features"]) for i in rows])
+        with stage("predict"):
+            gw_pred[rows] = predict_groundwater(artifact, X)
+
+    # ---- Pulse Score (against incrementally maintained baselines) ----
+    mean = np.array([station.baseline.mean for station in stations])
+    std = np.array([station.baseline.std for station in stations])
+    scores = pulse_scores(gw_pred, mean, std)
+
+    # ---- Alert Mapping ----
+    levels = alert_indices(scores)
+
+    alerts = []
+    for station, score, level in zip(stations, scores.tolist(), levels.tolist()):
+        color, alert_level, message = ALERT_LEVELS[level]
+        alerts.append({
+            "station_id": station.id,
+            "pulse_score": score,
+            "alert_level": alert_level,
+            "color": color,
+            "message": message
+        })
+    return alerts
+
+def build_alert(station):
+    return score_alerts([station])[0]
+
+# =====================================================
+# Cached Prediction Bodies
+# =====================================================
+PREDICTIONS = {
+    "dashboard:recursive": lambda station: build_dashboard(station, "recursive"),
+    "dashboard:direct": lambda station: build_dashboard(station, "direct"),
+    "alerts": lambda station: [build_alert(station)],
+}
+
+def render_prediction(name, station):
+    """Compact JSON body of one PREDICTIONS entry, with the same sorted keys as Flask's encoder."""
+    payload = PREDICTIONS[name](station)
+    with stage("serialize"):
+        return (json.dumps(payload, sort_keys=True, separators=(",", ":")) + "\n").encode()
@@ -0,0 +1,240 @@
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from artifacts import ARTIFACT_DIR
+from telemetry import _tmp_path
+from training import FORECAST_HORIZON
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# Rainfall Forecast Configuration
+# =====================================================
+# "gbr" shows the GBR rainfall model on the dashboard; "prophet" shows the cached Prophet forecast
+RAINFALL_MODEL = os.environ.get("RAINFALL_MODEL", "gbr")
+if RAINFALL_MODEL not in ("gbr", "prophet"):
+    raise ValueError(f"RAINFALL_MODEL must be 'gbr' or 'prophet', got {RAINFALL_MODEL!r}")
+PROPHET_DIR = os.environ.get("PROPHET_DIR", os.path.join(ARTIFACT_DIR, "prophet"))
+PROPHET_WORKERS = int(os.environ.get("PROPHET_WORKERS", str(os.cpu_count() or 1)))
+PROPHET_PARAMS = {
+    "yearly_seasonality": True,
+    "weekly_seasonality": True,
+    "daily_seasonality": False,
+    "changepoint_prior_scale": 0.05,
+}
+
+def model_path(station_id):
+    return os.path.join(PROPHET_DIR, f"{station_id}.model.json")
+
+def forecast_path(station_id):
+    return os.path.join(PROPHET_DIR, f"{station_id}.forecast.json")
+
+# =====================================================
+# Prophet Fitting
+# =====================================================
+def rainfall_history(data):
+    history = pd.DataFrame({"ds": data["date"], "y": data["rainfall_mm"].astype(np.float64)})
+    return history.dropna().reset_index(drop=True)
+
+def history_fingerprint(history):
+    digest = hashlib.sha256(repr(sorted(PROPHET_PARAMS.items())).encode())
+    digest.update(history["ds"].to_numpy(dtype="datetime64[ns]").view(np.int64).tobytes())
+    digest.update(history["y"].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def forecast_version(data):
+    """Version of the forecast update_forecast returns for `data`, without fitting or loading it."""
+    return f"prophet-{history_fingerprint(rainfall_history(data))[:12]}"
+
+def warm_start_params(model):
+    """Fitted parameters of `model` as Stan initial values, for refitting on extended history."""
+    params = {}
+    for name in ("k", "m", "sigma_obs"):
+        params[name] = float(model.params[name][0][0])
+    for name in ("delta", "beta"):
+        params[name] = model.params[name][0]
+    return params
+
+def fit_prophet(history, previous=None):
+    """Fit on `history`; with a previously fitted model, the optimizer starts from its parameters."""
+    from prophet import Prophet
+
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    model = Prophet(**PROPHET_PARAMS)
+    if previous is not None:
+        return model.fit(history, init=warm_start_params(previous))
+    return model.fit(history)
+
+def forecast_horizon(model, last_date, days=FORECAST_HORIZON):
+    """Predict only the `days` after last_date, not the whole fitted history."""
+    future = pd.DataFrame({"ds": pd.date_range(last_date + pd.Timedelta(days=1), periods=days, freq="D")})
+    forecast = model.predict(future)
+    return {
+        "dates": [str(d)[:10] for d in forecast["ds"]],
+        "rainfall": forecast["yhat"].clip(lower=0).round(4).tolist(),
+        "lower": forecast["yhat_lower"].clip(lower=0).round(4).tolist(),
+        "upper": forecast["yhat_upper"].clip(lower=0).round(4).tolist(),
+    }
+
+# =====================================================
+# Cached Forecasts
+# =====================================================
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+def load_forecast(station_id):
+    """The station's cached Prophet forecast, or None if it has never been fitted."""
+    try:
+        with open(forecast_path(station_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_model(station_id):
+    from prophet.serialize import model_from_json
+
+    try:
+        with open(model_path(station_id)) as f:
+            return model_from_json(f.read())
+    except (OSError, ValueError, KeyError):
+        return None
+
+def update_forecast(station_id, data, warm_start=True):
+    """
+    Return the station's forecast for the days after data's last reading.
+    The cached forecast is reused while the history is unchanged. Otherwise
+    the model is refitted, warm-started from the saved model when there is
+    one, and the model and forecast are saved.
+    """
+    from prophet.serialize import model_to_json
+
+    start = time.perf_counter()
+    history = rainfall_history(data)
+    fingerprint = history_fingerprint(history)
+    cached = load_forecast(station_id)
+    if cached is not None and cached.get("fingerprint") == fingerprint:
+        return dict(cached, source="cached", seconds=time.perf_counter() - start)
+
+    previous = load_model(station_id) if warm_start and cached is not None else None
+    model = fit_prophet(history, previous)
+    last_date = history["ds"].iloc[-1]
+    forecast = dict(forecast_horizon(model, last_date), **{
+        "station_id": station_id,
+        "version": forecast_version(data),
+        "fingerprint": fingerprint,
+        "last_date": last_date.isoformat(),
+        "rows": len(history),
+        "fitted_at": datetime.now(timezone.utc).isoformat(),
+        "warm_start": previous is not None,
+    })
+    try:
+        _write_json(model_path(station_id), json.loads(model_to_json(model)))
+        _write_json(forecast_path(station_id), forecast)
+    except OSError:
+        # Read-only deploys keep the forecast in memory only
+        pass
+    source = "warm_start" if previous is not None else "fitted"
+    return dict(forecast, source=source, seconds=time.perf_counter() - start)
+
+def forecast_is_current(forecast, state):
+    """Whether a cached forecast starts the day after the station's latest reading."""
+    return forecast is not None and forecast["last_date"] == state.date.isoformat()
+
+def refit_station(station_id, warm_start=True):
+    """Worker entry point: load the station's full history and update its forecast."""
+    # Imported here because stations.py builds on this module
+    from stations import default_registry
+
+    data, _ = default_registry().load_frames(station_id)
+    return update_forecast(station_id, data, warm_start)
+
+# =====================================================
+# Background Refits
+# =====================================================
+class RainfallRefresher:
+    """
+    Refits station Prophet models in a process pool when new readings
+    arrive, at most one refit per station at a time. Each fresh forecast is
+    set on the loaded station, which is then passed to `on_update(station)`.
+    """
+
+    def __init__(self, registry, workers=PROPHET_WORKERS, on_update=None):
+        self.registry = registry
+        self.on_update = on_update
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._running = set()
+        self._again = set()
+        self._lock = threading.Lock()
+
+    def submit(self, station_id):
+        with self._lock:
+            if station_id in self._running:
+                # Readings arrived mid-fit; fit again once it finishes
+                self._again.add(station_id)
+                return
+            self._running.add(station_id)
+        future = self._executor.submit(refit_station, station_id)
+        future.add_done_callback(lambda f: self._done(station_id, f))
+
+    def _done(self, station_id, future):
+        with self._lock:
+            self._running.discard(station_id)
+            again = station_id in self._again
+            self._again.discard(station_id)
+        try:
+            forecast = future.result()
+        except Exception:
+            logger.exception("Prophet refit of %s failed", station_id)
+        else:
+            station = self.registry.peek(station_id)
+            if station is not None:
+                station.rainfall_forecast = forecast
+                if self.on_update is not None:
+                    self.on_update(station)
+        if again:
+            self.submit(station_id)
+
+    def stop(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# =====================================================
+# Refit CLI
+# =====================================================
+def main():
+    from stations import default_registry
+
+    parser = argparse.ArgumentParser(description="Fit and cache Prophet rainfall forecasts for every station.")
+    parser.add_argument("stations", nargs="*", help="station ids to fit; defaults to every registered station")
+    parser.add_argument("--workers", type=int, default=PROPHET_WORKERS, help="stations fitted in parallel")
+    parser.add_argument("--cold", action="store_true", help="fit from scratch instead of warm-starting")
+    args = parser.parse_args()
+
+    registry = default_registry()
+    station_ids = args.stations or registry.ids()
+    start = time.perf_counter()
+    workers = max(1, min(args.workers, len(station_ids)))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(refit_station, station_id, not args.cold): station_id for station_id in station_ids}
+        for future in as_completed(futures):
+            forecast = future.result()
+            print(f"{futures[future]}: {forecast['source']} {forecast['version']} on {forecast['rows']} days "
+                  f"in {forecast['seconds']:.2f}s; next {len(forecast['dates'])} days {forecast['rainfall']}")
+    print(f"{len(station_ids)} station(s) in {time.perf_counter() - start:.2f}s with {workers} worker(s)")
+
+if __name__ == "__main__":
+    main()
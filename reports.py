@@ -0,0 +1,310 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+
+import numpy as np
+
+# =====================================================
+# Report Configuration
+# =====================================================
+REPORT_DIR = os.environ.get("REPORT_DIR", "reports")
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", str(os.cpu_count() or 1)))
+# Whole-run budget in seconds; stations not started by then are left for the next run (0 = no limit)
+REPORT_BUDGET = float(os.environ.get("REPORT_BUDGET_SECONDS", "0"))
+REPORT_FORMATS = ("html", "png")
+# Bump when the figure changes so every station is re-rendered once
+REPORT_VERSION = 1
+
+PIE_LABELS = ["7-day GW Avg", "7-day Rainfall", "7-day Evaporation"]
+PIE_COLORS = ["#1f77b4", "#2ca02c", "#d62728"]
+PULSE_STEPS = [
+    {"range": [0, 20], "color": "darkred"},
+    {"range": [20, 40], "color": "red"},
+    {"range": [40, 60], "color": "orange"},
+    {"range": [60, 80], "color": "yellow"},
+    {"range": [80, 100], "color": "green"},
+]
+
+def manifest_path(output_dir, station_id):
+    return os.path.join(output_dir, f"{station_id}.json")
+
+def report_path(output_dir, station_id, fmt):
+    return os.path.join(output_dir, f"{station_id}.{fmt}")
+
+# =====================================================
+# Report Data (column arrays only)
+# =====================================================
+def data_hash(data):
+    """Hash of the readings a report is drawn from, plus REPORT_VERSION."""
+    digest = hashlib.sha256(repr(REPORT_VERSION).encode())
+    digest.update(data["date"].to_numpy(dtype="datetime64[ns]").view(np.int64).tobytes())
+    for col in ("Groundwatelevel_m", "rainfall_mm", "temperature_c", "humidity_pct"):
+        digest.update(data[col].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def report_data(data_clean, today_gw_pred, forecast):
+    """
+    Everything the dashboard figure plots, as arrays. `forecast` holds the
+    Prophet dates/rainfall/lower/upper lists from rainfall.update_forecast.
+    """
+    gw = data_clean["Groundwatelevel_m"].to_numpy(dtype=np.float64)
+    rain = data_clean["rainfall_mm"].to_numpy(dtype=np.float64)
+    evaporation = data_clean["evaporation_mm"].to_numpy(dtype=np.float64)
+    gw_change = np.diff(gw, prepend=np.nan)
+
+    # Average groundwater change per mm of rain, applied cumulatively to the forecast rainfall
+    rainfall_effect = np.polyfit(rain, np.nan_to_num(gw_change), 1)[0]
+    forecast_rain = np.asarray(forecast["rainfall"], dtype=np.float64)
+    forecast_gw = today_gw_pred + np.cumsum(rainfall_effect * forecast_rain)
+
+    valid = ~np.isnan(gw_change)
+    trend = np.polyfit(evaporation[valid], gw_change[valid], 1)
+
+    mean, std = gw.mean(), gw.std(ddof=1)
+    pulse_score = float(np.clip(100 - abs((today_gw_pred - mean) / std) * 20, 0, 100))
+    return {
+        "dates": data_clean["date"].to_numpy(),
+        "evaporation": evaporation,
+        "correlation_x": evaporation[valid],
+        "correlation_y": gw_change[valid],
+        "trend_y": np.polyval(trend, evaporation[valid]),
+        "balance": [abs(data_clean["gw_rolling_mean_7"].iloc[-1]), data_clean["rainfall_sum_7"].iloc[-1],
+                    evaporation[-7:].mean()],
+        "forecast_dates": np.array(forecast["dates"], dtype="datetime64[D]"),
+        "forecast_rain": forecast_rain,
+        "forecast_lower": np.asarray(forecast["lower"], dtype=np.float64),
+        "forecast_upper": np.asarray(forecast["upper"], dtype=np.float64),
+        "forecast_gw": forecast_gw,
+        "today_gw_pred": float(today_gw_pred),
+        "pulse_score": pulse_score,
+    }
+
+# =====================================================
+# Figure
+# =====================================================
+def build_figure(report, title="Groundwater Monitoring Dashboard"):
+    """The 2x3 dashboard figure; every trace is built from report arrays and added in one call."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    today_gw = report["today_gw_pred"]
+    forecast_dates = report["forecast_dates"]
+    fig = make_subplots(
+        rows=2, cols=3,
+        subplot_titles=(
+            "Evaporation Over Time",
+            "Effect of Evaporation on Water Level Change",
+            "7-day Water Balance Components",
+            "Rainfall Forecast for Next Week",
+            "Groundwater Forecast for Next Week",
+            "Station Status Indicator"
+        ),
+        specs=[
+            [{"type": "scatter"}, {"type": "scatter"}, {"type": "pie"}],
+            [{"type": "scatter"}, {"type": "scatter"}, {"type": "indicator"}]
+        ]
+    )
+    traces = [
+        (go.Scatter(x=report["dates"], y=report["evaporation"], mode="lines", name="Historical Evaporation",
+                    hovertemplate="Date: %{x|%Y-%m-%d}<br>Evaporation: %{y:.3f} mm<extra></extra>",
+                    line=dict(color="blue", width=2)), 1, 1),
+        (go.Scatter(x=report["dates"][-1:], y=report["evaporation"][-1:], mode="markers",
+                    name="Today's Evaporation",
+                    hovertemplate=f"Today's Evaporation: {report['evaporation'][-1]:.3f} mm<extra></extra>",
+                    marker=dict(color="red", size=10)), 1, 1),
+        (go.Scatter(x=report["correlation_x"], y=report["correlation_y"], mode="markers", name="Data Points",
+                    hovertemplate="Evaporation: %{x:.2f} mm<br>GW Change: %{y:.3f} m<extra></extra>",
+                    marker=dict(size=6, opacity=0.6)), 1, 2),
+        (go.Scatter(x=report["correlation_x"], y=report["trend_y"], mode="lines", name="Trend Line",
+                    hovertemplate="Trend: GW Change = %{y:.3f} m<extra></extra>",
+                    line=dict(color="red", width=2, dash="dash")), 1, 2),
+        (go.Pie(labels=PIE_LABELS, values=report["balance"], name="7-day Balance",
+                hovertemplate="%{label}: %{value:.2f}<br>Percentage: %{percent}<extra></extra>",
+                marker=dict(colors=PIE_COLORS)), 1, 3),
+        (go.Scatter(x=forecast_dates, y=report["forecast_rain"], mode="lines+markers", name="Predicted Rainfall",
+                    hovertemplate="Date: %{x|%Y-%m-%d}<br>Predicted Rainfall: %{y:.2f} mm<extra></extra>",
+                    line=dict(color="blue", width=3)), 2, 1),
+        (go.Scatter(x=forecast_dates, y=report["forecast_upper"], mode="lines", name="Upper Bound",
+                    line=dict(width=0), showlegend=False,
+                    hovertemplate="Upper Bound: %{y:.2f} mm<extra></extra>"), 2, 1),
+        (go.Scatter(x=forecast_dates, y=report["forecast_lower"], mode="lines", name="Lower Bound",
+                    fill="tonexty", line=dict(width=0), showlegend=False,
+                    hovertemplate="Lower Bound: %{y:.2f} mm<extra></extra>"), 2, 1),
+        (go.Scatter(x=forecast_dates, y=report["forecast_gw"], mode="lines+markers", name="Predicted Groundwater",
+                    hovertemplate="Date: %{x|%Y-%m-%d}<br>Predicted GW: %{y:.3f} m<extra></extra>",
+                    line=dict(color="purple", width=3)), 2, 2),
+        (go.Scatter(x=forecast_dates[[0, -1]], y=[today_gw, today_gw], mode="lines", name="Current Level",
+                    hovertemplate=f"Current Level: {today_gw:.3f} m<extra></extra>",
+                    line=dict(color="red", width=2, dash="dash")), 2, 2),
+        (go.Indicator(mode="gauge+number", value=report["pulse_score"], title={"text": "Station Pulse Score"},
+                      gauge={"axis": {"range": [0, 100]}, "bar": {"color": "darkblue"}, "steps": PULSE_STEPS}),
+         2, 3),
+    ]
+    fig.add_traces([trace for trace, _, _ in traces], rows=[row for _, row, _ in traces],
+                   cols=[col for _, _, col in traces])
+
+    fig.update_layout(height=800, width=1200, title_text=title, showlegend=True, hovermode="closest")
+    fig.update_xaxes(title_text="Date", row=1, col=1)
+    fig.update_yaxes(title_text="Evaporation (mm)", row=1, col=1)
+    fig.update_xaxes(title_text="Evaporation (mm)", row=1, col=2)
+    fig.update_yaxes(title_text="Water Level Change (m)", row=1, col=2)
+    fig.update_xaxes(title_text="Date", row=2, col=1)
+    fig.update_yaxes(title_text="Rainfall (mm)", row=2, col=1)
+    fig.update_xaxes(title_text="Date", row=2, col=2)
+    fig.update_yaxes(title_text="Groundwater Level (m)", row=2, col=2)
+    return fig
+
+# =====================================================
+# Station Reports (runs in a worker process)
+# =====================================================
+def _is_fresh(output_dir, station_id, digest, versions, formats):
+    """Whether the manifest matches the data hash and the model and forecast versions, and every format exists."""
+    try:
+        with open(manifest_path(output_dir, station_id)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (
+        manifest.get("data_hash") == digest
+        and all(manifest.get(key) == version for key, version in versions.items())
+        and all(os.path.exists(report_path(output_dir, station_id, fmt)) for fmt in formats)
+    )
+
+def render_station(station_id, output_dir=REPORT_DIR, formats=("html",), force=False):
+    """
+    Write <station_id>.html/.png and a manifest, unless the station's data
+    hash and its model and forecast versions are all unchanged.
+    """
+    # Imported here because stations.py builds on artifacts.py
+    from artifacts import artifact_path, load_feature_sets, load_or_train, model_version
+    from predictions import predict_groundwater
+    from rainfall import forecast_version, update_forecast
+    from stations import default_registry
+    from telemetry import _tmp_path
+    from training import data_fingerprint
+
+    start = time.perf_counter()
+    registry = default_registry()
+    data, data_clean = registry.load_data(station_id)
+    digest = data_hash(data)
+    feature_sets = load_feature_sets(station_id)
+    # What load_or_train and update_forecast would return, from hashes alone
+    versions = {
+        "model_version": model_version(data_fingerprint(data_clean, feature_sets=feature_sets)),
+        "forecast_version": forecast_version(data),
+    }
+    if not force and _is_fresh(output_dir, station_id, digest, versions, formats):
+        return {"station_id": station_id, "status": "unchanged", "seconds": time.perf_counter() - start}
+
+    artifact, _, _ = load_or_train(data_clean, artifact_path(station_id), feature_sets=feature_sets)
+    today_gw_pred = predict_groundwater(artifact, data_clean[artifact["features"]].tail(1).to_numpy(np.float64))[0]
+    forecast = update_forecast(station_id, data)
+    report = report_data(data_clean, today_gw_pred, forecast)
+    fig = build_figure(report, f"Groundwater Monitoring Dashboard - {registry.sources[station_id][1]}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    files = []
+    for fmt in formats:
+        path = report_path(output_dir, station_id, fmt)
+        tmp_path = _tmp_path(path)
+        if fmt == "html":
+            fig.write_html(tmp_path, include_plotlyjs="cdn", full_html=True)
+        else:
+            fig.write_image(tmp_path, format="png")
+        os.replace(tmp_path, path)
+        files.append(path)
+
+    manifest = {
+        "station_id": station_id,
+        "data_hash": digest,
+        "model_version": artifact["version"],
+        "forecast_version": forecast["version"],
+        "last_date": str(data_clean["date"].iloc[-1])[:10],
+        "pulse_score": round(report["pulse_score"], 1),
+        "files": files,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    # Atomic like the reports, so a concurrent run never reads a torn manifest
+    path = manifest_path(output_dir, station_id)
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return dict(manifest, status="rendered")
+
+# =====================================================
+# Nightly Run
+# =====================================================
+def render_all(station_ids, output_dir=REPORT_DIR, formats=("html",), workers=REPORT_WORKERS,
+               budget=REPORT_BUDGET, force=False):
+    """
+    Render reports for many stations in a process pool. With a budget,
+    stations not yet started when it runs out are cancelled and reported
+    as "deferred"; their unchanged hashes make the next run pick them up.
+    """
+    results = []
+    deadline = time.monotonic() + budget if budget > 0 else None
+    workers = max(1, min(workers, len(station_ids)))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = {pool.submit(render_station, s, output_dir, formats, force): s for s in station_ids}
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                station_id = pending.pop(future)
+                try:
+                    results.append(future.result())
+                except Exception as exc:
+                    results.append({"station_id": station_id, "status": "failed", "error": repr(exc)})
+            if deadline is not None and time.monotonic() >= deadline:
+                for future, station_id in list(pending.items()):
+                    if future.cancel():
+                        pending.pop(future)
+                        results.append({"station_id": station_id, "status": "deferred"})
+                deadline = None
+    return results
+
+def main(argv=None):
+    from stations import default_registry
+
+    parser = argparse.ArgumentParser(description="Render per-station dashboard reports (HTML/PNG).")
+    parser.add_argument("stations", nargs="*", help="station ids to render; defaults to every registered station")
+    parser.add_argument("--output", default=REPORT_DIR, help="report directory")
+    parser.add_argument("--format", default="html", help="comma-separated: html, png (png needs kaleido)")
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS)
+    parser.add_argument("--budget", type=float, default=REPORT_BUDGET,
+                        help="seconds after which unstarted stations are deferred to the next run (0 = no limit)")
+    parser.add_argument("--force", action="store_true", help="re-render even if the data hash is unchanged")
+    args = parser.parse_args(argv)
+
+    formats = [fmt for fmt in args.format.split(",") if fmt]
+    if not formats or any(fmt not in REPORT_FORMATS for fmt in formats):
+        parser.error(f"--format must be a comma-separated subset of {', '.join(REPORT_FORMATS)}")
+    if "png" in formats:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            parser.error("png reports need kaleido (pip install kaleido)")
+
+    registry = default_registry()
+    station_ids = args.stations or registry.ids()
+    start = time.perf_counter()
+    results = render_all(station_ids, args.output, formats, args.workers, args.budget, args.force)
+    counts = {}
+    for result in sorted(results, key=lambda r: r["station_id"]):
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        detail = f" in {result['seconds']:.2f}s" if "seconds" in result else ""
+        print(f"{result['station_id']}: {result['status']}{detail}{' ' + result['error'] if 'error' in result else ''}")
+    summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    print(f"{len(station_ids)} station(s) in {time.perf_counter() - start:.2f}s: {summary}")
+    return 1 if counts.get("failed") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from artifacts import artifact_path, publish_artifact
+from features import FEATURES
+from metrics import stage
+from predictions import predict_targets
+from training import FORECAST_MODE, data_fingerprint, train_models, train_split
+
+logger = logging.getLogger(__name__)
+
+# =====================================================
+# Retraining Configuration
+# =====================================================
+# 0 disables the corresponding trigger
+RETRAIN_INTERVAL = float(os.environ.get("RETRAIN_INTERVAL_SECONDS", "0"))
+RETRAIN_AFTER_READINGS = int(os.environ.get("RETRAIN_AFTER_READINGS", "0"))
+RETRAIN_WORKERS = int(os.environ.get("RETRAIN_WORKERS", "1"))
+# A candidate may be at most this much worse than the serving model on the held-out split
+RETRAIN_TOLERANCE = float(os.environ.get("RETRAIN_TOLERANCE", "1.05"))
+
+# =====================================================
+# Held-out Validation
+# =====================================================
+def held_out_mae(artifact, data_clean, split):
+    X = data_clean[artifact["features"]].iloc[split:].to_numpy(dtype=np.float64)
+    if not len(X):
+        return {"groundwater": np.nan, "rainfall": np.nan}
+    gw, rain = predict_targets(artifact, X)
+    return {
+        "groundwater": float(np.mean(np.abs(gw - data_clean["Groundwatelevel_m"].iloc[split:].to_numpy()))),
+        "rainfall": float(np.mean(np.abs(rain - data_clean["rainfall_mm"].iloc[split:].to_numpy()))),
+    }
+
+def passes(candidate_scores, current_scores, tolerance=RETRAIN_TOLERANCE):
+    for target, score in candidate_scores.items():
+        current = current_scores[target]
+        if np.isnan(score) or (not np.isnan(current) and score > current * tolerance):
+            return False
+    return True
+
+# =====================================================
+# Retrain Scheduler
+# =====================================================
+class RetrainScheduler:
+    """
+    Refits station models in a background process pool, every `interval`
+    seconds and/or once `after_readings` new readings have arrived for a
+    station. A candidate replaces the serving artifact only if it is no
+    worse than the current models on the held-out 20% split; the swap is a
+    single attribute assignment, so requests see either the old or the new
+    model/scaler set, never a mix.
+    """
+
+    def __init__(self, registry, interval=RETRAIN_INTERVAL, after_readings=RETRAIN_AFTER_READINGS,
+                 workers=RETRAIN_WORKERS, on_swap=None):
+        self.registry = registry
+        self.interval = interval
+        self.after_readings = after_readings
+        self.on_swap = on_swap
+        self.history = deque(maxlen=100)
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._readings = {}
+        self._rejected = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer = None
+
+    @property
+    def enabled(self):
+        return self.interval > 0 or self.after_readings > 0
+
+    def start(self):
+        if self.interval > 0 and self._timer is None:
+            self._timer = threading.Thread(target=self._run_timer, name="retrain-timer", daemon=True)
+            self._timer.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_timer(self):
+        while not self._stop.wait(self.interval):
+            for station_id in self.registry.loaded():
+                self.submit(station_id)
+
+    def note_readings(self, station_id, count):
+        if self.after_readings <= 0:
+            return
+        with self._lock:
+            self._readings[station_id] = self._readings.get(station_id, 0) + count
+            due = self._readings[station_id] >= self.after_readings
+        if due:
+            self.submit(station_id)
+
+    def submit(self, station_id):
+        """Queue a retrain for one station unless one is already running."""
+        with self._lock:
+            if station_id in self._running:
+                return None
+            self._running.add(station_id)
+            self._readings[station_id] = 0
+        thread = threading.Thread(target=self._retrain, args=(station_id,), name=f"retrain-{station_id}", daemon=True)
+        thread.start()
+        return thread
+
+    def _retrain(self, station_id):
+        try:
+            self.retrain(station_id)
+        except Exception:
+            logger.exception("Retraining %s failed", station_id)
+        finally:
+            with self._lock:
+                self._running.discard(station_id)
+
+    def retrain(self, station_id):
+        station = self.registry.get(station_id)
+        data_clean = station.data_clean
+        fingerprint = data_fingerprint(data_clean, feature_sets=station.feature_sets)
+        if fingerprint in (station.artifact.get("fingerprint"), self._rejected.get(station_id)):
+            return None
+
+        with stage("retrain"):
+            candidate = self._executor.submit(
+                train_models, data_clean, FEATURES, FORECAST_MODE == "direct", station.feature_sets
+            ).result()
+        split = train_split(data_clean)
+        current_scores = held_out_mae(station.artifact, data_clean, split)
+        candidate_scores = held_out_mae(candidate, data_clean, split)
+        accepted = passes(candidate_scores, current_scores)
+
+        record = {
+            "station_id": station_id,
+            "rows": len(data_clean),
+            "current": current_scores,
+            "candidate": candidate_scores,
+            "candidate_calibration": candidate["calibration"],
+            "accepted": accepted,
+        }
+        self.history.append(record)
+        if not accepted:
+            self._rejected[station_id] = fingerprint
+            logger.info("Rejected retrained models for %s: %s", station_id, record)
+            return record
+
+        candidate = publish_artifact(candidate, fingerprint, artifact_path(station_id))
+        station.artifact = candidate
+        station.model_source = "retrained"
+        if self.on_swap is not None:
+            self.on_swap(station)
+        logger.info("Swapped in %s for %s", candidate["version"], station_id)
+        return record
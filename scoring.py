@@ -0,0 +1,229 @@
+"""
+Batch scoring of the full telemetry history.
+
+    python scoring.py [stations ...] [--output scores] [--chunk-rows 100000] [--workers N]
+
+Writes one <output>/<station_id>.parquet per station. Each file has one row
+per day with complete features: the measured level, predicted groundwater
+and rainfall, pulse score, alert level and the model version that scored it.
+Stations are scored in parallel worker processes. Within a station, the CSV
+and the ingested store segments are streamed in chunks of --chunk-rows.
+Features come from the same float32 stacked feature engine that
+clean_features uses for training and serving. The last HISTORY raw
+readings are carried into the next chunk, so windows and lags that span
+a boundary come out the same as they would over the whole history.
+
+Pulse scores use the baseline as it stood on each day: the running
+mean/std of every earlier scored day plus that day. This is the score the
+live /api/alerts route would have shown on that date. Scoring uses the
+station's saved artifact. A station that has none is trained first on its
+full history, the same way artifacts.py does it.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from artifacts import artifact_path, load_artifact, load_feature_sets, load_or_train
+from features import FEATURES, HISTORY, RunningStats, feature_matrix, stack_frames
+from predictions import ALERT_LEVELS, alert_indices, predict_targets, pulse_scores
+from telemetry import _tmp_path, load_columns, prepare_telemetry
+from telemetry_store import TelemetryStore
+
+# =====================================================
+# Scoring Configuration
+# =====================================================
+SCORING_OUTPUT_DIR = os.environ.get("SCORING_OUTPUT_DIR", "scores")
+SCORING_CHUNK_ROWS = int(os.environ.get("SCORING_CHUNK_ROWS", "100000"))
+SCORING_WORKERS = int(os.environ.get("SCORING_WORKERS", str(os.cpu_count() or 1)))
+
+ALERT_NAMES = np.array([level for _, level, _ in ALERT_LEVELS])
+
+# =====================================================
+# Chunked Telemetry
+# =====================================================
+def telemetry_chunks(csv_path, station_id, store, chunk_rows=SCORING_CHUNK_ROWS):
+    """
+    Prepared telemetry frames in date order: the CSV's cached columns, then
+    each stored segment with its imputed values, as the features see them.
+    """
+    columns = load_columns(csv_path)
+    total = len(columns["date"])
+    for start in range(0, total, chunk_rows):
+        yield prepare_telemetry(pd.DataFrame({
+            col: (values[start:start + chunk_rows].view("datetime64[ns]") if col == "date"
+                  else values[start:start + chunk_rows])
+            for col, values in columns.items()
+        }))
+    for path in store.segments(station_id):
+        frame = store.read_segment(path, screened=True)
+        for start in range(0, len(frame), chunk_rows):
+            yield prepare_telemetry(frame.iloc[start:start + chunk_rows])
+
+def feature_chunks(chunks):
+    """
+    The float32 feature matrix of each chunk, computed with the previous
+    chunk's last HISTORY raw rows prepended and then dropped, and filtered
+    to clean rows the same way clean_features filters them.
+    """
+    carry = None
+    for chunk in chunks:
+        frame = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+        matrix = feature_matrix(stack_frames([frame]))[0]
+        skip = 0 if carry is None else len(carry)
+        carry = frame.iloc[-HISTORY:]
+        gw = frame["Groundwatelevel_m"].to_numpy(dtype=np.float64)
+        rows = skip + np.flatnonzero(~np.isnan(matrix[skip:]).any(axis=1) & ~np.isnan(gw[skip:]))
+        if len(rows):
+            features = pd.DataFrame(matrix[rows], columns=FEATURES)
+            features.insert(0, "date", frame["date"].to_numpy()[rows])
+            features["Groundwatelevel_m"] = gw[rows]
+            yield features
+
+# =====================================================
+# Point-in-time Baseline
+# =====================================================
+def expanding_baseline(values, stats):
+    """
+    Running mean/std after each value, continuing from `stats`, which is
+    advanced past the chunk. This matches RunningStats.push one value at a
+    time.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    deviation = np.where(valid, values - stats.mean, 0.0)
+    count = stats.count + np.cumsum(valid)
+    s1 = np.cumsum(deviation)
+    s2 = np.cumsum(deviation * deviation)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = stats.mean + s1 / count
+        m2 = np.maximum(stats.m2 + s2 - s1 * s1 / count, 0.0)
+        std = np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)
+    if len(values) and count[-1]:
+        stats.count, stats.mean, stats.m2 = int(count[-1]), float(mean[-1]), float(m2[-1])
+    return mean, std
+
+# =====================================================
+# Station Scoring (runs in a worker process)
+# =====================================================
+def scoring_artifact(station_id, csv_path):
+    # Imported here because stations.py builds on artifacts.py
+    from stations import StationRegistry
+
+    artifact = load_artifact(artifact_path(station_id))
+    if artifact is not None:
+        return artifact, "artifact"
+    registry = StationRegistry()
+    registry.register(station_id, csv_path)
+    _, data_clean = registry.load_data(station_id)
+    artifact, source, _ = load_or_train(data_clean, artifact_path(station_id),
+                                        feature_sets=load_feature_sets(station_id))
+    return artifact, source
+
+def score_frame(artifact, features, stats):
+    gw_pred, rain_pred = predict_targets(artifact, features[artifact["features"]].to_numpy(dtype=np.float64))
+    mean, std = expanding_baseline(features["Groundwatelevel_m"], stats)
+    scores = pulse_scores(gw_pred, mean, std)
+    return pd.DataFrame({
+        "date": features["date"].to_numpy(),
+        "groundwater_m": features["Groundwatelevel_m"].to_numpy(dtype=np.float64),
+        "predicted_groundwater": gw_pred,
+        "predicted_rainfall": rain_pred,
+        "pulse_score": scores,
+        "alert_level": ALERT_NAMES[alert_indices(scores)],
+    })
+
+def score_station(station_id, csv_path, output_dir, chunk_rows=SCORING_CHUNK_ROWS):
+    """Score one station's history into <output_dir>/<station_id>.parquet; returns a summary."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    artifact, model_source = scoring_artifact(station_id, csv_path)
+    path = os.path.join(output_dir, f"{station_id}.parquet")
+    tmp_path = _tmp_path(path)
+    stats = RunningStats()
+    rows, writer = 0, None
+    try:
+        for features in feature_chunks(telemetry_chunks(csv_path, station_id, TelemetryStore(), chunk_rows)):
+            frame = score_frame(artifact, features, stats)
+            frame.insert(0, "station_id", station_id)
+            frame["model_version"] = artifact["version"]
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+            rows += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        os.replace(tmp_path, path)
+    return {
+        "station_id": station_id,
+        "rows": rows,
+        "path": path if rows else None,
+        "model_version": artifact["version"],
+        "model_source": model_source,
+        "seconds": time.perf_counter() - start,
+    }
+
+# =====================================================
+# Backfill CLI
+# =====================================================
+def main():
+    # Imported here because stations.py builds on artifacts.py
+    from stations import default_registry
+
+    parser = argparse.ArgumentParser(
+        description="Score every day of the telemetry history and write predictions and alerts to Parquet.")
+    parser.add_argument("stations", nargs="*", help="station ids to score; defaults to every registered station")
+    parser.add_argument("--output", default=SCORING_OUTPUT_DIR, help="directory for <station_id>.parquet files")
+    parser.add_argument("--chunk-rows", type=int, default=SCORING_CHUNK_ROWS, help="readings per feature chunk")
+    parser.add_argument("--workers", type=int, default=SCORING_WORKERS, help="stations scored in parallel")
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        parser.error("writing Parquet needs pyarrow (pip install pyarrow)")
+
+    registry = default_registry()
+    station_ids = args.stations or registry.ids()
+    unknown = [s for s in station_ids if s not in registry]
+    if unknown:
+        parser.error(f"unknown station(s): {', '.join(unknown)}")
+    os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    total, failed = 0, []
+    workers = max(1, min(args.workers, len(station_ids)))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            pool.submit(score_station, station_id, registry.sources[station_id][0], args.output, args.chunk_rows):
+                station_id
+            for station_id in station_ids
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                failed.append(futures[future])
+                print(f"{futures[future]}: failed: {exc!r}")
+                continue
+            total += result["rows"]
+            print(f"{result['station_id']}: {result['rows']:,} days scored with {result['model_version']} "
+                  f"({result['model_source']}) in {result['seconds']:.2f}s -> {result['path']}")
+    elapsed = time.perf_counter() - start
+    print(f"{total:,} days across {len(station_ids)} station(s) in {elapsed:.2f}s "
+          f"({total / elapsed if elapsed else 0:,.0f} days/s, {workers} worker(s))")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# Series Configuration
+# =====================================================
+SERIES_COLUMNS = ["Groundwatelevel_m", "rainfall_mm", "temperature_c", "humidity_pct", "evaporation_mm", "sediment_g/l"]
+# Rollups of these are bucket totals; the rest are bucket means
+SUM_COLUMNS = {"rainfall_mm", "evaporation_mm"}
+ROLLUPS = [("daily", "D"), ("weekly", "W-MON"), ("monthly", "MS")]
+RESOLUTIONS = ["auto", "raw"] + [name for name, _ in ROLLUPS]
+METHODS = ["lttb", "minmax"]
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+# "auto" reads the finest level holding at most this many times the requested points
+AUTO_SOURCE_FACTOR = 8
+
+# =====================================================
+# Downsampling
+# =====================================================
+def lttb(x, y, n):
+    """Indices of the Largest-Triangle-Three-Buckets selection of n points from (x, y)."""
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+
+    edges = np.linspace(1, size - 1, n - 1).astype(np.intp)
+    # Third triangle vertex of each bucket: the next bucket's average, or the last point
+    counts = np.diff(edges)
+    cx = np.append(np.add.reduceat(x[:-1], edges[:-1])[1:] / counts[1:], x[-1])
+    cy = np.append(np.add.reduceat(y[:-1], edges[:-1])[1:] / counts[1:], y[-1])
+
+    keep = np.empty(n, dtype=np.intp)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - cx[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy[i] - ay))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+def minmax(y, n):
+    """Indices of the minimum and maximum of each of n/2 equal buckets, in time order."""
+    size = len(y)
+    buckets = n // 2
+    if n >= size or buckets < 1:
+        return np.arange(size)
+
+    width = -(-size // buckets)
+    buckets = -(-size // width)
+    padded = np.full(buckets * width, np.nan)
+    padded[:size] = y
+    padded = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    lo = offsets + np.nanargmin(padded, axis=1)
+    hi = offsets + np.nanargmax(padded, axis=1)
+    return np.unique(np.concatenate([lo, hi]))
+
+# =====================================================
+# Per-station Series Index
+# =====================================================
+class SeriesLevel:
+    """One resolution of one column: sorted int64 ns dates with values and an optional min/max envelope."""
+
+    __slots__ = ("dates", "values", "low", "high")
+
+    def __init__(self, dates, values, low=None, high=None):
+        self.dates = dates
+        self.values = values
+        self.low = low
+        self.high = high
+
+    def window(self, start, end):
+        lo = 0 if start is None else np.searchsorted(self.dates, start, side="left")
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, end, side="right")
+        return lo, hi
+
+
+def _valid_columns(data):
+    """(column, int64 ns dates, values) of each series column, without its NaN readings."""
+    # Optional columns that are missing just give empty series
+    frame = data.reindex(columns=["date"] + SERIES_COLUMNS)
+    all_dates = frame["date"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    for column in SERIES_COLUMNS:
+        values = frame[column].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        yield column, all_dates[valid], values[valid]
+
+def _rollup(column, dates, values, freq):
+    series = pd.Series(values, index=pd.DatetimeIndex(dates.view("datetime64[ns]")))
+    buckets = series.resample(freq, label="left", closed="left")
+    value = buckets.sum() if column in SUM_COLUMNS else buckets.mean()
+    low, high = buckets.min(), buckets.max()
+    # Empty buckets are skipped; only they have no minimum
+    keep = low.notna().to_numpy()
+    return SeriesLevel(
+        low.index.to_numpy(dtype="datetime64[ns]").view(np.int64)[keep],
+        value.to_numpy()[keep],
+        low.to_numpy()[keep],
+        high.to_numpy()[keep],
+    )
+
+class SeriesIndex:
+    """
+    NaN-free typed arrays of every series column plus daily/weekly/monthly
+    rollups of the first `rows` rows of a station's data, so a range query
+    is two binary searches and a slice. Never modified once built: new
+    readings give a new index, so readers need no lock.
+    """
+
+    def __init__(self, version, levels, rows):
+        self.version = version
+        self.levels = levels
+        self.rows = rows
+
+    @classmethod
+    def from_frame(cls, data, version):
+        levels = {}
+        for column, dates, values in _valid_columns(data):
+            levels[column] = {"raw": SeriesLevel(dates, values)}
+            for name, freq in ROLLUPS:
+                levels[column][name] = _rollup(column, dates, values, freq)
+        return cls(version, levels, len(data))
+
+    def extended(self, data, version):
+        """
+        The index of `data`, which continues the rows this one covers: new
+        readings are appended to the raw arrays and only the rollup buckets
+        from each level's last one on are recomputed. None if `data` did
+        not grow at the end, so the caller rebuilds.
+        """
+        levels = {}
+        for column, dates, values in _valid_columns(data.iloc[self.rows:]):
+            old = self.levels[column]
+            if not len(dates):
+                levels[column] = old
+                continue
+            raw = old["raw"]
+            if len(raw.dates) and dates[0] <= raw.dates[-1]:
+                return None
+            dates, values = np.concatenate([raw.dates, dates]), np.concatenate([raw.values, values])
+            levels[column] = {"raw": SeriesLevel(dates, values)}
+            for name, freq in ROLLUPS:
+                level = old[name]
+                # The last bucket may gain readings; the ones before it are final
+                kept = max(len(level.dates) - 1, 0)
+                start = np.searchsorted(dates, level.dates[kept]) if len(level.dates) else 0
+                tail = _rollup(column, dates[start:], values[start:], freq)
+                levels[column][name] = SeriesLevel(*(
+                    np.concatenate([getattr(level, part)[:kept], getattr(tail, part)])
+                    for part in SeriesLevel.__slots__
+                ))
+        return SeriesIndex(version, levels, len(data))
+
+def series_index(station):
+    """
+    The station's SeriesIndex for its current cache version: extended by
+    the readings ingested since the last one, or built on the first request.
+    """
+    version = station.cache_version()[0]
+    index = station.series_index
+    if index is None or index.version != version:
+        with station.lock:
+            index = station.series_index
+            if index is None or index.version != version:
+                data = station.data
+                if index is not None and index.rows <= len(data):
+                    index = index.extended(data, version)
+                if index is None:
+                    index = SeriesIndex.from_frame(data, version)
+                station.series_index = index
+    return index
+
+# =====================================================
+# Series Query
+# =====================================================
+def _date_arg(value, name):
+    if not value:
+        return None
+    try:
+        return pd.Timestamp(value).value
+    except ValueError:
+        raise ValueError(f"Invalid {name} date: {value!r}")
+
+def series_query(args):
+    """Validate /api/series query arguments into build_series keyword arguments."""
+    target = args.get("target", "Groundwatelevel_m")
+    if target not in SERIES_COLUMNS:
+        raise ValueError(f"target must be one of {SERIES_COLUMNS}")
+    try:
+        points = int(args.get("points", DEFAULT_POINTS))
+    except ValueError:
+        raise ValueError("points must be an integer")
+    if not 3 <= points <= MAX_POINTS:
+        raise ValueError(f"points must be between 3 and {MAX_POINTS}")
+    method = args.get("method", "lttb")
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    resolution = args.get("resolution", "auto")
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {RESOLUTIONS}")
+
+    start = _date_arg(args.get("start"), "start")
+    end = _date_arg(args.get("end"), "end")
+    if start is not None and end is not None and start > end:
+        raise ValueError("start must not be after end")
+    return {"target": target, "start": start, "end": end, "points": points,
+            "method": method, "resolution": resolution}
+
+def build_series(station, target="Groundwatelevel_m", start=None, end=None, points=DEFAULT_POINTS,
+                 method="lttb", resolution="auto"):
+    """
+    Columnar series of `target` between start and end (int64 ns, inclusive)
+    with at most `points` points. "auto" reads raw rows when the range is
+    short and the finest rollup that is not much larger than `points`
+    otherwise; whatever is still too long is downsampled with LTTB or
+    per-bucket min/max.
+    """
+    levels = series_index(station).levels[target]
+    if resolution == "auto":
+        for resolution in RESOLUTIONS[1:]:
+            lo, hi = levels[resolution].window(start, end)
+            if hi - lo <= points * AUTO_SOURCE_FACTOR:
+                break
+    level = levels[resolution]
+    lo, hi = level.window(start, end)
+
+    total = hi - lo
+    keep = slice(lo, hi)
+    downsampled = None
+    if total > points:
+        y = level.values[lo:hi]
+        if method == "lttb":
+            idx = lttb(level.dates[lo:hi].astype(np.float64), y, points)
+        else:
+            idx = minmax(y, points)
+        keep = idx + lo
+        downsampled = method
+
+    payload = {
+        "station_id": station.id,
+        "target": target,
+        "resolution": resolution,
+        "downsampled": downsampled,
+        "total": int(total),
+        "dates": np.datetime_as_string(level.dates[keep].view("datetime64[ns]"), unit="D").tolist(),
+        "values": np.round(level.values[keep], 3).tolist(),
+    }
+    if level.low is not None:
+        payload["min"] = np.round(level.low[keep], 3).tolist()
+        payload["max"] = np.round(level.high[keep], 3).tolist()
+    return payload
@@ -0,0 +1,143 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from artifacts import artifact_path, load_artifact
+from predictions import render_prediction
+
+# =====================================================
+# Serving Configuration
+# =====================================================
+SERVING_WORKERS = int(os.environ.get("SERVING_WORKERS", str(os.cpu_count() or 1)))
+# Predictions running in the pool at once, and requests allowed to wait for one of those slots
+SERVING_MAX_INFLIGHT = int(os.environ.get("SERVING_MAX_INFLIGHT", str(2 * SERVING_WORKERS)))
+SERVING_MAX_QUEUE = int(os.environ.get("SERVING_MAX_QUEUE", "64"))
+SERVING_RETRY_AFTER = 1
+
+
+class Overloaded(Exception):
+    pass
+
+
+class StaleArtifact(Exception):
+    pass
+
+# =====================================================
+# Worker Side
+# =====================================================
+# Artifacts are joblib files loaded with mmap_mode="r": every worker maps the
+# same pages of the page cache, so model arrays are shared, not copied.
+_ARTIFACTS = {}
+
+
+class StationSnapshot:
+    """The parts of a Station that predictions.py reads, small enough to send per task."""
+
+    def __init__(self, station_id, artifact, feature_state, baseline, rainfall_forecast=None):
+        self.id = station_id
+        self.artifact = artifact
+        self.feature_state = feature_state
+        self.baseline = baseline
+        self.rainfall_forecast = rainfall_forecast
+
+
+def worker_artifact(station_id, version):
+    artifact = _ARTIFACTS.get(station_id)
+    if artifact is None or artifact["version"] != version:
+        artifact = load_artifact(artifact_path(station_id))
+        if artifact is None or artifact.get("version") != version:
+            # Not published to disk (read-only deploy) or replaced since the request
+            raise StaleArtifact(station_id)
+        _ARTIFACTS[station_id] = artifact
+    return artifact
+
+
+def run_prediction(name, station_id, version, feature_state, baseline, rainfall_forecast):
+    station = StationSnapshot(station_id, worker_artifact(station_id, version), feature_state, baseline,
+                              rainfall_forecast)
+    return render_prediction(name, station)
+
+# =====================================================
+# Prediction Service
+# =====================================================
+class PredictionService:
+    """
+    Computes cached prediction bodies for an async HTTP layer. Cache hits
+    return immediately; misses run render_prediction in a process pool,
+    with identical concurrent misses sharing one computation. At most
+    max_inflight predictions run at once and at most max_queue wait for a
+    slot; further misses raise Overloaded.
+    """
+
+    def __init__(self, workers=SERVING_WORKERS, max_inflight=SERVING_MAX_INFLIGHT, max_queue=SERVING_MAX_QUEUE):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._pending = {}
+        # Distinct computations running or waiting for a slot
+        self.admitted = 0
+        self.hits = 0
+        self.computed = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.fallbacks = 0
+
+    async def get(self, station, name):
+        # Read the artifact and state once so the version matches what is computed
+        artifact, state, baseline = station.artifact, station.feature_state, station.baseline
+        rainfall = station.rainfall_forecast
+        version = (state.date.isoformat(), artifact["version"], rainfall["version"] if rainfall else None)
+        body = station.cache.get(name, version)
+        if body is not None:
+            self.hits += 1
+            return body
+
+        key = (station.id, name, version)
+        task = self._pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            if self.admitted >= self.max_inflight + self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"Prediction queue is full ({self.max_queue} waiting)")
+            self.admitted += 1
+            snapshot = StationSnapshot(station.id, artifact, state, baseline, rainfall)
+            task = asyncio.ensure_future(self._compute(station, snapshot, name, version))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._finish(key))
+        # Shielded so one cancelled request does not cancel the others sharing the task
+        return await asyncio.shield(task)
+
+    def _finish(self, key):
+        self.admitted -= 1
+        self._pending.pop(key, None)
+
+    async def _compute(self, station, snapshot, name, version):
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            try:
+                body = await loop.run_in_executor(self._executor, run_prediction, name, snapshot.id,
+                                                  version[1], snapshot.feature_state, snapshot.baseline,
+                                                  snapshot.rainfall_forecast)
+            except StaleArtifact:
+                self.fallbacks += 1
+                body = await loop.run_in_executor(None, render_prediction, name, snapshot)
+        self.computed += 1
+        station.cache.put(name, version, body)
+        return body
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "running": min(self.admitted, self.max_inflight),
+            "waiting": max(0, self.admitted - self.max_inflight),
+            "hits": self.hits,
+            "computed": self.computed,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "fallbacks": self.fallbacks,
+        }
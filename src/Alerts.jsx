@@ -29,6 +29,11 @@ export default function Alerts({ user }) {
       }
     };
     fetchAlerts();
+
+    // Alert-level changes are pushed by the server instead of re-polled
+    const source = new EventSource("https://realtime-ground-water-level-monitoring-1.onrender.com/api/stream");
+    source.addEventListener("alert", (event) => setAlerts(JSON.parse(event.data)));
+    return () => source.close();
   }, []);
 
   return (
@@ -38,9 +38,13 @@ export default function Dashboard({ user }) {
     rainfall_lower,
     gw_dates,
     predicted_gw,
+    gw_upper,
+    gw_lower,
     today_gw_level,
   } = data;
 
+  /* Bands that failed calibration at training time arrive as null */
+
   /* ================= Rainfall ================= */
   const rainfallUpper = {
     x: rainfall_dates,
@@ -71,6 +75,24 @@ export default function Dashboard({ user }) {
   };
 
   /* ================= Groundwater ================= */
+  const gwUpper = {
+    x: gw_dates,
+    y: gw_upper,
+    mode: "lines",
+    line: { width: 0 },
+    showlegend: false,
+  };
+
+  const gwLower = {
+    x: gw_dates,
+    y: gw_lower,
+    mode: "lines",
+    fill: "tonexty",
+    fillcolor: "rgba(128,0,128,0.2)",
+    line: { width: 0 },
+    showlegend: false,
+  };
+
   const gwTrace = {
     x: gw_dates,
     y: predicted_gw,
@@ -137,7 +159,7 @@ export default function Dashboard({ user }) {
           <div className="bg-white p-4 rounded-2xl shadow">
             <h3 className="font-semibold mb-2">Rainfall Forecast</h3>
             <Plot
-              data={[rainfallUpper, rainfallLower, rainfallTrace]}
+              data={[...(rainfall_upper ? [rainfallUpper, rainfallLower] : []), rainfallTrace]}
               layout={{
                 title: "Predicted Rainfall (mm)",
                 xaxis: { title: "Date" },
@@ -154,7 +176,7 @@ export default function Dashboard({ user }) {
           <div className="bg-white p-4 rounded-2xl shadow">
             <h3 className="font-semibold mb-2">Groundwater Forecast</h3>
             <Plot
-              data={[gwTrace, gwCurrent]}
+              data={[...(gw_upper ? [gwUpper, gwLower] : []), gwTrace, gwCurrent]}
               layout={{
                 title: "Predicted Groundwater Level (m)",
                 xaxis: { title: "Date" },
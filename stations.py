@@ -0,0 +1,289 @@
+import glob
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from anomalies import AnomalyCounts, AnomalyDetector
+from artifacts import artifact_path, load_feature_sets, load_or_train
+from features import FEATURES, FeatureState, RunningStats
+from forecast_cache import ForecastCache
+from metrics import metrics, stage
+from rainfall import RAINFALL_MODEL, load_forecast
+from telemetry import TELEMETRY_CSV, clean_features, load_telemetry, measurement_cols, prepare_telemetry
+from telemetry_store import TelemetryStore
+
+# =====================================================
+# Station Configuration
+# =====================================================
+DEFAULT_STATION = "TGPH2SW0203"
+STATIONS_DIR = os.environ.get("STATIONS_DIR", "stations")
+STATION_CACHE_SIZE = int(os.environ.get("STATION_CACHE_SIZE", "32"))
+
+# =====================================================
+# Station
+# =====================================================
+class Station:
+    """Telemetry, engineered features, models and cached responses of one piezometer."""
+
+    def __init__(self, station_id, name, data, screened, data_clean, artifact, model_source, load_seconds,
+                 feature_sets=None, rainfall_forecast=None):
+        self.id = station_id
+        self.name = name
+        self.lock = threading.RLock()
+        self._data = data
+        self._data_clean = data_clean
+        self._pending_data = []
+        self._pending_clean = []
+        # Seeded from the contiguous screened readings: data_clean has rows dropped, and
+        # a gap in its tail would shift every lag and rolling window
+        self.feature_state = FeatureState.from_frame(screened)
+        self.baseline = RunningStats.from_values(data_clean["Groundwatelevel_m"])
+        # Screens ingested readings before they reach the store and features (see anomalies.py)
+        self.detector = AnomalyDetector.from_frame(data)
+        self.artifact = artifact
+        self.model_source = model_source
+        self.load_seconds = load_seconds
+        # Pruned per-target features from importance.py; None trains on every feature
+        self.feature_sets = feature_sets
+        # Cached Prophet forecast from rainfall.py (RAINFALL_MODEL=prophet only)
+        self.rainfall_forecast = rainfall_forecast
+        self.cache = ForecastCache()
+        # Built by series.series_index on the first /api/series request
+        self.series_index = None
+        # (cache_version, wall-clock time it was first seen), for HTTP Last-Modified
+        self._modified = (None, 0.0)
+
+    @property
+    def model_version(self):
+        return self.artifact["version"]
+
+    @property
+    def last_update(self):
+        return self.feature_state.date
+
+    @property
+    def rainfall_version(self):
+        return self.rainfall_forecast["version"] if self.rainfall_forecast else None
+
+    def cache_version(self):
+        return self.feature_state.date.isoformat(), self.model_version, self.rainfall_version
+
+    def last_modified(self):
+        """
+        When the current cache_version() was first seen. New readings, a
+        swapped model or a refitted rainfall forecast all move it forward.
+        """
+        version = self.cache_version()
+        if self._modified[0] != version:
+            self._modified = (version, time.time())
+        return self._modified[1]
+
+    @property
+    def data(self):
+        if self._pending_data:
+            with self.lock:
+                if self._pending_data:
+                    new = prepare_telemetry(pd.concat(self._pending_data, ignore_index=True))
+                    self._data = pd.concat([self._data, new], ignore_index=True)
+                    self._pending_data = []
+        return self._data
+
+    @property
+    def data_clean(self):
+        if self._pending_clean:
+            with self.lock:
+                if self._pending_clean:
+                    new = pd.DataFrame(self._pending_clean).reindex(columns=self._data_clean.columns)
+                    # As clean_features stores them, so a reload fingerprints the same data
+                    engineered = [name for name in FEATURES if name not in self._data.columns]
+                    new[engineered] = new[engineered].astype(np.float32)
+                    self._data_clean = pd.concat([self._data_clean, new], ignore_index=True)
+                    self._pending_clean = []
+        return self._data_clean
+
+    def check_readings(self, frame):
+        expected = self.feature_state.date + pd.Timedelta(days=1)
+        if frame["date"].iloc[0] != expected:
+            raise ValueError(f"Readings must continue from {expected.date()}, the day after the last reading")
+
+    def ingest(self, frame, screened=None):
+        """
+        Push validated readings through copies of the feature state and
+        baseline, then swap them in, so readers never see a partial update.
+        `frame` joins data as received; the features are built from
+        `screened`, its anomaly-screened copy, when given. Engineered rows
+        are queued and only materialized into data_clean when something
+        reads it.
+        """
+        screened = frame if screened is None else screened
+        with self.lock:
+            self.check_readings(frame)
+            state = self.feature_state.copy()
+            baseline = self.baseline.copy()
+            rows = []
+            columns = [screened[col].to_numpy() for col in measurement_cols]
+            for date, gw, temperature, rainfall, humidity, sediment in zip(frame["date"], *columns):
+                state.push(date, gw, rainfall, temperature, humidity)
+                baseline.push(gw)
+                row = state.row()
+                if state.ready and not any(math.isnan(v) for v in row.values()):
+                    row["date"] = state.date
+                    row["sediment_g/l"] = sediment
+                    rows.append(row)
+            self._pending_data.append(frame)
+            self._pending_clean.extend(rows)
+            self.feature_state, self.baseline = state, baseline
+
+# =====================================================
+# Station Registry
+# =====================================================
+class StationRegistry:
+    """
+    Maps station ids to their telemetry source and keeps at most `capacity`
+    stations loaded, evicting the least recently used. Small per-station
+    summaries outlive eviction so listing all stations does not reload them.
+    """
+
+    def __init__(self, capacity=STATION_CACHE_SIZE, store=None):
+        self.capacity = capacity
+        self.store = store or TelemetryStore()
+        self.sources = OrderedDict()
+        self.summaries = {}
+        # AnomalyCounts per station id, kept when the station is evicted
+        self.anomalies = {}
+        # (cache_version, alert row, last_modified) per station id from batch alert scoring
+        self.alert_rows = {}
+        self._loaded = OrderedDict()
+        # threading.Event per station being loaded; loads run outside _lock
+        self._loading = {}
+        self._lock = threading.RLock()
+
+    def register(self, station_id, path, name=None):
+        self.sources[station_id] = (path, name or station_id)
+
+    def discover(self, directory=STATIONS_DIR):
+        """Register every <station_id>.csv found in `directory`."""
+        for path in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+            self.register(os.path.splitext(os.path.basename(path))[0], path)
+
+    def ids(self):
+        return list(self.sources)
+
+    def __contains__(self, station_id):
+        return station_id in self.sources
+
+    def __len__(self):
+        return len(self.sources)
+
+    def loaded(self):
+        return list(self._loaded)
+
+    def peek(self, station_id):
+        """The loaded station, or None; never loads or reorders."""
+        return self._loaded.get(station_id)
+
+    def get(self, station_id):
+        """
+        The loaded station, loading it if needed. Loading may train models,
+        so it runs outside the registry lock: other stations stay available,
+        and concurrent requests for the same station wait for one load.
+        """
+        while True:
+            with self._lock:
+                station = self._loaded.get(station_id)
+                if station is not None:
+                    self._loaded.move_to_end(station_id)
+                    return station
+                if station_id not in self.sources:
+                    raise KeyError(station_id)
+                loading = self._loading.get(station_id)
+                if loading is None:
+                    loading = self._loading[station_id] = threading.Event()
+                    break
+            # Loaded by another thread; look again, since it may have failed or been evicted
+            loading.wait()
+
+        try:
+            station = self._load(station_id)
+            with self._lock:
+                self._loaded[station_id] = station
+                while len(self._loaded) > self.capacity:
+                    self._loaded.popitem(last=False)
+            return station
+        finally:
+            with self._lock:
+                del self._loading[station_id]
+            loading.set()
+
+    def load_frames(self, station_id):
+        """
+        (data, screened) of a station: its CSV plus every reading ingested
+        since, as received and with imputed spikes in place.
+        """
+        path, _ = self.sources[station_id]
+        with stage("telemetry_load"):
+            data = screened = load_telemetry(path)
+            stored = self.store.read(station_id)
+            if len(stored):
+                data = pd.concat([data, prepare_telemetry(stored)], ignore_index=True)
+                stored = self.store.read(station_id, screened=True)
+                screened = pd.concat([screened, prepare_telemetry(stored)], ignore_index=True)
+        return data, screened
+
+    def load_data(self, station_id):
+        """(data, data_clean) of a station: load_frames with the screened frame cleaned into features."""
+        data, screened = self.load_frames(station_id)
+        with stage("create_features"):
+            return data, clean_features(screened)
+
+    def _load(self, station_id):
+        start = time.perf_counter()
+        data, screened = self.load_frames(station_id)
+        with stage("create_features"):
+            data_clean = clean_features(screened)
+        feature_sets = load_feature_sets(station_id)
+        artifact, model_source, model_seconds = load_or_train(data_clean, artifact_path(station_id),
+                                                              feature_sets=feature_sets)
+        # "model_artifact" when loaded from disk, "model_trained" when fitted
+        metrics.observe(f"model_{model_source}", model_seconds)
+        rainfall_forecast = load_forecast(station_id) if RAINFALL_MODEL == "prophet" else None
+        return Station(station_id, self.sources[station_id][1], data, screened, data_clean, artifact, model_source,
+                       time.perf_counter() - start, feature_sets, rainfall_forecast)
+
+    def anomaly_counts(self, station_id):
+        counts = self.anomalies.get(station_id)
+        if counts is None:
+            counts = self.anomalies[station_id] = AnomalyCounts()
+        return counts
+
+    def ingest(self, station_id, frame):
+        """
+        Screen a validated batch for spikes and flatlines, persist it to the
+        columnar store and apply it to the loaded station. Returns
+        (station, flags). The raw readings are stored along with what was
+        imputed; only the features see the imputed values.
+        """
+        station = self.get(station_id)
+        with station.lock:
+            station.check_readings(frame)
+            with stage("anomaly_screen"):
+                detector = station.detector.copy()
+                screened, flags = detector.screen(frame)
+            with stage("store_append"):
+                self.store.append(station_id, frame, screened)
+            with stage("feature_update"):
+                station.ingest(frame, screened)
+            station.detector = detector
+            self.anomaly_counts(station_id).record(len(frame), flags)
+        return station, flags
+
+def default_registry():
+    registry = StationRegistry()
+    registry.register(DEFAULT_STATION, TELEMETRY_CSV)
+    registry.discover()
+    return registry
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURES, calculate_evaporation, feature_matrix, stack_frames
+
+# =====================================================
+# Telemetry Loading
+# =====================================================
+TELEMETRY_CSV = "Telemetry_data.csv"
+DATE_FORMAT = "%d-%m-%Y"
+CACHE_DIR = os.environ.get("TELEMETRY_CACHE_DIR", ".telemetry_cache")
+CACHE_VERSION = 1
+
+required_cols = ["date", "Groundwatelevel_m", "rainfall_mm", "temperature_c", "humidity_pct"]
+measurement_cols = ["Groundwatelevel_m", "temperature_c", "rainfall_mm", "humidity_pct", "sediment_g/l"]
+
+def prepare_telemetry(data):
+    data = data.dropna(subset=["date"])
+    if not data["date"].is_monotonic_increasing:
+        data = data.sort_values("date")
+    data = data.reset_index(drop=True)
+    # Evaporation in float64 so it matches FeatureState, whatever the stored precision
+    data["evaporation_mm"] = calculate_evaporation(
+        data["temperature_c"].astype(np.float64), data["humidity_pct"].astype(np.float64)
+    )
+    return data
+
+def parse_csv(path):
+    """Parse a telemetry CSV into sorted typed columns: int64 ns dates, float32 measurements."""
+    data = pd.read_csv(path)
+    for col in required_cols:
+        if col not in data.columns:
+            raise ValueError(f"Missing column: {col}")
+
+    dates = pd.to_datetime(data["date"], format=DATE_FORMAT, errors="coerce")
+    order = np.argsort(dates.to_numpy(), kind="stable")
+    order = order[dates.notna().to_numpy()[order]]
+    columns = {"date": dates.to_numpy(dtype="datetime64[ns]")[order].view(np.int64)}
+    for col in data.columns:
+        if col != "date":
+            columns[col] = pd.to_numeric(data[col], errors="coerce").to_numpy(dtype=np.float32)[order]
+    return columns
+
+# =====================================================
+# Columnar CSV Cache
+# =====================================================
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _cache_path(path):
+    key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:10]
+    return os.path.join(CACHE_DIR, f"{os.path.splitext(os.path.basename(path))[0]}-{key}")
+
+def _tmp_path(path):
+    # Unique per process and thread, so workers rebuilding the same cache never share a partial file
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+def _write_json(path, payload):
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+def _save_array(path, values):
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "wb") as f:
+        np.save(f, values)
+    os.replace(tmp_path, path)
+
+def _write_cache(cache, columns, meta):
+    os.makedirs(cache, exist_ok=True)
+    meta = dict(meta, columns=list(columns))
+    for i, values in enumerate(columns.values()):
+        _save_array(os.path.join(cache, f"{i}.npy"), values)
+    # Written last, so a reader that sees the new meta also sees complete columns
+    _write_json(os.path.join(cache, "meta.json"), meta)
+    return meta
+
+def load_columns(path):
+    """
+    Typed columns of a telemetry CSV. The first load converts the CSV into
+    one .npy file per column; later loads memory-map those files and only
+    reparse when the CSV's size/mtime change and its content hash differs.
+    """
+    stat = os.stat(path)
+    cache = _cache_path(path)
+    meta_path = os.path.join(cache, "meta.json")
+    meta = None
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") != CACHE_VERSION:
+            meta = None
+
+    stamp = {"version": CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    try:
+        if meta is not None and (meta["size"], meta["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            digest = _file_hash(path)
+            if meta.get("sha256") == digest:
+                meta.update(stamp)
+                _write_json(meta_path, meta)
+            else:
+                meta = None
+        if meta is None:
+            columns = parse_csv(path)
+            meta = _write_cache(cache, columns, dict(stamp, sha256=_file_hash(path)))
+    except OSError:
+        # Read-only checkouts just parse the CSV every time.
+        return parse_csv(path)
+
+    return {
+        name: np.load(os.path.join(cache, f"{i}.npy"), mmap_mode="r")
+        for i, name in enumerate(meta["columns"])
+    }
+
+def load_telemetry(path=TELEMETRY_CSV):
+    columns = load_columns(path)
+    for col in required_cols:
+        if col not in columns:
+            raise ValueError(f"Missing column: {col}")
+
+    data = pd.DataFrame(
+        {col: (values.view("datetime64[ns]") if col == "date" else values) for col, values in columns.items()},
+        copy=False,
+    )
+    return prepare_telemetry(data)
+
+# =====================================================
+# Feature Matrix Cache
+# =====================================================
+FEATURE_CACHE_VERSION = 1
+
+def data_version(data, features=FEATURES):
+    """Hash of the readings the feature matrix is computed from, plus the feature list."""
+    digest = hashlib.sha256(repr((FEATURE_CACHE_VERSION, list(features))).encode())
+    digest.update(data["date"].to_numpy(dtype="datetime64[ns]").view(np.int64).tobytes())
+    for col in required_cols[1:]:
+        digest.update(np.ascontiguousarray(data[col].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+def load_feature_matrix(data, features=FEATURES):
+    """
+    (X, rows): the float32 `features` matrix of every clean row of `data`
+    (complete features and groundwater level) and those rows' positions.
+    It is computed once per data version with the stacked feature engine
+    and memory-mapped from CACHE_DIR on later loads, so training, tuning
+    and serving all read the same matrix.
+    """
+    cache = os.path.join(CACHE_DIR, "features", data_version(data, features)[:16])
+    try:
+        return np.load(os.path.join(cache, "X.npy"), mmap_mode="r"), np.load(os.path.join(cache, "rows.npy"))
+    except (OSError, ValueError):
+        pass
+
+    matrix = feature_matrix(stack_frames([data]), features)[0]
+    clean = ~np.isnan(matrix).any(axis=1) & ~np.isnan(data["Groundwatelevel_m"].to_numpy(dtype=np.float64))
+    rows = np.flatnonzero(clean)
+    X = np.ascontiguousarray(matrix[rows])
+    try:
+        os.makedirs(cache, exist_ok=True)
+        # X last: a cache directory without X.npy is rebuilt
+        _save_array(os.path.join(cache, "rows.npy"), rows)
+        _save_array(os.path.join(cache, "X.npy"), X)
+    except OSError:
+        # Read-only checkouts recompute the matrix every time.
+        pass
+    return X, rows
+
+def clean_features(data):
+    """
+    The rows of `data` with complete model inputs, with the engineered
+    FEATURES columns taken from the cached float32 matrix. Optional columns
+    such as sediment may be missing.
+    """
+    X, rows = load_feature_matrix(data)
+    data_clean = data.iloc[rows].reset_index(drop=True)
+    engineered = {name: X[:, i] for i, name in enumerate(FEATURES) if name not in data_clean.columns}
+    return data_clean.assign(**engineered)
+
+# =====================================================
+# Incoming Readings
+# =====================================================
+def readings_frame(readings):
+    """
+    Validate a batch of readings (a list of row objects or an object of
+    column lists) into a date-sorted frame with the telemetry columns,
+    one reading per consecutive day and none in the future.
+    """
+    if not readings:
+        raise ValueError("No readings supplied")
+    try:
+        frame = pd.DataFrame(readings)
+    except ValueError as exc:
+        raise ValueError(f"Malformed readings: {exc}")
+
+    for col in required_cols:
+        if col not in frame.columns:
+            raise ValueError(f"Missing column: {col}")
+    if "sediment_g/l" not in frame.columns:
+        frame["sediment_g/l"] = np.nan
+
+    frame = frame[["date"] + measurement_cols].copy()
+    # Dates with an offset are converted to UTC; naive dates are taken as UTC already
+    frame["date"] = pd.to_datetime(frame["date"], errors="coerce", format="ISO8601", utc=True).dt.tz_convert(None)
+    for col in measurement_cols:
+        frame[col] = pd.to_numeric(frame[col], errors="coerce")
+
+    invalid = frame[required_cols].isna().any(axis=1)
+    if invalid.any():
+        raise ValueError(f"Invalid or missing values in reading {int(np.flatnonzero(invalid)[0])}")
+    # Missing optional values stay NaN, but an overflowed 1e400 must not reach the features as inf
+    infinite = np.isinf(frame[measurement_cols].to_numpy(dtype=np.float64)).any(axis=1)
+    if infinite.any():
+        raise ValueError(f"Non-finite value in reading {int(np.flatnonzero(infinite)[0])}")
+    if frame["date"].duplicated().any():
+        raise ValueError("Duplicate dates in readings")
+    frame = frame.sort_values("date").reset_index(drop=True)
+
+    # Feature lags count readings, so a missing day would silently shift every lag
+    gaps = np.flatnonzero(frame["date"].diff().iloc[1:] != pd.Timedelta(days=1))
+    if len(gaps):
+        raise ValueError(f"Readings must be consecutive days: {frame['date'].iloc[gaps[0] + 1].date()} "
+                         f"follows {frame['date'].iloc[gaps[0]].date()}")
+    # A day ahead of UTC covers every timezone
+    latest = pd.Timestamp.now(tz="UTC").tz_localize(None).normalize() + pd.Timedelta(days=1)
+    if frame["date"].iloc[-1] > latest:
+        raise ValueError(f"Reading dated {frame['date'].iloc[-1].date()} is in the future")
+    return frame
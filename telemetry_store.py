@@ -0,0 +1,102 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from telemetry import _tmp_path, measurement_cols
+
+# =====================================================
+# Append-only Columnar Telemetry Store
+# =====================================================
+STORE_DIR = os.environ.get("TELEMETRY_STORE_DIR", "telemetry_store")
+
+def _key(col):
+    return col.replace("/", "_per_")
+
+def _imputed_key(col):
+    return "imputed_" + _key(col)
+
+class TelemetryStore:
+    """
+    Ingested readings, one directory per station. Every batch becomes an
+    immutable segment file holding one array per column (dates as int64
+    nanoseconds), so appends never rewrite existing data. Readings are
+    kept as received; values anomaly screening imputed for them are stored
+    beside the raw column (NaN where nothing was imputed).
+
+    Several worker processes may append to the same station: segment
+    numbers are claimed on disk, not counted in memory.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+
+    def _station_dir(self, station_id):
+        return os.path.join(self.root, station_id)
+
+    def segments(self, station_id):
+        return sorted(glob.glob(os.path.join(self._station_dir(station_id), "*.npz")))
+
+    def _publish(self, station_id, tmp_path):
+        """
+        Link a fully written segment in under the next free number. link()
+        fails rather than replace an existing file, so when another worker
+        claims the same number first this one rescans and takes the next.
+        """
+        while True:
+            existing = self.segments(station_id)
+            seq = int(os.path.basename(existing[-1])[:-4]) + 1 if existing else 0
+            path = os.path.join(self._station_dir(station_id), f"{seq:012d}.npz")
+            try:
+                os.link(tmp_path, path)
+            except FileExistsError:
+                continue
+            os.remove(tmp_path)
+            return path
+
+    def append(self, station_id, frame, screened=None):
+        """Store a batch of raw readings, with `screened`, their screened copy, recording what was imputed."""
+        columns = {"date": frame["date"].to_numpy(dtype="datetime64[ns]").view(np.int64)}
+        for col in measurement_cols:
+            raw = columns[_key(col)] = frame[col].to_numpy(dtype=np.float64)
+            if screened is not None:
+                values = screened[col].to_numpy(dtype=np.float64)
+                imputed = (values != raw) & ~(np.isnan(values) & np.isnan(raw))
+                if imputed.any():
+                    columns[_imputed_key(col)] = np.where(imputed, values, np.nan)
+
+        station_dir = self._station_dir(station_id)
+        os.makedirs(station_dir, exist_ok=True)
+        tmp_path = _tmp_path(os.path.join(station_dir, "segment.npz"))
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **columns)
+        return self._publish(station_id, tmp_path)
+
+    def read_segment(self, path, screened=False):
+        """One segment's readings: as received, or with screened=True the imputed values in their place."""
+        with np.load(path) as segment:
+            part = {"date": segment["date"].view("datetime64[ns]")}
+            for col in measurement_cols:
+                part[col] = segment[_key(col)]
+                if screened and _imputed_key(col) in segment.files:
+                    imputed = segment[_imputed_key(col)]
+                    part[col] = np.where(np.isnan(imputed), part[col], imputed)
+        return pd.DataFrame(part)
+
+    def read(self, station_id, screened=False):
+        """All stored readings of a station as one frame (empty if none); see read_segment."""
+        parts = [self.read_segment(path, screened) for path in self.segments(station_id)]
+        if not parts:
+            return pd.DataFrame(columns=["date"] + measurement_cols)
+        return pd.concat(parts, ignore_index=True)
+
+    def compact(self, station_id):
+        """Merge a station's segments into one, keeping reads cheap after many small batches."""
+        segments = self.segments(station_id)
+        if len(segments) < 2:
+            return
+        path = self.append(station_id, self.read(station_id), self.read(station_id, screened=True))
+        for old in segments:
+            if old != path:
+                os.remove(old)
@@ -0,0 +1,100 @@
+"""
+Exactness contracts of the fast paths against the reference code they replace.
+
+    python -m pytest tests
+
+Each runs on the bundled telemetry.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from features import FEATURES, HISTORY, FeatureState, RunningStats, create_features, feature_matrix, stack_frames
+from scoring import feature_chunks, score_frame, telemetry_chunks
+from series import ROLLUPS, SeriesIndex, SeriesLevel
+from stations import Station
+from telemetry import TELEMETRY_CSV, clean_features, load_telemetry
+from telemetry_store import TelemetryStore
+from training import engine_models, train_models
+
+@pytest.fixture(scope="module")
+def telemetry():
+    return load_telemetry(os.path.join(ROOT, TELEMETRY_CSV))
+
+def test_feature_state_matches_create_features(telemetry):
+    """FeatureState.row() after each push equals create_features on the full history."""
+    expected = create_features(telemetry)[FEATURES].to_numpy(dtype=np.float64)
+    state = FeatureState()
+    actual = np.full_like(expected, np.nan)
+    for i, row in enumerate(telemetry.itertuples(index=False)):
+        state.push(row.date, row.Groundwatelevel_m, row.rainfall_mm, row.temperature_c, row.humidity_pct)
+        if state.ready:
+            actual[i] = state.vector()[0]
+
+    # Rows before a full HISTORY are never served; NaN readings must give NaN in the same places
+    np.testing.assert_array_equal(actual[HISTORY - 1:], expected[HISTORY - 1:])
+
+def test_station_state_matches_create_features_after_a_gap(telemetry):
+    """A station whose clean rows end before a gap serves the features of its last reading, unshifted."""
+    screened = telemetry.copy()
+    screened.loc[len(screened) - 3, "Groundwatelevel_m"] = np.nan
+    station = Station("test", "test", screened, screened, clean_features(screened), None, "trained", 0.0)
+    expected = create_features(screened)[FEATURES].to_numpy(dtype=np.float64)[-1]
+    np.testing.assert_array_equal(station.feature_state.vector()[0], expected)
+
+def test_compiled_ensemble_matches_sklearn(telemetry):
+    """The flattened-tree engine predicts what the scaled sklearn models do, for every output."""
+    data_clean = clean_features(telemetry)
+    artifact = train_models(data_clean)
+    X = data_clean[artifact["features"]].to_numpy(dtype=np.float64)
+    expected = []
+    for model, scaler_X, scaler_y, columns in engine_models(artifact):
+        rows = X if columns is None else X[:, columns]
+        scaled = model.predict(scaler_X.transform(rows))
+        expected.append(scaler_y.inverse_transform(scaled.reshape(-1, 1))[:, 0])
+    np.testing.assert_allclose(artifact["engine"].predict(X), np.column_stack(expected), rtol=0, atol=1e-10)
+
+def test_feature_matrix_matches_create_features(telemetry):
+    """The stacked engine equals create_features in float32, with shorter stations and missing readings."""
+    gappy = telemetry.iloc[100:].reset_index(drop=True)
+    gappy.loc[::37, "Groundwatelevel_m"] = np.nan
+    gappy.loc[::53, "rainfall_mm"] = np.nan
+    frames = [telemetry, gappy]
+    matrix = feature_matrix(stack_frames(frames))
+    for i, frame in enumerate(frames):
+        expected = create_features(frame)[FEATURES].to_numpy(dtype=np.float32)
+        np.testing.assert_array_equal(matrix[i, matrix.shape[1] - len(frame):], expected)
+
+def test_extended_series_index_matches_from_frame(telemetry):
+    """Extending an index with new readings gives every level of the index built from scratch."""
+    data = telemetry.copy()
+    data.loc[::11, "rainfall_mm"] = np.nan
+    for rows in (1, 30, 200, len(data) - 1):
+        actual = SeriesIndex.from_frame(data.iloc[:rows], "before").extended(data, "after")
+        expected = SeriesIndex.from_frame(data, "after")
+        assert actual.rows == expected.rows
+        for column, levels in expected.levels.items():
+            for name in ["raw"] + [name for name, _ in ROLLUPS]:
+                for part in SeriesLevel.__slots__:
+                    np.testing.assert_array_equal(getattr(actual.levels[column][name], part),
+                                                  getattr(levels[name], part), err_msg=f"{column} {name} {part}")
+
+def test_chunked_scoring_matches_unchunked(telemetry, tmp_path):
+    """Scoring in chunks smaller than HISTORY, or not dividing the history, equals one chunk."""
+    artifact = train_models(clean_features(telemetry))
+    store = TelemetryStore(str(tmp_path))
+
+    def score(chunk_rows):
+        stats = RunningStats()
+        chunks = feature_chunks(telemetry_chunks(os.path.join(ROOT, TELEMETRY_CSV), "test", store, chunk_rows))
+        return pd.concat([score_frame(artifact, features, stats) for features in chunks], ignore_index=True)
+
+    expected = score(len(telemetry))
+    for chunk_rows in (1, 7, HISTORY - 1, HISTORY, 50):
+        pd.testing.assert_frame_equal(score(chunk_rows), expected, check_exact=True)
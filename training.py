@@ -0,0 +1,321 @@
+import hashlib
+import os
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.multioutput import MultiOutputRegressor
+
+from features import FEATURES
+from tree_engine import CompiledEnsemble
+
+# =====================================================
+# Training Configuration
+# =====================================================
+TRAIN_FRACTION = 0.8
+GBR_PARAMS = {"n_estimators": 200, "learning_rate": 0.1, "max_depth": 5, "random_state": 42}
+
+# Nominal coverage of the prediction intervals; 0.8 fits quantile GBRs at 0.1 and 0.9
+INTERVAL_COVERAGE = float(os.environ.get("INTERVAL_COVERAGE", "0.8"))
+if not 0 < INTERVAL_COVERAGE < 1:
+    raise ValueError(f"INTERVAL_COVERAGE must be between 0 and 1, got {INTERVAL_COVERAGE!r}")
+QUANTILES = ((1 - INTERVAL_COVERAGE) / 2, (1 + INTERVAL_COVERAGE) / 2)
+
+# The quantile GBRs get shallower, subsampled trees with a minimum leaf size:
+# with GBR_PARAMS they memorise the training rows and collapse to zero width
+QUANTILE_PARAMS = {"n_estimators": 100, "learning_rate": 0.05, "max_depth": 3, "min_samples_leaf": 20,
+                   "subsample": 0.8, "random_state": 42}
+# The last quarter of the training rows calibrates the quantile GBRs
+# (conformalised quantile regression) rather than fitting them
+CALIBRATION_FRACTION = 0.25
+# Bands whose held-out coverage falls further than this below
+# INTERVAL_COVERAGE are dropped rather than stored and served
+INTERVAL_TOLERANCE = float(os.environ.get("INTERVAL_TOLERANCE", "0.1"))
+
+# Output columns of the serving engines: point forecasts first, so point-only
+# callers can skip the quantile trees
+ENGINE_OUTPUTS = ("groundwater", "rainfall", "groundwater_lower", "groundwater_upper", "rainfall_lower", "rainfall_upper")
+TARGETS = {"groundwater": "Groundwatelevel_m", "rainfall": "rainfall_mm"}
+
+# "recursive" rolls the one-step models forward day by day; "direct" also trains
+# one model per horizon so the whole week comes from a single feature row.
+FORECAST_HORIZON = 7
+FORECAST_MODES = ("recursive", "direct")
+FORECAST_MODE = os.environ.get("FORECAST_MODE", "recursive")
+if FORECAST_MODE not in FORECAST_MODES:
+    raise ValueError(f"FORECAST_MODE must be one of {FORECAST_MODES}, got {FORECAST_MODE!r}")
+
+# =====================================================
+# Per-target Feature Sets
+# =====================================================
+def resolve_feature_sets(features=FEATURES, feature_sets=None):
+    """
+    (columns, groundwater features, rainfall features). Without feature_sets
+    both models use every feature; with pruned sets (see importance.py) each
+    keeps its own subset and columns is their union, in `features` order.
+    """
+    if not feature_sets:
+        return list(features), list(features), list(features)
+    gw_features = [f for f in features if f in feature_sets["groundwater"]]
+    rain_features = [f for f in features if f in feature_sets["rainfall"]]
+    columns = [f for f in features if f in gw_features or f in rain_features]
+    return columns, gw_features, rain_features
+
+# =====================================================
+# Data Fingerprint
+# =====================================================
+def data_fingerprint(data_clean, features=FEATURES, direct=FORECAST_MODE == "direct", feature_sets=None):
+    """Hash of everything the models are fitted on: feature values, targets, feature lists and params."""
+    features, gw_features, rain_features = resolve_feature_sets(features, feature_sets)
+    digest = hashlib.sha256()
+    horizon = FORECAST_HORIZON if direct else None
+    digest.update(repr((features, sorted(GBR_PARAMS.items()), sorted(QUANTILE_PARAMS.items()), TRAIN_FRACTION,
+                        CALIBRATION_FRACTION, INTERVAL_TOLERANCE, horizon, QUANTILES)).encode())
+    if feature_sets:
+        digest.update(repr((gw_features, rain_features)).encode())
+    columns = list(features) + ["Groundwatelevel_m", "rainfall_mm"]
+    values = np.ascontiguousarray(data_clean[columns].to_numpy(dtype=np.float64))
+    digest.update(values.tobytes())
+    return digest.hexdigest()
+
+# =====================================================
+# Model Training
+# =====================================================
+def train_split(data_clean):
+    return int(len(data_clean) * TRAIN_FRACTION)
+
+def fit_scaled_gbr(X_train, y_train):
+    scaler_X = StandardScaler()
+    scaler_y = StandardScaler()
+    # Fitted on plain arrays: serving passes FeatureState vectors, not DataFrames
+    X_train_scaled = scaler_X.fit_transform(X_train.to_numpy(dtype=np.float64))
+    y_train_scaled = scaler_y.fit_transform(y_train.values.reshape(-1,1)).ravel()
+
+    model = GradientBoostingRegressor(**GBR_PARAMS)
+    model.fit(X_train_scaled, y_train_scaled)
+    return model, scaler_X, scaler_y
+
+def calibration_start(rows):
+    """First of the training rows held back to calibrate the quantile GBRs."""
+    return rows - int(rows * CALIBRATION_FRACTION)
+
+def conformal_offset(lower, upper, actual):
+    """
+    Conformalised quantile regression: how far [lower, upper] must widen
+    (negative: may narrow) to cover INTERVAL_COVERAGE of the calibration
+    rows. One offset per column of 2-D bounds.
+    """
+    scores = np.maximum(lower - actual, actual - upper)
+    if not len(scores):
+        return np.zeros(scores.shape[1:])
+    level = min(np.ceil((len(scores) + 1) * INTERVAL_COVERAGE) / len(scores), 1.0)
+    return np.quantile(scores, level, axis=0)
+
+def fit_quantile_gbrs(X_train, y_train, scaler_X, scaler_y):
+    """
+    ([lower, upper] quantile GBRs, conformal offset in target units). The
+    GBRs use the point model's scaled inputs and target; standard scaling is
+    monotone, so their quantiles map back through scaler_y like the point
+    predictions do.
+    """
+    X_scaled = scaler_X.transform(X_train.to_numpy(dtype=np.float64))
+    y = y_train.to_numpy(dtype=np.float64)
+    y_scaled = scaler_y.transform(y.reshape(-1, 1)).ravel()
+    fit = calibration_start(len(y))
+    models = [
+        GradientBoostingRegressor(loss="quantile", alpha=q, **QUANTILE_PARAMS).fit(X_scaled[:fit], y_scaled[:fit])
+        for q in QUANTILES
+    ]
+    lower, upper = (scaler_y.inverse_transform(m.predict(X_scaled[fit:]).reshape(-1, 1))[:, 0] for m in models)
+    return models, float(conformal_offset(lower, upper, y[fit:]))
+
+def horizon_targets(data_clean, target, horizon=FORECAST_HORIZON):
+    """Column h-1 holds `target` h rows after each row (NaN past the end)."""
+    series = data_clean[target]
+    return np.column_stack([series.shift(-h).to_numpy(dtype=np.float64) for h in range(1, horizon + 1)])
+
+def fit_direct_gbr(X, data_clean, target, split, scaler_X, scaler_y, **params):
+    """
+    One GBR per forecast horizon, fitted on the training rows whose targets
+    all fall before `split`. Reuses the one-step scalers; extra params (e.g.
+    a quantile loss) override GBR_PARAMS for every GBR.
+    """
+    rows = max(split - FORECAST_HORIZON, 0)
+    Y = horizon_targets(data_clean, target)[:rows]
+    Y_scaled = scaler_y.transform(Y.reshape(-1, 1)).reshape(Y.shape)
+
+    direct_model = MultiOutputRegressor(GradientBoostingRegressor(**{**GBR_PARAMS, **params}))
+    direct_model.fit(scaler_X.transform(X.iloc[:rows].to_numpy(dtype=np.float64)), Y_scaled)
+    return direct_model
+
+def fit_direct_quantile_gbrs(X, data_clean, target, split, scaler_X, scaler_y):
+    """
+    ([lower, upper] per-horizon quantile GBRs, per-horizon conformal
+    offsets), calibrated on the training rows after calibration_start whose
+    targets all fall before the held-out split.
+    """
+    fit = calibration_start(split)
+    models = [fit_direct_gbr(X, data_clean, target, fit, scaler_X, scaler_y,
+                             loss="quantile", alpha=q, **QUANTILE_PARAMS) for q in QUANTILES]
+    rows = slice(fit, max(split - FORECAST_HORIZON, fit))
+    X_scaled = scaler_X.transform(X.iloc[rows].to_numpy(dtype=np.float64))
+    lower, upper = (scaler_y.inverse_transform(m.predict(X_scaled).reshape(-1, 1)).reshape(-1, FORECAST_HORIZON)
+                    for m in models)
+    return models, conformal_offset(lower, upper, horizon_targets(data_clean, target)[rows])
+
+def train_models(data_clean, features=FEATURES, direct=FORECAST_MODE == "direct", feature_sets=None):
+    """
+    Fit the groundwater and rainfall models on the first 80% of data_clean,
+    keeping only the prediction intervals that pass held-out calibration.
+    """
+    features, gw_features, rain_features = resolve_feature_sets(features, feature_sets)
+    X, X_r = data_clean[gw_features], data_clean[rain_features]
+    split = train_split(data_clean)
+
+    model, scaler_X, scaler_y = fit_scaled_gbr(X.iloc[:split], data_clean["Groundwatelevel_m"].iloc[:split])
+    rain_model, scaler_X_r, scaler_y_r = fit_scaled_gbr(X_r.iloc[:split], data_clean["rainfall_mm"].iloc[:split])
+    gw_bands = fit_quantile_gbrs(X.iloc[:split], data_clean["Groundwatelevel_m"].iloc[:split], scaler_X, scaler_y)
+    rain_bands = fit_quantile_gbrs(X_r.iloc[:split], data_clean["rainfall_mm"].iloc[:split], scaler_X_r, scaler_y_r)
+
+    bundle = {
+        "model": model,
+        "scaler_X": scaler_X,
+        "scaler_y": scaler_y,
+        "rain_model": rain_model,
+        "scaler_X_r": scaler_X_r,
+        "scaler_y_r": scaler_y_r,
+        "interval_models": {"groundwater": gw_bands[0], "rainfall": rain_bands[0]},
+        "interval_offsets": {"groundwater": gw_bands[1], "rainfall": rain_bands[1]},
+        "features": features,
+        "feature_sets": {"groundwater": gw_features, "rainfall": rain_features},
+        # Positions of each model's inputs within the serving row of `features`
+        "gw_columns": [features.index(f) for f in gw_features],
+        "rain_columns": [features.index(f) for f in rain_features],
+        "split": split,
+    }
+    if direct:
+        bundle["direct_model"] = fit_direct_gbr(X, data_clean, "Groundwatelevel_m", split, scaler_X, scaler_y)
+        bundle["direct_rain_model"] = fit_direct_gbr(X_r, data_clean, "rainfall_mm", split, scaler_X_r, scaler_y_r)
+        gw_bands = fit_direct_quantile_gbrs(X, data_clean, "Groundwatelevel_m", split, scaler_X, scaler_y)
+        rain_bands = fit_direct_quantile_gbrs(X_r, data_clean, "rainfall_mm", split, scaler_X_r, scaler_y_r)
+        bundle["direct_interval_models"] = {"groundwater": gw_bands[0], "rainfall": rain_bands[0]}
+        bundle["direct_interval_offsets"] = {"groundwater": gw_bands[1], "rainfall": rain_bands[1]}
+    bundle = compile_engines(bundle)
+    bundle["calibration"] = interval_calibration(bundle, data_clean)
+    return gate_intervals(bundle)
+
+def output_models(bundle, prefix=""):
+    """
+    {output: (model, scaler_X, scaler_y, columns)} in ENGINE_OUTPUTS order,
+    for the point models and each band the bundle keeps. With prefix
+    "direct_" the models are the per-horizon MultiOutputRegressors.
+    """
+    inputs = {
+        "groundwater": (bundle["scaler_X"], bundle["scaler_y"], bundle["gw_columns"]),
+        "rainfall": (bundle["scaler_X_r"], bundle["scaler_y_r"], bundle["rain_columns"]),
+    }
+    models = {"groundwater": bundle[prefix + "model"], "rainfall": bundle[prefix + "rain_model"]}
+    for target, (lower, upper) in bundle[prefix + "interval_models"].items():
+        models[f"{target}_lower"], models[f"{target}_upper"] = lower, upper
+    return {
+        output: (models[output], *inputs[output.split("_")[0]])
+        for output in ENGINE_OUTPUTS if output in models
+    }
+
+def engine_models(bundle, prefix=""):
+    """(model, scaler_X, scaler_y, columns) for each of the bundle's "outputs"."""
+    return list(output_models(bundle, prefix).values())
+
+def output_shift(bundle, prefix=""):
+    """
+    What predict_outputs adds to each engine column: zero for the point
+    forecasts, minus / plus the conformal offset for each band's lower /
+    upper bound. Direct engines get one entry per horizon of each output.
+    """
+    shift = {}
+    for target, offset in bundle[prefix + "interval_offsets"].items():
+        shift[f"{target}_lower"], shift[f"{target}_upper"] = -np.asarray(offset), np.asarray(offset)
+    width = FORECAST_HORIZON if prefix else 1
+    return np.concatenate([np.broadcast_to(shift.get(output, 0.0), width) for output in bundle["outputs"]])
+
+def compile_engines(bundle):
+    """
+    Add flattened-tree engines for serving: "engine" predicts every column
+    of "outputs" (ENGINE_OUTPUTS less any dropped bands) in one pass, and
+    "direct_engine" the 7 horizons of each output in turn (7 groundwater,
+    7 rainfall, 7 groundwater lower, ...). "output_shift" and
+    "direct_output_shift" hold the conformal offsets for those columns.
+    """
+    bundle["outputs"] = tuple(output_models(bundle))
+    bundle["engine"] = CompiledEnsemble.from_models(engine_models(bundle))
+    bundle["output_shift"] = output_shift(bundle)
+    if "direct_model" in bundle:
+        bundle["direct_engine"] = CompiledEnsemble.from_models(
+            [(m, *rest) for model, *rest in engine_models(bundle, "direct_") for m in model.estimators_]
+        )
+        bundle["direct_output_shift"] = output_shift(bundle, "direct_")
+    return bundle
+
+# =====================================================
+# Prediction Intervals
+# =====================================================
+def interval_bounds(point, lower, upper):
+    """
+    Order separately fitted quantiles around the point forecast: quantile
+    models can cross each other or the point model on a given row.
+    """
+    return np.minimum(np.minimum(lower, upper), point), np.maximum(np.maximum(lower, upper), point)
+
+def band_coverage(point, lower, upper, actual):
+    """Coverage, mean width and the pass / fail gate of one band over `actual`."""
+    lower, upper = interval_bounds(point, lower, upper)
+    inside = (actual >= lower) & (actual <= upper)
+    coverage = float(inside.mean()) if inside.size else float("nan")
+    return {
+        "coverage": coverage,
+        "mean_width": float((upper - lower).mean()) if inside.size else float("nan"),
+        "passed": bool(coverage >= INTERVAL_COVERAGE - INTERVAL_TOLERANCE),
+    }
+
+def interval_calibration(bundle, data_clean):
+    """
+    Coverage and mean width of each target's one-step interval on the
+    held-out split, and under "direct" of its direct interval over every
+    horizon of the held-out origins with a full week after them.
+    """
+    held_out = data_clean.iloc[bundle["split"]:]
+    X = held_out[bundle["features"]].to_numpy(dtype=np.float64)
+    pred = dict(zip(bundle["outputs"], (bundle["engine"].predict(X) + bundle["output_shift"]).T))
+    calibration = {"nominal": INTERVAL_COVERAGE, "rows": len(held_out)}
+    for target, column in TARGETS.items():
+        calibration[target] = band_coverage(pred[target], pred[f"{target}_lower"], pred[f"{target}_upper"],
+                                            held_out[column].to_numpy(dtype=np.float64))
+
+    if "direct_model" in bundle:
+        origins = max(len(held_out) - FORECAST_HORIZON, 0)
+        direct = (bundle["direct_engine"].predict(X[:origins]) + bundle["direct_output_shift"])
+        pred = dict(zip(bundle["outputs"], direct.reshape(origins, len(bundle["outputs"]), FORECAST_HORIZON)
+                        .transpose(1, 0, 2)))
+        calibration["direct"] = {"rows": origins}
+        for target, column in TARGETS.items():
+            actual = horizon_targets(data_clean, column)[bundle["split"]:][:origins]
+            calibration["direct"][target] = band_coverage(pred[target], pred[f"{target}_lower"],
+                                                          pred[f"{target}_upper"], actual)
+    return calibration
+
+def gate_intervals(bundle):
+    """
+    Drop every band that failed calibration, so it is neither stored nor
+    served, and recompile the engines without it. Its calibration record
+    stays, for the metrics and retrain history.
+    """
+    dropped = False
+    for prefix, calibration in (("", bundle["calibration"]), ("direct_", bundle["calibration"].get("direct"))):
+        if calibration is None:
+            continue
+        for target in TARGETS:
+            if not calibration[target]["passed"]:
+                del bundle[prefix + "interval_models"][target]
+                del bundle[prefix + "interval_offsets"][target]
+                dropped = True
+    return compile_engines(bundle) if dropped else bundle
@@ -0,0 +1,100 @@
+import numpy as np
+
+# =====================================================
+# Compiled Tree Ensembles
+# =====================================================
+class CompiledEnsemble:
+    """
+    Fitted GradientBoostingRegressors flattened into NumPy arrays and
+    evaluated with vectorized traversal of all trees at once.
+
+    Each model's input scaler is folded into its split thresholds and its
+    target scaler's inverse transform into its leaf values, so predict()
+    takes raw feature rows and returns values in target units, one column
+    per model.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, outputs, base, depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.outputs = outputs
+        self.base = base
+        self.depth = depth
+        # Trees of one output are contiguous; reduceat sums each run
+        self.starts = np.flatnonzero(np.r_[True, outputs[1:] != outputs[:-1]])
+
+    @classmethod
+    def from_models(cls, models):
+        """
+        Compile [(gbr, scaler_X, scaler_y), ...]; either scaler may be None.
+        An optional fourth item maps the model's input columns to columns of
+        the shared input row, for models fitted on a subset of the features.
+        """
+        feature, threshold, left, right, value = [], [], [], [], []
+        roots, outputs, base = [], [], []
+        offset, depth = 0, 0
+
+        for output, (model, scaler_X, scaler_y, *columns) in enumerate(models):
+            n_features = model.n_features_in_
+            columns = np.asarray(columns[0], dtype=np.intp) if columns else np.arange(n_features)
+            x_mean = scaler_X.mean_ if scaler_X is not None else np.zeros(n_features)
+            x_scale = scaler_X.scale_ if scaler_X is not None else np.ones(n_features)
+            y_mean = float(scaler_y.mean_[0]) if scaler_y is not None else 0.0
+            y_scale = float(scaler_y.scale_[0]) if scaler_y is not None else 1.0
+
+            if isinstance(model.init_, str):
+                init = 0.0
+            else:
+                init = float(model.init_.predict(np.zeros((1, n_features)))[0])
+            base.append(init * y_scale + y_mean)
+
+            for estimator in model.estimators_[:, 0]:
+                tree = estimator.tree_
+                nodes = np.arange(tree.node_count)
+                is_leaf = tree.children_left == -1
+
+                feat = np.where(is_leaf, 0, tree.feature)
+                thr = tree.threshold * x_scale[feat] + x_mean[feat]
+                feature.append(columns[feat])
+                threshold.append(np.where(is_leaf, np.inf, thr))
+                left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+                right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+                value.append(tree.value[:, 0, 0] * model.learning_rate * y_scale)
+
+                roots.append(offset)
+                outputs.append(output)
+                offset += tree.node_count
+                depth = max(depth, tree.max_depth)
+
+        return cls(
+            np.concatenate(feature).astype(np.intp),
+            np.concatenate(threshold),
+            np.concatenate(left).astype(np.intp),
+            np.concatenate(right).astype(np.intp),
+            np.concatenate(value),
+            np.array(roots, dtype=np.intp),
+            np.array(outputs, dtype=np.intp),
+            np.array(base),
+            depth,
+        )
+
+    @property
+    def n_outputs(self):
+        return len(self.base)
+
+    def predict(self, X, outputs=None):
+        """Predictions of the first `outputs` models (all by default); later models' trees are skipped."""
+        X = np.asarray(X, dtype=np.float64)
+        outputs = self.n_outputs if outputs is None else outputs
+        roots = self.roots if outputs == self.n_outputs else self.roots[:self.starts[outputs]]
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(roots, (len(X), len(roots)))
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        return np.add.reduceat(self.value[node], self.starts[:outputs], axis=1) + self.base[:outputs]
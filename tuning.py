@@ -0,0 +1,140 @@
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import StandardScaler
+
+from tree_engine import CompiledEnsemble
+
+# =====================================================
+# Search Space
+# =====================================================
+PARAM_GRID = {
+    "learning_rate": [0.03, 0.05, 0.1, 0.2],
+    "max_depth": [3, 4, 5, 6],
+    "min_samples_split": [2, 10, 20],
+    "subsample": [0.8, 1.0],
+}
+N_SPLITS = 5
+MIN_ESTIMATORS = 25
+MAX_ESTIMATORS = 400
+HALVING_FACTOR = 3
+
+def candidates(grid=PARAM_GRID):
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+# =====================================================
+# Fold Cache
+# =====================================================
+def fold_matrices(X, y, n_splits=N_SPLITS):
+    """Scaled (X_train, y_train, X_val, y_val, scaler_y) per TimeSeriesSplit fold, built once per search."""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64).reshape(-1, 1)
+    folds = []
+    for train_idx, val_idx in TimeSeriesSplit(n_splits=n_splits).split(X):
+        scaler_X = StandardScaler().fit(X[train_idx])
+        scaler_y = StandardScaler().fit(y[train_idx])
+        folds.append((
+            scaler_X.transform(X[train_idx]),
+            scaler_y.transform(y[train_idx]).ravel(),
+            scaler_X.transform(X[val_idx]),
+            y[val_idx].ravel(),
+            scaler_y,
+        ))
+    return folds
+
+# Each worker process receives the folds once through the pool initializer
+_FOLDS = None
+
+def _init_worker(folds):
+    global _FOLDS
+    _FOLDS = folds
+
+def _evaluate(task):
+    params, n_estimators, fold = task
+    X_train, y_train, X_val, y_val, scaler_y = _FOLDS[fold]
+
+    model = GradientBoostingRegressor(n_estimators=n_estimators, random_state=42, **params)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    pred = scaler_y.inverse_transform(model.predict(X_val).reshape(-1, 1)).ravel()
+    rmse = float(np.sqrt(np.mean((pred - y_val) ** 2)))
+
+    # Single-row latency through the serving engine
+    engine = CompiledEnsemble.from_models([(model, None, scaler_y)])
+    row = X_val[-1:]
+    repeats = 50
+    start = time.perf_counter()
+    for _ in range(repeats):
+        engine.predict(row)
+    predict_ms = (time.perf_counter() - start) / repeats * 1000
+    return rmse, fit_seconds, predict_ms
+
+# =====================================================
+# Successive Halving Search
+# =====================================================
+def tune(X, y, grid=PARAM_GRID, n_splits=N_SPLITS, min_estimators=MIN_ESTIMATORS,
+         max_estimators=MAX_ESTIMATORS, factor=HALVING_FACTOR, workers=None, log=print):
+    """
+    Search GradientBoostingRegressor hyperparameters over TimeSeriesSplit
+    folds on all cores. Every rung fits all surviving candidates with more
+    trees and keeps the best 1/factor of them. Returns every evaluated
+    (candidate, rung) with its RMSE, fit time and predict time, ranked.
+    """
+    folds = fold_matrices(X, y, n_splits)
+    pool = candidates(grid)
+    n_estimators = min_estimators
+    report = []
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(folds,)) as executor:
+        while True:
+            tasks = [(params, n_estimators, fold) for params in pool for fold in range(len(folds))]
+            scores = list(executor.map(_evaluate, tasks))
+
+            results = []
+            for i, params in enumerate(pool):
+                fold_scores = np.array(scores[i * len(folds):(i + 1) * len(folds)])
+                results.append({
+                    "params": dict(params, n_estimators=n_estimators),
+                    "rmse": float(fold_scores[:, 0].mean()),
+                    "rmse_std": float(fold_scores[:, 0].std()),
+                    "fit_seconds": float(fold_scores[:, 1].mean()),
+                    "predict_ms": float(fold_scores[:, 2].mean()),
+                })
+            results.sort(key=lambda r: r["rmse"])
+            report.extend(results)
+            log(f"rung n_estimators={n_estimators}: {len(pool)} candidates, best RMSE {results[0]['rmse']:.4f}")
+
+            next_estimators = n_estimators * factor
+            if len(pool) <= 1 or next_estimators > max_estimators:
+                break
+            keep = max(1, math.ceil(len(pool) / factor))
+            pool = [{k: v for k, v in r["params"].items() if k != "n_estimators"} for r in results[:keep]]
+            n_estimators = next_estimators
+
+    # Candidates that survived to later rungs first, each rung ranked by RMSE
+    report.sort(key=lambda r: (-r["params"]["n_estimators"], r["rmse"]))
+    return report
+
+def print_report(results, latency_budget_ms=None, top=10):
+    print(f"\n{'rank':>4} {'rmse':>8} {'±':>7} {'fit s':>7} {'pred ms':>8}  params")
+    for rank, result in enumerate(results[:top], 1):
+        flag = ""
+        if latency_budget_ms is not None and result["predict_ms"] > latency_budget_ms:
+            flag = "  (over latency budget)"
+        print(f"{rank:>4} {result['rmse']:8.4f} {result['rmse_std']:7.4f} {result['fit_seconds']:7.2f} "
+              f"{result['predict_ms']:8.3f}  {result['params']}{flag}")
+
+def save_report(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)